@@ -0,0 +1,170 @@
+"""
+Counts MongoDB round trips per write call, old (write + find_one) vs current
+(find_one_and_update / locally built model) service paths.
+
+Runs against MONGO_DETAILS in a throwaway database that is dropped afterwards.
+A bench doctor who works around the clock is seeded there, and each booking
+takes its own future calendar slot. Both booking paths claim the slot and
+count the doctor's load, so only the read-after-write differs.
+
+Usage (from Backend/):
+    python -m db.bench_write_round_trips [iterations]
+"""
+import sys
+import time
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+load_dotenv()
+
+from db.database import db, MONGO_DETAILS, DB_NAME
+from db.migrations import ensure_indexes
+from models.appointment import AppointmentModel
+from models.user import UserModel
+from models.report import ReportModel
+from services import appointment_service, auth_service, report_service
+from services.calendar_service import claim_slot, SLOT_MINUTES
+from services.doctor_assignment import assignment_engine
+from services.doctor_directory import doctor_directory
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+BENCH_DB = f"{DB_NAME}_bench_round_trips"
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        if event.command_name not in ("ping", "endSessions", "dropDatabase"):
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands.clear()
+
+    @property
+    def total(self) -> int:
+        return sum(self.commands.values())
+
+
+# --- Previous implementations, kept here for comparison ---
+
+async def legacy_book_appointment(user_id: str, appointment_data: dict):
+    # Same slot claim and load count as the current path; the old shape re-read the inserted document
+    appointment = AppointmentModel(user_id=user_id, status="booked", **appointment_data)
+    appointment_id = ObjectId()
+    await claim_slot(appointment.doctor_id, appointment.scheduled_time, str(appointment_id), user_id)
+    await assignment_engine.track(appointment.doctor_id)
+    await db.db["appointments"].insert_one({"_id": appointment_id, **appointment.model_dump(by_alias=True, exclude=["id"])})
+    created = await db.db["appointments"].find_one({"_id": appointment_id})
+    return AppointmentModel(**created)
+
+
+async def legacy_update_appointment_status(appointment_id: str, status: str):
+    await db.db["appointments"].update_one({"_id": ObjectId(appointment_id)}, {"$set": {"status": status}})
+    updated = await db.db["appointments"].find_one({"_id": ObjectId(appointment_id)})
+    return AppointmentModel(**updated) if updated else None
+
+
+async def legacy_get_user_or_create_google(email: str, name: str, google_id: str):
+    user = await db.db["users"].find_one({"email": email})
+    if user:
+        return UserModel(**user)
+    new_user = UserModel(name=name, email=email, auth_provider="google", google_id=google_id)
+    result = await db.db["users"].insert_one(new_user.model_dump(by_alias=True, exclude=["id"]))
+    created = await db.db["users"].find_one({"_id": result.inserted_id})
+    return UserModel(**created)
+
+
+async def legacy_update_user(email: str, update_data: dict):
+    result = await db.db["users"].update_one({"email": email}, {"$set": update_data})
+    if result.matched_count == 0:
+        return None
+    return UserModel(**await db.db["users"].find_one({"email": email}))
+
+
+async def legacy_create_report(user_id: str, report_data: dict):
+    report = ReportModel(user_id=user_id, **report_data)
+    result = await db.db["reports"].insert_one(report.model_dump(by_alias=True, exclude=["id"]))
+    return ReportModel(**await db.db["reports"].find_one({"_id": result.inserted_id}))
+
+
+# --- Bench ---
+
+async def measure(counter: CommandCounter, label: str, make_call):
+    counter.reset()
+    start = time.perf_counter()
+    for i in range(ITERATIONS):
+        await make_call(i)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    per_call = counter.total / ITERATIONS
+    detail = ", ".join(f"{k}={v / ITERATIONS:g}" for k, v in sorted(counter.commands.items()))
+    print(f"  {label:<44} {per_call:>4.1f} round trips/call  {elapsed_ms / ITERATIONS:>6.2f} ms/call  ({detail})")
+
+
+async def main():
+    counter = CommandCounter()
+    db.client = AsyncIOMotorClient(MONGO_DETAILS, tlsAllowInvalidCertificates=True, event_listeners=[counter])
+    await db.client.admin.command("ping")
+    db.db = db.client[BENCH_DB]
+
+    report = {"emotion_summary": "bench", "report_metadata": {"source": "bench"}}
+    doctor_id = str(ObjectId())
+    # Every slot of every day is bookable, so slot i is simply i slots after tomorrow's midnight
+    first_slot = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def appt(i):
+        return {"doctor_id": doctor_id, "type": "normal", "scheduled_time": first_slot + timedelta(minutes=i * SLOT_MINUTES)}
+
+    print(f"📊 {ITERATIONS} iterations against {MONGO_DETAILS} ({BENCH_DB})")
+    try:
+        await db.db["users"].create_index("email", unique=True)
+        await ensure_indexes(db.db, ["calendar_slots"])
+        await db.db["doctors"].insert_one({
+            "_id": ObjectId(doctor_id), "name": "Dr. Bench", "specialization": "Bench",
+            "availability_status": "Available", "image_url": "",
+            "working_hours": {"days": list(range(7)), "start": "00:00", "end": "24:00"}
+        })
+        doctor_directory.invalidate()
+        # Load the directory outside the measured calls
+        await doctor_directory.get_all()
+
+        legacy_booked, booked = [], []
+
+        async def book_legacy(i):
+            legacy_booked.append((await legacy_book_appointment("bench-user", appt(i))).id)
+
+        async def book_new(i):
+            booked.append((await appointment_service.book_appointment("bench-user", appt(ITERATIONS + i))).id)
+
+        await measure(counter, "book_appointment (legacy)", book_legacy)
+        await measure(counter, "book_appointment", book_new)
+        # booked -> live releases nothing on either path, so both do the same work
+        await measure(counter, "update_appointment_status (legacy)", lambda i: legacy_update_appointment_status(legacy_booked[i], "live"))
+        await measure(counter, "update_appointment_status", lambda i: appointment_service.update_appointment_status(booked[i], "live"))
+        await measure(counter, "get_user_or_create_google, new (legacy)", lambda i: legacy_get_user_or_create_google(f"legacy{i}@bench.example.com", "Bench", str(i)))
+        await measure(counter, "get_user_or_create_google, new", lambda i: auth_service.get_user_or_create_google(f"new{i}@bench.example.com", "Bench", str(i)))
+        await measure(counter, "get_user_or_create_google, existing (legacy)", lambda i: legacy_get_user_or_create_google(f"new{i}@bench.example.com", "Bench", str(i)))
+        await measure(counter, "get_user_or_create_google, existing", lambda i: auth_service.get_user_or_create_google(f"legacy{i}@bench.example.com", "Bench", str(i)))
+        await measure(counter, "update_user (legacy)", lambda i: legacy_update_user(f"new{i}@bench.example.com", {"name": "Legacy"}))
+        await measure(counter, "update_user", lambda i: auth_service.update_user(f"new{i}@bench.example.com", {"name": "Current"}))
+        await measure(counter, "create_report (legacy)", lambda i: legacy_create_report("bench-user", dict(report)))
+        await measure(counter, "create_report", lambda i: report_service.create_report("bench-user", dict(report)))
+    finally:
+        await db.client.drop_database(BENCH_DB)
+        db.client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
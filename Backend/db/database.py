@@ -1,6 +1,10 @@
 import os
 import certifi
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+from pymongo.write_concern import WriteConcern
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +12,18 @@ load_dotenv()
 MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "sana_db")
 
+# Connection pool and timeouts
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None
+# How long a request may wait for a free pooled connection before failing
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+# Command latency / pool wait listeners (db/monitoring.py), exposed on /metrics
+MONGO_MONITORING_ENABLED = os.getenv("MONGO_MONITORING_ENABLED", "true").lower() == "true"
+
 class Database:
     client: AsyncIOMotorClient = None
     db = None
@@ -18,16 +34,28 @@ async def connect_to_mongo():
     try:
         # Using AsyncIOMotorClient with params requested by user
         # Note: We must use AsyncIOMotorClient to support FastAPI async routes
+        listeners = []
+        if MONGO_MONITORING_ENABLED:
+            from db.monitoring import mongo_metrics
+            listeners.append(mongo_metrics)
+
         db.client = AsyncIOMotorClient(
             MONGO_DETAILS,
-            maxPoolSize=10,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            event_listeners=listeners,
             tlsAllowInvalidCertificates=True
         )
         
         # Ping the server to verify connection and catch errors early
         await db.client.admin.command('ping')
         db.db = db.client[DB_NAME]
-        print(f"✅ Connected to MongoDB at {MONGO_DETAILS}")
+        print(f"✅ Connected to MongoDB at {MONGO_DETAILS} (pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE})")
     except Exception as e:
         print(f"❌ MongoDB Connection Error: {e}")
         raise e
@@ -39,3 +67,100 @@ async def close_mongo_connection():
 
 def get_database():
     return db.db
+
+
+# --- Per-collection read preference / write concern ---
+#
+# Handles from get_collection() carry the policy for their collection; the
+# client default (primary reads, server default write concern) applies to
+# everything else. Override per collection with
+#   MONGO_READ_PREFERENCE_<COLLECTION>=primary|primaryPreferred|secondary|secondaryPreferred|nearest
+#   MONGO_WRITE_CONCERN_<COLLECTION>=majority|0|1|2...
+# or turn the layer off with MONGO_COLLECTION_POLICIES_ENABLED=false.
+#
+# Secondary reads only differ from primary reads on a replica set. Locally,
+# a single-node set is enough to exercise the policies:
+#   mongod --replSet rs0 --port 27017 --dbpath /tmp/rs0 &
+#   mongosh --eval "rs.initiate()"
+#   MONGO_DETAILS=mongodb://localhost:27017/?replicaSet=rs0
+# then GET /metrics shows the effective policy per collection.
+
+MONGO_COLLECTION_POLICIES_ENABLED = os.getenv("MONGO_COLLECTION_POLICIES_ENABLED", "true").lower() == "true"
+MONGO_WRITE_TIMEOUT_MS = int(os.getenv("MONGO_WRITE_TIMEOUT_MS", "5000"))
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+@dataclass
+class CollectionPolicy:
+    read: Optional[str] = None  # key of READ_PREFERENCES; None = client default
+    w: Optional[Union[int, str]] = None  # None = client default
+
+
+COLLECTION_POLICIES: Dict[str, CollectionPolicy] = {
+    # Forum feed and chat history reads tolerate slightly stale replicas
+    "posts": CollectionPolicy(read="secondaryPreferred"),
+    "chat_history": CollectionPolicy(read="secondaryPreferred", w=1),
+    "chat_buckets": CollectionPolicy(read="secondaryPreferred", w=1),
+    # Chat logs and their derived indexes: acknowledged by the primary is enough
+    "chat_sessions": CollectionPolicy(w=1),
+    "chat_memory_vectors": CollectionPolicy(w=1),
+    # Bookings must survive a failover
+    "appointments": CollectionPolicy(read="primary", w="majority"),
+    "doctor_load": CollectionPolicy(read="primary", w="majority"),
+    "calendar_slots": CollectionPolicy(read="primary", w="majority"),
+}
+
+_collections: Dict[str, object] = {}
+
+
+def _parse_w(value: str) -> Union[int, str]:
+    return int(value) if value.isdigit() else value
+
+
+def get_policy(name: str) -> CollectionPolicy:
+    policy = COLLECTION_POLICIES.get(name, CollectionPolicy())
+    read = os.getenv(f"MONGO_READ_PREFERENCE_{name.upper()}", policy.read)
+    w = os.getenv(f"MONGO_WRITE_CONCERN_{name.upper()}")
+    return CollectionPolicy(read=read, w=_parse_w(w) if w else policy.w)
+
+
+def get_collection(name: str):
+    """Collection handle with the read preference / write concern policy for `name`."""
+    if db.db is None:
+        return None
+    handle = _collections.get(name)
+    if handle is not None and handle.database is db.db:
+        return handle
+
+    policy = get_policy(name) if MONGO_COLLECTION_POLICIES_ENABLED else CollectionPolicy()
+    options = {}
+    if policy.read:
+        if policy.read not in READ_PREFERENCES:
+            raise ValueError(f"Unknown read preference for {name}: {policy.read}")
+        options["read_preference"] = READ_PREFERENCES[policy.read]
+    if policy.w is not None:
+        # wtimeout only matters when waiting on replicas
+        waits_on_replicas = policy.w == "majority" or (isinstance(policy.w, int) and policy.w > 1)
+        options["write_concern"] = WriteConcern(w=policy.w, wtimeout=MONGO_WRITE_TIMEOUT_MS if waits_on_replicas else None)
+
+    handle = db.db.get_collection(name, **options)
+    _collections[name] = handle
+    return handle
+
+
+def describe_policies() -> Dict[str, dict]:
+    """Effective policy per configured collection (for /metrics)."""
+    if not MONGO_COLLECTION_POLICIES_ENABLED:
+        return {}
+    policies = {}
+    for name in COLLECTION_POLICIES:
+        policy = get_policy(name)
+        policies[name] = {"read": policy.read or "primary", "w": policy.w if policy.w is not None else "default"}
+    return policies
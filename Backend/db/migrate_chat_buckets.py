@@ -0,0 +1,87 @@
+"""
+Copies chat_history (one document per message) into chat_buckets
+(one document per user/session/day, up to CHAT_BUCKET_SIZE messages).
+
+Safe to re-run: messages already present in a bucket are skipped, so a
+second pass after switching CHAT_STORAGE_MODE=buckets picks up anything
+written in between.
+
+Usage (from Backend/):
+    python -m db.migrate_chat_buckets
+    python -m db.migrate_chat_buckets --delete-source
+"""
+import os
+import argparse
+import pymongo
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017")
+DB_NAME = os.getenv("DB_NAME", "sana_db")
+BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", "100"))
+
+
+def build_buckets(user_id: str, session_id: str, messages: list) -> list:
+    buckets = []
+    current = None
+    for msg in messages:
+        ts = msg["timestamp"]
+        day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+        if current is None or current["day"] != day or current["count"] >= BUCKET_SIZE:
+            current = {
+                "user_id": user_id,
+                "session_id": session_id,
+                "day": day,
+                "count": 0,
+                "first_timestamp": ts,
+                "last_timestamp": ts,
+                "messages": []
+            }
+            buckets.append(current)
+        current["messages"].append({"_id": msg["_id"], "role": msg["role"], "content": msg["content"], "timestamp": ts})
+        current["count"] += 1
+        current["last_timestamp"] = ts
+    return buckets
+
+
+def migrate(delete_source: bool = False):
+    print(f"Connecting to {MONGO_DETAILS}...")
+    client = pymongo.MongoClient(MONGO_DETAILS)
+    db = client[DB_NAME]
+
+    sessions = db.chat_history.aggregate([
+        {"$group": {"_id": {"user_id": "$user_id", "session_id": "$session_id"}}}
+    ], allowDiskUse=True)
+
+    sessions_total = messages_total = buckets_total = 0
+    for session in sessions:
+        key = {"user_id": session["_id"]["user_id"], "session_id": session["_id"]["session_id"]}
+
+        already = set(db.chat_buckets.distinct("messages._id", key))
+        messages = [
+            m for m in db.chat_history.find(key, {"user_id": 0, "session_id": 0}).sort([("timestamp", 1), ("_id", 1)])
+            if m["_id"] not in already
+        ]
+
+        buckets = build_buckets(key["user_id"], key["session_id"], messages)
+        if buckets:
+            db.chat_buckets.insert_many(buckets)
+
+        if delete_source:
+            db.chat_history.delete_many(key)
+
+        sessions_total += 1
+        messages_total += len(messages)
+        buckets_total += len(buckets)
+
+    print(f"✅ Migrated {sessions_total} sessions ({messages_total} messages -> {buckets_total} buckets).")
+    if delete_source:
+        print("🗑️ Source chat_history documents removed for migrated sessions.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate chat_history into bucketed chat storage")
+    parser.add_argument("--delete-source", action="store_true", help="Delete migrated chat_history documents")
+    args = parser.parse_args()
+    migrate(delete_source=args.delete_source)
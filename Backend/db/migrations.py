@@ -0,0 +1,384 @@
+"""
+Versioned index and schema migrations.
+
+Indexes are declared per collection in INDEXES; MIGRATIONS lists numbered
+steps that either ensure a set of collections' indexes or run a data
+change. Every step is idempotent. The applied version is recorded in the
+schema_migrations collection, so only newer steps run. A failed step stops
+the chain and raises MigrationError, so the app refuses to start without
+the unique indexes and backfills later code relies on.
+
+Runs at startup from the app lifespan (MIGRATE_ON_STARTUP), or by hand:
+    python -m db.migrations            # apply pending migrations
+    python -m db.migrations --status   # show applied/pending versions
+    python -m db.migrations --explain  # report hot queries that fall back to collection scans
+"""
+import os
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+class MigrationError(Exception):
+    pass
+
+# --- Index declarations, per collection ---
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "chat_history": [
+        # Newest-N window and summary folds: equality on user/session, ordered by time (_id breaks ties)
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)], name="user_session_timestamp"),
+    ],
+    "appointments": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created_at"),
+        IndexModel([("doctor_id", ASCENDING), ("created_at", DESCENDING)], name="doctor_created_at"),
+        IndexModel([("doctor_id", ASCENDING), ("scheduled_time", ASCENDING)], name="doctor_scheduled_time"),
+        # Open emergency requests, recovered into the dispatch queue at startup
+        IndexModel([("type", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)], name="type_status_created_at"),
+    ],
+    "calendar_slots": [
+        # One booking per doctor per slot: the conflict check is the insert itself
+        IndexModel([("doctor_id", ASCENDING), ("slot_start", ASCENDING)], name="doctor_slot_unique", unique=True),
+        IndexModel([("appointment_id", ASCENDING)], name="appointment_id"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "weekly_sessions": [
+        IndexModel([("user_id", ASCENDING), ("week_id", ASCENDING), ("status", ASCENDING)], name="user_week_status"),
+    ],
+    "posts": [
+        # Keyset-paginated feed; also serves plain created_at sorts as its prefix
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)], name="created_at_id"),
+        # Forum search
+        IndexModel([("content", TEXT)], name="content_text"),
+        # Moderation sweeper: oldest pending first
+        IndexModel([("moderation_status", ASCENDING), ("created_at", ASCENDING)], name="moderation_status_created_at"),
+    ],
+    "post_likes": [
+        IndexModel([("post_id", ASCENDING), ("user_id", ASCENDING)], name="post_user_unique", unique=True),
+    ],
+    "replies": [
+        IndexModel([("post_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="post_created_at"),
+        IndexModel([("content", TEXT)], name="content_text"),
+        IndexModel([("moderation_status", ASCENDING), ("created_at", ASCENDING)], name="moderation_status_created_at"),
+    ],
+    "reports": [
+        IndexModel([("user_id", ASCENDING), ("generated_at", DESCENDING)], name="user_generated_at"),
+    ],
+    "chat_summaries": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], name="user_session_unique", unique=True),
+    ],
+    "chat_memory_vectors": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], name="user_session"),
+    ],
+    "chat_buckets": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("day", ASCENDING), ("count", ASCENDING)], name="user_session_day_count"),
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("last_timestamp", DESCENDING), ("_id", DESCENDING)], name="user_session_last_timestamp"),
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("first_timestamp", ASCENDING), ("_id", ASCENDING)], name="user_session_first_timestamp"),
+        IndexModel([("messages._id", ASCENDING)], name="message_ids"),
+    ],
+    "chat_sessions": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)], name="user_session_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("last_activity", DESCENDING), ("_id", DESCENDING)], name="user_last_activity"),
+    ],
+}
+
+
+async def ensure_indexes(db, collections: List[str]):
+    for name in collections:
+        created = await db[name].create_indexes(INDEXES[name])
+        print(f"   • {name}: {', '.join(created)}")
+
+
+# --- Data migrations ---
+
+async def _backfill_chat_sessions(db):
+    """Builds chat_sessions entries for conversations saved before the session index existed."""
+    await db["chat_history"].aggregate([
+        {"$sort": {"timestamp": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "session_id": "$session_id"},
+            "message_count": {"$sum": 1},
+            "created_at": {"$first": "$timestamp"},
+            "last_activity": {"$last": "$timestamp"},
+            "last_message": {"$last": {"$substrCP": ["$content", 0, 120]}},
+            "last_role": {"$last": "$role"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "session_id": "$_id.session_id",
+            "message_count": 1,
+            "created_at": 1,
+            "last_activity": 1,
+            "last_message": 1,
+            "last_role": 1
+        }},
+        # Sessions already tracked keep their live counters
+        {"$merge": {"into": "chat_sessions", "on": ["user_id", "session_id"], "whenMatched": "keepExisting", "whenNotMatched": "insert"}}
+    ], allowDiskUse=True).to_list(length=None)
+
+
+async def _add_session_versions(db):
+    """Versioned (optimistic) session writes match on `version`, so older sessions need one."""
+    for name in ("assessments", "weekly_sessions"):
+        await db[name].update_many({"version": {"$exists": False}}, {"$set": {"version": 0}})
+
+
+async def _split_post_replies(db):
+    """Moves replies embedded in posts into the replies collection and leaves a reply_count behind."""
+    async for post in db["posts"].find({"replies": {"$exists": True}}, {"replies": 1}):
+        post_id = str(post["_id"])
+        docs = []
+        for r in post.get("replies") or []:
+            reply_id = r.get("id")
+            docs.append({
+                "_id": ObjectId(reply_id) if ObjectId.is_valid(reply_id or "") else ObjectId(),
+                "post_id": post_id,
+                "user_id": r.get("user_id"),
+                "username": r.get("username", "Anonymous"),
+                "content": r.get("content", ""),
+                "created_at": r.get("created_at") or post["_id"].generation_time.replace(tzinfo=None)
+            })
+        if docs:
+            # Re-runnable: replies copied by an interrupted earlier run are skipped
+            existing = set(await db["replies"].distinct("_id", {"_id": {"$in": [d["_id"] for d in docs]}}))
+            fresh = [d for d in docs if d["_id"] not in existing]
+            if fresh:
+                await db["replies"].insert_many(fresh, ordered=False)
+        await db["posts"].update_one(
+            {"_id": post["_id"]},
+            {"$set": {"reply_count": len(docs)}, "$unset": {"replies": ""}}
+        )
+    await db["posts"].update_many({"reply_count": {"$exists": False}}, {"$set": {"reply_count": 0}})
+
+
+async def _split_post_likes(db):
+    """Moves liked_by arrays into post_likes and resets likes to the real count."""
+    async for post in db["posts"].find({"liked_by": {"$exists": True}}, {"liked_by": 1, "created_at": 1}):
+        post_id = str(post["_id"])
+        user_ids = list(dict.fromkeys(post.get("liked_by") or []))
+        if user_ids:
+            ops = [
+                UpdateOne({"post_id": post_id, "user_id": u}, {"$setOnInsert": {"created_at": post.get("created_at")}}, upsert=True)
+                for u in user_ids
+            ]
+            await db["post_likes"].bulk_write(ops, ordered=False)
+        await db["posts"].update_one(
+            {"_id": post["_id"]},
+            {"$set": {"likes": len(user_ids)}, "$unset": {"liked_by": ""}}
+        )
+
+
+async def _backfill_doctor_load(db):
+    """Rebuilds doctor_load (open appointments per doctor) from appointments."""
+    pipeline = [
+        {"$match": {"status": {"$in": ["requested", "booked", "live"]}}},
+        {"$group": {"_id": "$doctor_id", "active": {"$sum": 1}, "booked_times": {"$addToSet": "$scheduled_time"}}},
+    ]
+    async for row in db["appointments"].aggregate(pipeline):
+        booked_times = [t for t in row["booked_times"] if t is not None]
+        await db["doctor_load"].update_one(
+            {"_id": row["_id"]},
+            {"$set": {"active": row["active"], "booked_times": booked_times}},
+            upsert=True
+        )
+
+
+async def _backfill_calendar_slots(db):
+    """Reserves calendar slots for open scheduled appointments; the calendar replaces doctor_load.booked_times."""
+    from services.calendar_service import SLOT_MINUTES
+    query = {"status": {"$in": ["requested", "booked", "live"]}, "scheduled_time": {"$ne": None}}
+    async for appt in db["appointments"].find(query, {"doctor_id": 1, "user_id": 1, "scheduled_time": 1}):
+        await db["calendar_slots"].update_one(
+            {"doctor_id": appt["doctor_id"], "slot_start": appt["scheduled_time"]},
+            {"$setOnInsert": {
+                "slot_end": appt["scheduled_time"] + timedelta(minutes=SLOT_MINUTES),
+                "appointment_id": str(appt["_id"]),
+                "user_id": appt["user_id"],
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+    await db["doctor_load"].update_many({}, {"$unset": {"booked_times": ""}})
+
+
+async def _drop_posts_created_at(db):
+    """The compound created_at_id index covers created_at as its prefix."""
+    if "created_at" in await db["posts"].index_information():
+        await db["posts"].drop_index("created_at")
+
+
+# --- Migration list ---
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    # Collections whose INDEXES are ensured by this step
+    indexes: List[str] = field(default_factory=list)
+    # Optional data/schema change, run after the indexes
+    apply: Optional[Callable[..., Awaitable[None]]] = None
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Indexes for hot chat, appointment, user, weekly, forum and report queries",
+              indexes=["chat_history", "appointments", "users", "weekly_sessions", "posts", "reports"]),
+    Migration(2, "Indexes for chat summaries, memory vectors, buckets and sessions",
+              indexes=["chat_summaries", "chat_memory_vectors", "chat_buckets", "chat_sessions"]),
+    Migration(3, "Backfill chat_sessions from existing chat_history",
+              apply=_backfill_chat_sessions),
+    Migration(4, "Add version field to assessment and weekly sessions",
+              apply=_add_session_versions),
+    Migration(5, "Split forum replies into their own collection; feed pagination indexes",
+              indexes=["posts", "replies"], apply=_split_post_replies),
+    Migration(6, "Move post likes into post_likes (unique per user)",
+              indexes=["post_likes"], apply=_split_post_likes),
+    Migration(7, "Text indexes for forum search",
+              indexes=["posts", "replies"]),
+    Migration(8, "Moderation status indexes on posts and replies",
+              indexes=["posts", "replies"]),
+    Migration(9, "Backfill per-doctor load for automatic assignment",
+              apply=_backfill_doctor_load),
+    Migration(10, "Calendar slot reservations (unique per doctor and start)",
+              indexes=["appointments", "calendar_slots"], apply=_backfill_calendar_slots),
+    Migration(11, "Index open emergency requests for dispatch",
+              indexes=["appointments"]),
+    Migration(12, "Drop the posts created_at index (prefix of created_at_id)",
+              apply=_drop_posts_created_at),
+]
+
+
+async def get_applied_version(db) -> int:
+    doc = await db[MIGRATIONS_COLLECTION].find_one({"_id": "schema"})
+    return doc.get("version", 0) if doc else 0
+
+
+async def apply_migrations(db) -> int:
+    """
+    Applies every migration newer than the recorded version. Returns the
+    resulting version. Raises MigrationError on the first failing step; steps
+    before it stay recorded, and it is retried on the next run.
+    """
+    current = await get_applied_version(db)
+    pending = [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version > current]
+    if not pending:
+        print(f"✅ Schema up to date (version {current})")
+        return current
+
+    for migration in pending:
+        print(f"🔧 Applying migration {migration.version}: {migration.description}")
+        try:
+            if migration.indexes:
+                await ensure_indexes(db, migration.indexes)
+            if migration.apply:
+                await migration.apply(db)
+        except Exception as e:
+            # e.g. a unique index over existing duplicates; serving without it would allow the duplicates it prevents
+            print(f"❌ Migration {migration.version} failed: {e}")
+            raise MigrationError(f"Migration {migration.version} ({migration.description}) failed at version {current}: {e}") from e
+
+        await db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": "schema"},
+            {
+                "$set": {"version": migration.version, "updated_at": datetime.utcnow()},
+                "$push": {"applied": {"version": migration.version, "description": migration.description, "applied_at": datetime.utcnow()}}
+            },
+            upsert=True
+        )
+        current = migration.version
+
+    print(f"✅ Schema migrated to version {current}")
+    return current
+
+
+# --- Collection scan report ---
+
+# (collection, filter, sort) for the queries the services run on every request
+HOT_QUERIES = [
+    ("chat_history", {"user_id": "x", "session_id": "x"}, [("timestamp", -1), ("_id", -1)]),
+    ("chat_buckets", {"user_id": "x", "session_id": "x"}, [("last_timestamp", -1), ("_id", -1)]),
+    ("chat_sessions", {"user_id": "x"}, [("last_activity", -1), ("_id", -1)]),
+    ("chat_summaries", {"user_id": "x", "session_id": "x"}, None),
+    ("chat_memory_vectors", {"user_id": "x"}, None),
+    ("appointments", {"user_id": "x"}, [("created_at", -1)]),
+    ("appointments", {"doctor_id": "x"}, [("created_at", -1)]),
+    ("calendar_slots", {"doctor_id": {"$in": ["x", "y"]}, "slot_start": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 1, 8)}}, None),
+    ("users", {"email": "x@example.com"}, None),
+    ("weekly_sessions", {"user_id": "x", "week_id": "x", "status": "completed"}, None),
+    ("posts", {}, [("created_at", -1), ("_id", -1)]),
+    ("replies", {"post_id": "x"}, [("created_at", 1), ("_id", 1)]),
+    ("reports", {"user_id": "x"}, [("generated_at", -1)]),
+]
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def report_collection_scans(db) -> List[dict]:
+    """Explains each hot query and returns the ones whose winning plan is a COLLSCAN."""
+    scans = []
+    for collection, query, sort in HOT_QUERIES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        try:
+            explain = await db.command("explain", command, verbosity="queryPlanner")
+        except OperationFailure as e:
+            print(f"⚠️ Could not explain {collection} {query}: {e}")
+            continue
+
+        stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        if "COLLSCAN" in stages:
+            scans.append({"collection": collection, "filter": query, "sort": sort})
+            print(f"⚠️ COLLSCAN: {collection} filter={list(query)} sort={[s[0] for s in sort] if sort else None}")
+
+    if not scans:
+        print("✅ All hot queries are index-backed")
+    return scans
+
+
+async def _main():
+    from db.database import connect_to_mongo, close_mongo_connection, get_database
+
+    parser = argparse.ArgumentParser(description="Apply MongoDB index/schema migrations")
+    parser.add_argument("--status", action="store_true", help="Show applied and pending migrations")
+    parser.add_argument("--explain", action="store_true", help="Report hot queries that would run as collection scans")
+    args = parser.parse_args()
+
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        if args.status:
+            current = await get_applied_version(db)
+            for m in sorted(MIGRATIONS, key=lambda m: m.version):
+                state = "applied" if m.version <= current else "pending"
+                print(f"  [{state}] {m.version}: {m.description}")
+        elif args.explain:
+            await report_collection_scans(db)
+        else:
+            try:
+                await apply_migrations(db)
+            except MigrationError:
+                raise SystemExit(1)
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
@@ -0,0 +1,197 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from pymongo import monitoring
+
+# Commands slower than this are kept as samples (shape only, never values)
+SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", "100"))
+SLOW_QUERY_SAMPLES = int(os.getenv("MONGO_SLOW_QUERY_SAMPLES", "50"))
+
+# Histogram bucket upper bounds in ms; the last bucket is everything above
+BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+IGNORED_COMMANDS = {"ping", "hello", "isMaster", "ismaster", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, failed: bool = False):
+        self.counts[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.errors += 1 if failed else 0
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile (None if above the last bound)."""
+        if not self.count:
+            return 0.0
+        target = self.count * p
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+        return None
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": {f"le_{b}": c for b, c in zip(BUCKETS_MS, self.counts)} | {"inf": self.counts[-1]}
+        }
+
+
+def _shape(command: dict, name: str) -> dict:
+    # Field names of the filter/sort, so slow samples show the query shape without user data
+    shape = {}
+    for key in ("filter", "q", "query", "sort"):
+        if isinstance(command.get(key), dict):
+            shape[key] = sorted(command[key].keys())
+    if name == "aggregate":
+        shape["pipeline"] = [next(iter(stage), None) for stage in command.get("pipeline", [])]
+    return shape
+
+
+class MongoMetrics(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """
+    pymongo command + connection pool listener. Records latency histograms
+    per (collection, operation), pool checkout waits per server, and a ring
+    of slow-command samples. Listener callbacks run on driver threads, so
+    everything is behind a lock and kept cheap.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.checkout_waits: Dict[str, LatencyHistogram] = {}
+        self.slow: deque = deque(maxlen=SLOW_QUERY_SAMPLES)
+        self.in_flight: Dict[Tuple, Tuple[str, dict]] = {}
+        self.pool_events = {"created": 0, "closed": 0, "checkout_failed": 0, "pool_cleared": 0}
+        self.checkout_started = threading.local()
+
+    # --- CommandListener ---
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = event.database_name
+        with self.lock:
+            self.in_flight[(event.request_id, event.connection_id)] = (collection, _shape(event.command, event.command_name))
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        elapsed_ms = event.duration_micros / 1000
+        with self.lock:
+            collection, shape = self.in_flight.pop((event.request_id, event.connection_id), ("?", {}))
+            key = (collection, event.command_name)
+            histogram = self.commands.get(key)
+            if histogram is None:
+                histogram = self.commands[key] = LatencyHistogram()
+            histogram.record(elapsed_ms, failed)
+            if elapsed_ms >= SLOW_QUERY_MS:
+                self.slow.append({
+                    "at": time.time(),
+                    "collection": collection,
+                    "command": event.command_name,
+                    "ms": round(elapsed_ms, 2),
+                    "failed": failed,
+                    **shape
+                })
+
+    # --- ConnectionPoolListener ---
+
+    def connection_check_out_started(self, event):
+        self.checkout_started.at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self._record_wait(event)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.pool_events["checkout_failed"] += 1
+        self._record_wait(event)
+
+    def _record_wait(self, event):
+        # pymongo >= 4.7 reports the wait itself; older drivers time it per thread
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            started = getattr(self.checkout_started, "at", None)
+            if started is None:
+                return
+            duration = time.perf_counter() - started
+        server = "%s:%s" % event.address
+        with self.lock:
+            histogram = self.checkout_waits.get(server)
+            if histogram is None:
+                histogram = self.checkout_waits[server] = LatencyHistogram()
+            histogram.record(duration * 1000)
+
+    def connection_created(self, event):
+        with self.lock:
+            self.pool_events["created"] += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.pool_events["closed"] += 1
+
+    def pool_cleared(self, event):
+        with self.lock:
+            self.pool_events["pool_cleared"] += 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_checked_in(self, event): pass
+
+    # --- Export ---
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            by_collection: Dict[str, Dict[str, dict]] = {}
+            for (collection, command), histogram in sorted(self.commands.items()):
+                by_collection.setdefault(collection, {})[command] = histogram.as_dict()
+            return {
+                "commands": by_collection,
+                "checkout_wait": {server: h.as_dict() for server, h in self.checkout_waits.items()},
+                "pool": dict(self.pool_events),
+                "slow_queries": list(self.slow),
+                "slow_query_ms": SLOW_QUERY_MS
+            }
+
+
+# Singleton instance
+mongo_metrics = MongoMetrics()
+
+
+def slowest_commands(limit: int = 10) -> List[dict]:
+    """Collections/operations ranked by total time spent, for a quick look at where Mongo time goes."""
+    with mongo_metrics.lock:
+        ranked = sorted(mongo_metrics.commands.items(), key=lambda kv: kv[1].total_ms, reverse=True)[:limit]
+        return [{"collection": c, "command": op, "total_ms": round(h.total_ms, 2), "count": h.count} for (c, op), h in ranked]
@@ -26,7 +26,16 @@ from routes.report import router as report_router
 from routes.doctor import router as doctor_router
 from routes.appointment import router as appointment_router
 from routes.forum import router as forum_router
-from services.chat_service import save_message, get_chat_history
+from routes.metrics import router as metrics_router
+from routes.dispatch import router as dispatch_router
+from services.chat_service import save_message, chat_writer
+from services import memory_service
+from services.long_term_memory import long_term_memory, format_memories, MEMORY_TOP_K
+from services.intent_router import intent_router
+from services.event_bus import event_bus
+from services.moderation import moderation
+from services.emergency_dispatch import dispatcher
+from services.tool_registry import ToolContext, execute_tool_calls, merge_tool_results
 from utils.security import get_current_user_id
 # ... (previous imports)
 from rag.rag_chain import rag_chain
@@ -62,7 +71,7 @@ You have access to tools. You must detect the user's intent and use the appropri
 
 1. BOOKING (Intent: "I want to see a doctor", "Book appointment", "I need help"):
    - Tool Name: "book_appointment"
-   - Params: "type" ("normal"|"emergency"), "doctor_id" ("auto"|"specific_id"), "scheduled_time" (ISO or null).
+   - Params: "type" ("normal"|"emergency"), "doctor_id" ("auto"|"specific_id"), "scheduled_time" (ISO or null), "specialization" (optional, e.g. "Psychiatrist", only with "auto").
 
 2. CHECK APPOINTMENTS (Intent: "When is my appointment?", "Do I have any appointments?", "What's my schedule?"):
    - Tool Name: "check_appointments"
@@ -82,13 +91,14 @@ You have access to tools. You must detect the user's intent and use the appropri
 
 Output JSON Format:
 {{
-  "text": "your verbal response here (or empty if using knowledge base tool, as it will replace this)",
+  "text": "your verbal response here; when calling a tool, a short lead-in only (the tool result is appended after it, so do not state its outcome; leave empty for the knowledge base tool)",
   "facialExpression": "choose from valid expressions",
   "animation": "choose from valid animations",
   "tool_call": {{
       "name": "book_appointment" | "check_appointments" | "cancel_appointment" | "consult_knowledge_base",
       "parameters": {{ ... }}
-  }} // OPTIONAL
+  }}, // OPTIONAL
+  "tool_calls": [ {{ "name": "...", "parameters": {{ ... }} }} ] // OPTIONAL - use instead of tool_call when the user asks for several things at once
 }}
 """
 
@@ -99,11 +109,27 @@ Output JSON Format:
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    # Indexes and schema migrations
+    from db.database import get_database
+    from db.migrations import apply_migrations, MIGRATE_ON_STARTUP
+    if MIGRATE_ON_STARTUP:
+        await apply_migrations(get_database())
     # Seed doctors
     from services.doctor_service import seed_doctors
     await seed_doctors()
+    from services.doctor_directory import doctor_directory
+    doctor_directory.start()
+    chat_writer.start()
+    await event_bus.start()
+    moderation.start()
+    await dispatcher.start()
     yield
     # Shutdown
+    await dispatcher.stop()
+    await moderation.stop()
+    await event_bus.stop()
+    await chat_writer.stop()
+    await doctor_directory.stop()
     await close_mongo_connection()
 
 app = FastAPI(lifespan=lifespan)
@@ -112,6 +138,7 @@ app = FastAPI(lifespan=lifespan)
 class ChatRequest(BaseModel):
     message: str
     sessionId: str = "default"
+    language: str = "en"
 
 app.add_middleware(
     CORSMiddleware,
@@ -119,6 +146,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Register Routers
@@ -129,44 +157,79 @@ app.include_router(report_router)
 app.include_router(doctor_router)
 app.include_router(appointment_router)
 app.include_router(forum_router)
+app.include_router(metrics_router)
+app.include_router(dispatch_router)
 app.include_router(assessment_router)
 from routes.weekly_assignment import router as weekly_router
 app.include_router(weekly_router)
 
-async def process_with_groq(user_message: str, session_id: str, user_id: str):
-    # Fetch history from MongoDB
-    history_objs = await get_chat_history(user_id, session_id, limit=20)
-    
-    # Build messages for Groq
-    messages = [{"role": "system", "content": SYSTEM_INSTRUCTION}]
-    
-    # Add conversation history
-    for msg in history_objs:
-        messages.append({"role": msg.role, "content": msg.content})
-    
-    # Add current user message
-    messages.append({"role": "user", "content": user_message})
-    
+async def polish_with_groq(draft: str) -> str:
+    # Optional rewrite of a rendered tool response, bounded by templates.polish
+    completion = await asyncio.to_thread(
+        groq_client.chat.completions.create,
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": "You are SANA, a warm AI health companion. Rewrite the message naturally and warmly. Keep every fact, date and name unchanged."},
+            {"role": "user", "content": draft}
+        ],
+        temperature=0.7,
+        max_tokens=200
+    )
+    return completion.choices[0].message.content
+
+async def process_with_groq(user_message: str, session_id: str, user_id: str, language: str = "en"):
     try:
-        print(f"Sending message to Groq (llama-3.3-70b)...")
-        
-        # Call Groq API with JSON mode
-        completion = await asyncio.to_thread(
-            groq_client.chat.completions.create,
-            model="llama-3.3-70b-versatile",
-            messages=messages,
-            response_format={"type": "json_object"},
-            temperature=0.7,
-            max_tokens=300
-        )
-        
-        print("✅ Groq response received.")
-        
-        # Parse response
-        response_text = completion.choices[0].message.content
-        print(f"Raw Response: {response_text}")
-        
-        response_json = json.loads(response_text)
+        # Local intent routing: confident read-only intents skip the first LLM round trip
+        routed_tool = await intent_router.route(user_message)
+
+        if routed_tool:
+            response_json = {
+                "text": "...",
+                "facialExpression": "default",
+                "animation": "Talking",
+                "tool_call": routed_tool
+            }
+        else:
+            # Build messages for Groq
+            messages = [{"role": "system", "content": SYSTEM_INSTRUCTION}]
+            
+            # Conversation history (rolling summary + recent turns) and long-term memories, fetched together
+            history_messages, memories = await asyncio.gather(
+                memory_service.build_history_messages(user_id, session_id),
+                # Over-fetch so enough remain after dropping snippets already in the recent turns
+                long_term_memory.search(user_id, user_message, k=MEMORY_TOP_K * 2)
+            )
+
+            # Only inject past snippets that aren't already in the recent turns
+            recent_contents = {m["content"] for m in history_messages}
+            memory_text = format_memories([m for m in memories if m["content"] not in recent_contents][:MEMORY_TOP_K])
+            if memory_text:
+                messages.append({"role": "system", "content": memory_text})
+
+            messages.extend(history_messages)
+            
+            # Add current user message
+            messages.append({"role": "user", "content": user_message})
+
+            print(f"Sending message to Groq (llama-3.3-70b)...")
+            
+            # Call Groq API with JSON mode
+            completion = await asyncio.to_thread(
+                groq_client.chat.completions.create,
+                model="llama-3.3-70b-versatile",
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0.7,
+                max_tokens=300
+            )
+            
+            print("✅ Groq response received.")
+            
+            # Parse response
+            response_text = completion.choices[0].message.content
+            print(f"Raw Response: {response_text}")
+            
+            response_json = json.loads(response_text)
         
         # Validate response structure
         if "text" not in response_json:
@@ -181,218 +244,27 @@ async def process_with_groq(user_message: str, session_id: str, user_id: str):
             response_json["animation"] = "Talking"
 
         # --- TOOL CALL HANDLING ---
-        if "tool_call" in response_json and response_json["tool_call"]:
-            tool = response_json["tool_call"]
-            tool_name = tool.get("name")
-            print(f"🛠️ Executing Tool: {tool_name}")
-            params = tool.get("parameters", {})
-
-            if tool_name == "book_appointment":
-                # Execute booking logic
-                from services.appointment_service import book_appointment
-                appt_data = params.copy()
-                
-                # Handle 'auto' doctor assignment
-                if appt_data.get("doctor_id") == "auto":
-                    from services.doctor_service import get_all_doctors
-                    doctors = await get_all_doctors()
-                    if doctors:
-                        appt_data["doctor_id"] = str(doctors[0].id)
-                
-                try:
-                    new_appt = await book_appointment(user_id, appt_data)
-                    print(f"✅ Tool Success: Appointment {new_appt.id} created.")
-                    response_json["data"] = {
-                        "action": "appointment_booked",
-                        "appointment_id": str(new_appt.id)
-                    }
-                except Exception as e:
-                    print(f"❌ Tool Failed: {e}")
-                    response_json["text"] = "I tried to book the appointment, but something went wrong. Please try again."
-
-            elif tool_name == "check_appointments":
-                # Retrieve user's appointments
-                from services.appointment_service import get_patient_appointments
-                from services.doctor_service import get_all_doctors
-                
-                try:
-                    appointments = await get_patient_appointments(user_id)
-                    print(f"📅 Retrieved {len(appointments)} appointments for user")
-                    
-                    if not appointments:
-                        response_json["text"] = "You don't have any appointments scheduled at the moment. Would you like me to help you book one?"
-                        response_json["facialExpression"] = "default"
-                    else:
-                        # Get doctor names for better context
-                        doctors = await get_all_doctors()
-                        doctor_map = {str(d.id): d.name for d in doctors}
-                        
-                        # Format appointment info for LLM context
-                        appt_summaries = []
-                        for idx, appt in enumerate(appointments[:5], 1):  # Limit to 5 most recent
-                            doctor_name = doctor_map.get(appt.doctor_id, "a doctor")
-                            time_str = appt.scheduled_time.strftime("%B %d at %I:%M %p") if appt.scheduled_time else "pending scheduling"
-                            appt_summaries.append(f"{idx}. {appt.type.capitalize()} appointment with Dr. {doctor_name} on {time_str} (Status: {appt.status}, ID: {str(appt.id)})")
-                        
-                        context_info = "\n".join(appt_summaries)
-                        
-                        # Store appointment IDs in response for potential follow-up cancellations
-                        response_json["data"] = {
-                            "action": "appointments_listed",
-                            "appointments": [
-                                {
-                                    "id": str(appt.id),
-                                    "doctor_id": appt.doctor_id,
-                                    "type": appt.type,
-                                    "scheduled_time": appt.scheduled_time.isoformat() if appt.scheduled_time else None,
-                                    "status": appt.status
-                                } for appt in appointments[:5]
-                            ]
-                        }
-                        
-                        # Re-prompt LLM with appointment context to generate natural response
-                        contextual_prompt = f"""The user asked about their appointments. Here are their current appointments:
-
-{context_info}
-
-Please summarize this information conversationally and warmly, as SANA would."""
-                        
-                        from groq import Groq
-                        contextual_completion = await asyncio.to_thread(
-                            groq_client.chat.completions.create,
-                            model="llama-3.3-70b-versatile",
-                            messages=[
-                                {"role": "system", "content": "You are SANA, a warm AI health companion. Summarize appointment info naturally."},
-                                {"role": "user", "content": contextual_prompt}
-                            ],
-                            temperature=0.7,
-                            max_tokens=200
-                        )
-                        
-                        natural_response = contextual_completion.choices[0].message.content
-                        response_json["text"] = natural_response.strip()
-                        response_json["facialExpression"] = "happy"
-                        response_json["animation"] = "Talking"
-                        
-                except Exception as e:
-                    print(f"❌ Check Appointments Failed: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    response_json["text"] = "I'm having trouble checking your appointments right now. Could you try again?"
-
-            elif tool_name == "cancel_appointment":
-                # Cancel an appointment
-                from services.appointment_service import update_appointment_status, get_appointment, get_patient_appointments
-                from services.doctor_service import get_all_doctors
-                
-                appointment_id = params.get("appointment_id")
-                
-                # If no ID provided, try to intelligently figure out which appointment to cancel
-                if not appointment_id:
-                    try:
-                        appointments = await get_patient_appointments(user_id)
-                        # Filter only active appointments (not cancelled or completed)
-                        active_appointments = [a for a in appointments if a.status not in ["cancelled", "completed"]]
-                        
-                        if not active_appointments:
-                            response_json["text"] = "You don't have any active appointments to cancel right now."
-                            response_json["facialExpression"] = "default"
-                        elif len(active_appointments) == 1:
-                            # Only one active appointment - cancel it directly
-                            appt = active_appointments[0]
-                            updated = await update_appointment_status(str(appt.id), "cancelled")
-                            if updated:
-                                doctors = await get_all_doctors()
-                                doctor_map = {str(d.id): d.name for d in doctors}
-                                doctor_name = doctor_map.get(appt.doctor_id, "your doctor")
-                                time_str = appt.scheduled_time.strftime("%B %d at %I:%M %p") if appt.scheduled_time else "pending"
-                                
-                                print(f"✅ Auto-cancelled appointment {appt.id}")
-                                response_json["text"] = f"I've cancelled your {appt.type} appointment with Dr. {doctor_name} scheduled for {time_str}. Would you like to reschedule or is there anything else I can help with?"
-                                response_json["facialExpression"] = "default"
-                                response_json["animation"] = "Talking"
-                            else:
-                                response_json["text"] = "I had trouble cancelling that appointment. Could you try again?"
-                        else:
-                            # Multiple active appointments - list them
-                            doctors = await get_all_doctors()
-                            doctor_map = {str(d.id): d.name for d in doctors}
-                            
-                            appt_list = []
-                            for idx, appt in enumerate(active_appointments, 1):
-                                doctor_name = doctor_map.get(appt.doctor_id, "a doctor")
-                                time_str = appt.scheduled_time.strftime("%B %d at %I:%M %p") if appt.scheduled_time else "pending"
-                                appt_list.append(f"{idx}. {appt.type.capitalize()} with Dr. {doctor_name} on {time_str}")
-                            
-                            appt_text = "\n".join(appt_list)
-                            response_json["text"] = f"You have multiple appointments. Which one would you like to cancel?\n\n{appt_text}\n\nJust tell me the number or describe which one."
-                            response_json["facialExpression"] = "default"
-                            
-                            # Store appointment IDs for potential follow-up
-                            response_json["data"] = {
-                                "action": "awaiting_cancellation_choice",
-                                "appointments": [
-                                    {
-                                        "id": str(appt.id),
-                                        "index": idx,
-                                        "doctor_id": appt.doctor_id,
-                                        "scheduled_time": appt.scheduled_time.isoformat() if appt.scheduled_time else None
-                                    } for idx, appt in enumerate(active_appointments, 1)
-                                ]
-                            }
-                    except Exception as e:
-                        print(f"❌ Auto-cancel Failed: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        response_json["text"] = "I'm having trouble accessing your appointments. Could you try again?"
-                else:
-                    # Appointment ID was provided - cancel it directly
-                    try:
-                        # Verify appointment exists and belongs to user
-                        appt = await get_appointment(appointment_id)
-                        if not appt:
-                            response_json["text"] = "I couldn't find that appointment. Would you like me to show you your current appointments?"
-                            response_json["facialExpression"] = "sad"
-                        elif appt.user_id != user_id:
-                            response_json["text"] = "I'm sorry, but I can't cancel that appointment as it doesn't belong to you."
-                            response_json["facialExpression"] = "sad"
-                        else:
-                            # Cancel the appointment
-                            updated = await update_appointment_status(appointment_id, "cancelled")
-                            if updated:
-                                print(f"✅ Appointment {appointment_id} cancelled successfully")
-                                response_json["text"] = "I've cancelled that appointment for you. Is there anything else I can help you with? If you'd like to reschedule, just let me know."
-                                response_json["facialExpression"] = "default"
-                                response_json["animation"] = "Talking"
-                            else:
-                                response_json["text"] = "I had trouble cancelling that appointment. Could you try again?"
-                                response_json["facialExpression"] = "sad"
-                    except Exception as e:
-                        print(f"❌ Cancel Appointment Failed: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        response_json["text"] = "I'm having trouble cancelling that appointment right now. Please try again."
-
-            elif tool_name == "consult_knowledge_base":
-                # RAG Logic
-                query = params.get("query", user_message)
-                print(f"🧠 RAG Query: {query}")
-                
-                rag_response = await rag_chain.generate_response(query)
-                
-                if rag_response:
-                    print("✅ RAG Response generated.")
-                    response_json["text"] = rag_response
-                    # Adjust expression for supportive tone
-                    response_json["facialExpression"] = "default" 
-                    response_json["animation"] = "Talking"
-                else:
-                     print("⚠️ RAG returned None, falling back.")
-                     response_json["text"] = "I want to be careful here. I don't have enough verified information to answer that safely. Let's talk to a professional."
+        tool_calls = response_json.get("tool_calls") or []
+        if not isinstance(tool_calls, list):
+            tool_calls = [tool_calls]
+        if response_json.get("tool_call"):
+            tool_calls = [response_json["tool_call"]] + tool_calls
+
+        if tool_calls:
+            ctx = ToolContext(
+                user_id=user_id,
+                session_id=session_id,
+                user_message=user_message,
+                language=language,
+                polish=polish_with_groq
+            )
+            results = await execute_tool_calls(tool_calls, ctx)
+            merge_tool_results(response_json, results)
 
         # Save interaction to MongoDB
         await save_message(user_id=user_id, role="user", content=user_message, session_id=session_id)
         await save_message(user_id=user_id, role="assistant", content=response_json["text"], session_id=session_id)
+        memory_service.schedule_fold(user_id, session_id)
         
         return response_json
     
@@ -417,7 +289,7 @@ from services.audio_utils import transcribe_audio, generate_tts
 @app.post("/chat")
 async def chat(request: ChatRequest, user_id: str = Depends(get_current_user_id)):
     try:
-        response_data = await process_with_groq(request.message, request.sessionId, user_id)
+        response_data = await process_with_groq(request.message, request.sessionId, user_id, request.language)
         return {
             "text": response_data["text"],
             "facialExpression": response_data["facialExpression"],
@@ -433,6 +305,7 @@ async def talk(
     file: UploadFile = File(...),
     sessionId: str = Form('default'),
     voiceId: str = Form('en-US-AriaNeural'),
+    language: str = Form('en'),
     user_id: str = Depends(get_current_user_id)
 ):
     try:
@@ -450,7 +323,7 @@ async def talk(
         os.unlink(temp_audio_path)
         
         # Get LLM response (saves to DB)
-        response_data = await process_with_groq(user_text, sessionId, user_id)
+        response_data = await process_with_groq(user_text, sessionId, user_id, language)
         
         # Generate TTS
         try:
@@ -11,6 +11,8 @@ class AppointmentModel(BaseModel):
     type: str = "normal" # normal, emergency
     scheduled_time: Optional[datetime] = None # Nullable for emergency
     status: str = "booked" # requested, booked, live, completed, cancelled
+    priority: int = 0 # emergencies only: higher is dispatched first
+    accepted_at: Optional[datetime] = None # emergencies only: when a doctor claimed it
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Config:
@@ -30,6 +30,8 @@ class AssessmentSession(BaseModel):
     current_depth: int = 1
     questions_answered: int = 0
     history: List[AssessmentResponseItem] = []
+    # Bumped on every write; updates are conditional on it (optimistic concurrency)
+    version: int = 0
     
     # The evolving profile
     dimensions: Dict[str, float] = {
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, BeforeValidator
-from typing import Optional, Annotated
+from typing import Optional, Annotated, Dict, Any
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
@@ -9,6 +9,10 @@ class DoctorModel(BaseModel):
     specialization: str = Field(...)
     availability_status: str = "Available" # Available, Busy, Offline
     image_url: Optional[str] = None
+    # {"days": [0-6], "start": "HH:MM", "end": "HH:MM"} in UTC; calendar defaults when unset
+    working_hours: Optional[Dict[str, Any]] = None
+    # Login account of the doctor (PUT /doctors/{id}/account); only that user may act as them in dispatch
+    user_id: Optional[str] = None
 
     class Config:
         populate_by_name = True
@@ -23,6 +23,8 @@ class WeeklySession(BaseModel):
     
     responses: List[WeeklyResponseItem] = []
     current_question_index: int = 0
+    # Bumped on every write; updates are conditional on it (optimistic concurrency)
+    version: int = 0
     
     # Hidden aggregated scores
     internal_metrics: Dict[str, Any] = {}
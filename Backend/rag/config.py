@@ -7,6 +7,12 @@ VECTOR_STORE_PATH = os.path.join(os.path.dirname(__file__), "vector_store")
 # Raw Knowledge Base Path
 KNOWLEDGE_DIR = os.path.join(os.path.dirname(__file__), "knowledge_data")
 
+# Ingest Deduplication
+# Chunks whose embeddings have cosine similarity at or above this are collapsed into one
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.95"))
+# Rows per similarity block (memory is DEDUP_BLOCK_SIZE x n floats)
+DEDUP_BLOCK_SIZE = int(os.getenv("RAG_DEDUP_BLOCK_SIZE", "512"))
+
 # Safety Settings
 SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
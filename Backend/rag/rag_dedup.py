@@ -0,0 +1,124 @@
+import numpy as np
+from typing import List, Tuple
+from rag.config import DEDUP_SIMILARITY_THRESHOLD, DEDUP_BLOCK_SIZE
+
+
+class _UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        # Keep the lowest index as root so the earliest chunk stays canonical
+        if ra < rb:
+            self.parent[rb] = ra
+        else:
+            self.parent[ra] = rb
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def find_near_duplicates(vectors: np.ndarray, threshold: float = DEDUP_SIMILARITY_THRESHOLD, block_size: int = DEDUP_BLOCK_SIZE) -> List[Tuple[int, int, float]]:
+    """
+    Returns (i, j, similarity) pairs with i < j whose cosine similarity is >= threshold.
+    Similarity is computed in blocks of rows so memory stays at block_size x n.
+    """
+    unit = _normalize(np.asarray(vectors, dtype=np.float32))
+    n = unit.shape[0]
+    pairs = []
+
+    for start in range(0, n, block_size):
+        block = unit[start:start + block_size]
+        # Only compare against rows at or after this block (upper triangle)
+        sims = block @ unit[start:].T
+        rows, cols = np.nonzero(sims >= threshold)
+        for r, c in zip(rows, cols):
+            i, j = start + r, start + c
+            if i < j:
+                pairs.append((int(i), int(j), float(sims[r, c])))
+
+    return pairs
+
+
+def deduplicate_chunks(chunks: list, vectors: list, threshold: float = DEDUP_SIMILARITY_THRESHOLD):
+    """
+    Collapses near-duplicate chunks into one canonical chunk per cluster.
+    The canonical chunk keeps the provenance of every collapsed source in
+    metadata["sources"] and metadata["duplicate_count"].
+    Returns (kept_chunks, kept_vectors, report).
+    """
+    if not chunks:
+        return [], [], {"total": 0, "kept": 0, "removed": 0, "clusters": []}
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    pairs = find_near_duplicates(matrix, threshold)
+
+    uf = _UnionFind(len(chunks))
+    for i, j, _ in pairs:
+        uf.union(i, j)
+
+    clusters = {}
+    for idx in range(len(chunks)):
+        clusters.setdefault(uf.find(idx), []).append(idx)
+
+    kept_chunks = []
+    kept_vectors = []
+    report_clusters = []
+
+    for root in sorted(clusters):
+        members = clusters[root]
+        canonical = chunks[root]
+
+        sources = []
+        for idx in members:
+            meta = chunks[idx].metadata
+            entry = {"source": meta.get("source")}
+            if "page" in meta:
+                entry["page"] = meta["page"]
+            if entry not in sources:
+                sources.append(entry)
+
+        canonical.metadata["sources"] = sources
+        canonical.metadata["duplicate_count"] = len(members) - 1
+
+        kept_chunks.append(canonical)
+        kept_vectors.append(matrix[root].tolist())
+
+        if len(members) > 1:
+            report_clusters.append({
+                "canonical": root,
+                "members": members,
+                "preview": canonical.page_content[:80].replace("\n", " ")
+            })
+
+    report = {
+        "total": len(chunks),
+        "kept": len(kept_chunks),
+        "removed": len(chunks) - len(kept_chunks),
+        "clusters": report_clusters
+    }
+    return kept_chunks, kept_vectors, report
+
+
+def print_dedup_report(report: dict, threshold: float = DEDUP_SIMILARITY_THRESHOLD):
+    print(f"🧹 Dedup report (cosine >= {threshold}):")
+    print(f"   Chunks in: {report['total']} | kept: {report['kept']} | collapsed: {report['removed']}")
+    if report["total"]:
+        saved = 100.0 * report["removed"] / report["total"]
+        print(f"   Index size reduced by {saved:.1f}%")
+    for cluster in report["clusters"][:20]:
+        print(f"   - #{cluster['canonical']} absorbed {len(cluster['members']) - 1} copies: \"{cluster['preview']}...\"")
+    if len(report["clusters"]) > 20:
+        print(f"   ... and {len(report['clusters']) - 20} more clusters")
@@ -6,7 +6,8 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from dotenv import load_dotenv
-from rag.config import VECTOR_STORE_PATH, KNOWLEDGE_DIR, EMBEDDING_MODEL
+from rag.config import VECTOR_STORE_PATH, KNOWLEDGE_DIR, EMBEDDING_MODEL, DEDUP_SIMILARITY_THRESHOLD
+from rag.rag_dedup import deduplicate_chunks, print_dedup_report
 
 # Load environment variables
 load_dotenv()
@@ -23,7 +24,8 @@ METADATA_MAP = {
 
 def ingest_documents():
     """
-    Ingests documents from KNOWLEDGE_DIR, chunks them, and creates a FAISS vector store.
+    Ingests documents from KNOWLEDGE_DIR, chunks them, collapses near-duplicate
+    chunks, and creates a FAISS vector store.
     """
     print("DEBUG: Script started")
     
@@ -73,8 +75,18 @@ def ingest_documents():
     # Embedding and Vector Store
     print(f"🧠 Generating embeddings using {EMBEDDING_MODEL}...")
     embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-    
-    vector_store = FAISS.from_documents(chunks, embeddings)
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = embeddings.embed_documents(texts)
+
+    # Deduplication (reuses the vectors above, so nothing is embedded twice)
+    chunks, vectors, report = deduplicate_chunks(chunks, vectors, DEDUP_SIMILARITY_THRESHOLD)
+    print_dedup_report(report, DEDUP_SIMILARITY_THRESHOLD)
+
+    vector_store = FAISS.from_embeddings(
+        text_embeddings=[(chunk.page_content, vector) for chunk, vector in zip(chunks, vectors)],
+        embedding=embeddings,
+        metadatas=[chunk.metadata for chunk in chunks]
+    )
     
     # Save index
     vector_store.save_local(VECTOR_STORE_PATH)
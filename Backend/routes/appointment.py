@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from schemas.appointment import AppointmentCreate, AppointmentResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
+from datetime import datetime, timedelta
+from schemas.appointment import AppointmentCreate, AppointmentResponse, FreeSlotsResponse, DoctorFreeSlots
 from services.appointment_service import book_appointment, get_patient_appointments, update_appointment_status
-from utils.security import get_current_user_id
+from services.calendar_service import get_free_slots, to_utc, SlotConflict, SlotUnavailable, SLOT_MINUTES, MAX_FREE_SLOT_DAYS
+from services.doctor_assignment import NoDoctorAvailable
+from services.doctor_directory import doctor_directory
+from services.appointment_events import appointment_channel
+from utils.security import get_current_user_id, get_current_user_id_from_query
+from utils.sse import sse_response
 
 router = APIRouter(prefix="/appointments", tags=["Appointments"])
 
 @router.post("/", response_model=AppointmentResponse)
 async def create_appointment(appt: AppointmentCreate, user_id: str = Depends(get_current_user_id)):
-    new_appt = await book_appointment(user_id, appt.model_dump())
+    try:
+        new_appt = await book_appointment(user_id, appt.model_dump())
+    except SlotConflict as e:
+        raise HTTPException(status_code=409, detail=f"Slot {e.slot_start.isoformat()} is already booked")
+    except NoDoctorAvailable:
+        raise HTTPException(status_code=409, detail="No doctor is available for that time")
+    except SlotUnavailable as e:
+        raise HTTPException(status_code=400, detail=f"Cannot book {e.slot_start.isoformat()}: {e.reason}")
     return AppointmentResponse(
         id=str(new_appt.id),
         doctor_id=new_appt.doctor_id,
@@ -32,6 +45,38 @@ async def list_my_appointments(user_id: str = Depends(get_current_user_id)):
         ) for a in appts
     ]
 
+@router.get("/slots", response_model=FreeSlotsResponse)
+async def list_free_slots(
+    doctor_ids: Optional[str] = Query(None, description="Comma-separated doctor ids; all doctors when omitted"),
+    start: Optional[datetime] = None,
+    days: int = Query(7, ge=1, le=MAX_FREE_SLOT_DAYS),
+    user_id: str = Depends(get_current_user_id)
+):
+    ids = [i for i in doctor_ids.split(",") if i] if doctor_ids else None
+    start = to_utc(start) if start else datetime.utcnow()
+    free = await get_free_slots(ids, start=start, days=days)
+    doctors = await doctor_directory.get_all()
+    return FreeSlotsResponse(
+        start=start,
+        end=start + timedelta(days=days),
+        slot_minutes=SLOT_MINUTES,
+        doctors=[
+            DoctorFreeSlots(doctor_id=str(d.id), name=d.name, specialization=d.specialization, slots=free[str(d.id)])
+            for d in doctors if str(d.id) in free
+        ]
+    )
+
+@router.get("/stream")
+async def appointment_stream(request: Request, appointment_id: Optional[str] = None, user_id: str = Depends(get_current_user_id_from_query)):
+    """
+    Server-sent events: appointment_status for every transition of the
+    caller's appointments (optionally just `appointment_id`). Pass the JWT as ?token=.
+    """
+    def matches(event: dict) -> bool:
+        return appointment_id is None or event["data"]["appointment_id"] == appointment_id
+
+    return sse_response(request, appointment_channel(user_id), accept=matches)
+
 @router.get("/{id}", response_model=AppointmentResponse)
 async def get_appointment_details(id: str, user_id: str = Depends(get_current_user_id)):
     from services.appointment_service import get_appointment
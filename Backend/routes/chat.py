@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from schemas.chat import ChatHistoryResponse, ChatMessageResponse
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from schemas.chat import ChatHistoryResponse, ChatMessageResponse, ChatSessionResponse, ChatSessionListResponse
 from services.chat_service import get_chat_history, clear_chat_history
+from services import session_index
 from utils.security import get_current_user_id
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
@@ -24,3 +25,35 @@ async def get_history(session_id: str = "default", user_id: str = Depends(get_cu
 async def delete_history(session_id: str = "default", user_id: str = Depends(get_current_user_id)):
     await clear_chat_history(user_id, session_id)
     return {"message": "Chat history cleared"}
+
+def _session_response(doc: dict) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=doc["session_id"],
+        last_message=doc.get("last_message"),
+        last_role=doc.get("last_role"),
+        message_count=doc.get("message_count", 0),
+        last_activity=doc.get("last_activity"),
+        created_at=doc.get("created_at")
+    )
+
+@router.get("/sessions", response_model=ChatSessionListResponse)
+async def list_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    try:
+        docs, next_cursor = await session_index.list_sessions(user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ChatSessionListResponse(
+        sessions=[_session_response(d) for d in docs],
+        next_cursor=next_cursor
+    )
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_session(session_id: str, user_id: str = Depends(get_current_user_id)):
+    doc = await session_index.get_session(user_id, session_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return _session_response(doc)
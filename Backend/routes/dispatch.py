@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List
+from schemas.appointment import AppointmentResponse
+from schemas.dispatch import EmergencyOffer, DispatchAccept
+from services.emergency_dispatch import dispatcher, AlreadyClaimed, DISPATCH_CHANNEL
+from services.doctor_directory import doctor_directory
+from utils.security import get_current_user_id, get_current_user_id_from_query
+from utils.sse import sse_response
+
+router = APIRouter(prefix="/dispatch", tags=["Dispatch"])
+
+async def _acting_doctor(doctor_id: str, user_id: str):
+    doctor = await doctor_directory.get(doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    # Only the doctor's own login may act for them (linked with PUT /doctors/{id}/account)
+    if not doctor.user_id or doctor.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to act for this doctor")
+    return doctor
+
+@router.get("/queue", response_model=List[EmergencyOffer])
+async def list_open_emergencies(doctor_id: str = Query(...), user_id: str = Depends(get_current_user_id)):
+    """Open emergency requests offered to the signed-in doctor, most urgent first."""
+    await _acting_doctor(doctor_id, user_id)
+    return [dispatcher.offer_event(a, entry, [])["data"] for a, entry in dispatcher.offered_to(doctor_id)]
+
+@router.get("/stream")
+async def dispatch_stream(request: Request, doctor_id: str = Query(...), user_id: str = Depends(get_current_user_id_from_query)):
+    """
+    Server-sent events for one doctor: emergency_offer (sent on connect for
+    every open request already offered to them, then as new offers go out)
+    and emergency_claimed. Pass the JWT as ?token=.
+    """
+    await _acting_doctor(doctor_id, user_id)
+
+    def for_doctor(event: dict) -> bool:
+        return event["type"] != "emergency_offer" or doctor_id in event["data"]["doctor_ids"]
+
+    initial = [dispatcher.offer_event(a, entry, [doctor_id]) for a, entry in dispatcher.offered_to(doctor_id)]
+    return sse_response(request, DISPATCH_CHANNEL, accept=for_doctor, initial=initial)
+
+@router.post("/{appointment_id}/accept", response_model=AppointmentResponse)
+async def accept_emergency(appointment_id: str, body: DispatchAccept, user_id: str = Depends(get_current_user_id)):
+    await _acting_doctor(body.doctor_id, user_id)
+    try:
+        appt = await dispatcher.accept(appointment_id, body.doctor_id)
+    except AlreadyClaimed:
+        raise HTTPException(status_code=409, detail="This request was already accepted")
+    return AppointmentResponse(
+        id=appointment_id,
+        doctor_id=appt["doctor_id"],
+        type=appt["type"],
+        scheduled_time=appt["scheduled_time"],
+        status=appt["status"],
+        created_at=appt["created_at"]
+    )
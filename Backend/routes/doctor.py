@@ -1,19 +1,48 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import List
-from schemas.doctor import DoctorResponse
-from services.doctor_service import get_all_doctors, seed_doctors
+from bson import ObjectId
+from models.doctor import DoctorModel
+from schemas.doctor import DoctorResponse, DoctorAccountLink
+from services.doctor_service import get_all_doctors, seed_doctors, get_doctor_for_user, link_doctor_account, DoctorAccountTaken
+from services.auth_service import get_user_by_email
+from utils.security import get_current_user_id, require_admin_token
 
 router = APIRouter(prefix="/doctors", tags=["Doctors"])
 
+def _doctor_response(d: DoctorModel) -> DoctorResponse:
+    return DoctorResponse(
+        id=str(d.id),
+        name=d.name,
+        specialization=d.specialization,
+        availability_status=d.availability_status,
+        image_url=d.image_url
+    )
+
 @router.get("/", response_model=List[DoctorResponse])
 async def list_doctors():
     doctors = await get_all_doctors()
-    return [
-        DoctorResponse(
-            id=str(d.id),
-            name=d.name,
-            specialization=d.specialization,
-            availability_status=d.availability_status,
-            image_url=d.image_url
-        ) for d in doctors
-    ]
+    return [_doctor_response(d) for d in doctors]
+
+@router.get("/me", response_model=DoctorResponse)
+async def my_doctor_profile(user_id: str = Depends(get_current_user_id)):
+    """The doctor profile linked to the signed-in user; its id is what the dispatch routes take."""
+    doctor = await get_doctor_for_user(user_id)
+    if not doctor:
+        raise HTTPException(status_code=404, detail="No doctor profile is linked to this account")
+    return _doctor_response(doctor)
+
+@router.put("/{doctor_id}/account", response_model=DoctorResponse, dependencies=[Depends(require_admin_token)])
+async def link_account(doctor_id: str, body: DoctorAccountLink):
+    """Admin: links a doctor to an existing login so that user can receive and accept emergency requests."""
+    user = await get_user_by_email(body.email)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not ObjectId.is_valid(doctor_id):
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    try:
+        doctor = await link_doctor_account(doctor_id, str(user.id))
+    except DoctorAccountTaken:
+        raise HTTPException(status_code=409, detail="This account is already linked to another doctor")
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return _doctor_response(doctor)
@@ -1,14 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import List
-from schemas.forum import PostCreate, PostResponse, ReplyCreate, Reply
-from services.forum_service import create_post, get_all_posts, add_reply, like_post
-from utils.security import get_current_user_id
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from typing import List, Optional
+from schemas.forum import PostCreate, PostResponse, ReplyCreate, Reply, ReplyListResponse, ForumSearchResponse
+from services.forum_service import create_post, get_posts_page, get_replies_page, add_reply, like_post, FORUM_CHANNEL
+from services.forum_search import search_posts
+from utils.security import get_current_user_id, get_current_user_id_from_query
+from utils.sse import sse_response
 
 router = APIRouter(prefix="/forum", tags=["Forum"])
 
 @router.get("/posts", response_model=List[PostResponse])
-async def list_posts(user_id: str = Depends(get_current_user_id)):
-    return await get_all_posts()
+async def list_posts(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    # Body stays a plain list; the next page's cursor goes in a header
+    try:
+        posts, next_cursor = await get_posts_page(limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return posts
+
+@router.get("/search", response_model=ForumSearchResponse)
+async def search_forum(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    try:
+        results, next_cursor = await search_posts(q, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ForumSearchResponse(results=results, next_cursor=next_cursor)
 
 @router.post("/posts", response_model=PostResponse)
 async def create_new_post(post: PostCreate, user_id: str = Depends(get_current_user_id)):
@@ -21,9 +48,27 @@ async def reply_to_post(post_id: str, reply: ReplyCreate, user_id: str = Depends
         raise HTTPException(status_code=404, detail="Post not found")
     return result
 
+@router.get("/posts/{post_id}/replies", response_model=ReplyListResponse)
+async def list_replies(
+    post_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id)
+):
+    try:
+        replies, next_cursor = await get_replies_page(post_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ReplyListResponse(replies=replies, next_cursor=next_cursor)
+
 @router.post("/posts/{post_id}/like")
 async def like_a_post(post_id: str, user_id: str = Depends(get_current_user_id)):
     result = await like_post(post_id, user_id)
     if result["status"] == "not_found":
         raise HTTPException(status_code=404, detail="Post not found")
     return result
+
+@router.get("/stream")
+async def forum_stream(request: Request, user_id: str = Depends(get_current_user_id_from_query)):
+    """Server-sent events: post_created, reply_created, post_liked. Pass the JWT as ?token=."""
+    return sse_response(request, FORUM_CHANNEL)
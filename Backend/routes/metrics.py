@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+from db.database import describe_policies
+from db.monitoring import mongo_metrics, slowest_commands
+from services.tool_registry import get_tool_metrics
+from services.chat_service import chat_writer
+from services.event_bus import event_bus
+from services.moderation import moderation
+from services.doctor_directory import doctor_directory
+from services.doctor_assignment import assignment_engine
+from services.emergency_dispatch import dispatcher
+from utils.security import require_metrics_token
+
+# Internal numbers (collection policies, per-doctor load, queue sizes): ops only
+router = APIRouter(prefix="/metrics", tags=["Metrics"], dependencies=[Depends(require_metrics_token)])
+
+@router.get("/")
+async def get_metrics():
+    """Mongo command latency / pool waits next to tool (LLM-side) timings, to see which one is the bottleneck."""
+    return {
+        "mongo": mongo_metrics.snapshot(),
+        "mongo_slowest": slowest_commands(),
+        "mongo_policies": describe_policies(),
+        "tools": get_tool_metrics(),
+        "event_bus": event_bus.stats(),
+        "moderation": moderation.stats(),
+        "doctor_directory": doctor_directory.stats(),
+        "doctor_assignment": assignment_engine.stats(),
+        "emergency_dispatch": dispatcher.stats(),
+        "chat_writer": {
+            "running": chat_writer.running,
+            "queued": chat_writer.queue.qsize() if chat_writer.queue else 0,
+            "flushed": chat_writer.flushed,
+            "failed": chat_writer.failed
+        }
+    }
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class AppointmentCreate(BaseModel):
@@ -14,3 +14,15 @@ class AppointmentResponse(BaseModel):
     scheduled_time: Optional[datetime]
     status: str
     created_at: datetime
+
+class DoctorFreeSlots(BaseModel):
+    doctor_id: str
+    name: str
+    specialization: str
+    slots: List[datetime]
+
+class FreeSlotsResponse(BaseModel):
+    start: datetime
+    end: datetime
+    slot_minutes: int
+    doctors: List[DoctorFreeSlots]
@@ -15,3 +15,15 @@ class ChatMessageResponse(BaseModel):
 
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessageResponse]
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    last_message: Optional[str] = None
+    last_role: Optional[str] = None
+    message_count: int = 0
+    last_activity: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+class ChatSessionListResponse(BaseModel):
+    sessions: List[ChatSessionResponse]
+    next_cursor: Optional[str] = None
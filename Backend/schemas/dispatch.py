@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+class EmergencyOffer(BaseModel):
+    appointment_id: str
+    priority: int
+    created_at: datetime
+    waiting_seconds: float
+
+class DispatchAccept(BaseModel):
+    doctor_id: str
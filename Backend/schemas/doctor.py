@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr
 from typing import Optional
 
 class DoctorResponse(BaseModel):
@@ -7,3 +7,6 @@ class DoctorResponse(BaseModel):
     specialization: str
     availability_status: str
     image_url: Optional[str] = None
+
+class DoctorAccountLink(BaseModel):
+    email: EmailStr
@@ -23,5 +23,23 @@ class PostResponse(BaseModel):
     username: str
     likes: int
     color: str
+    reply_count: int = 0
+    # Always empty in feed responses; replies are paged from /forum/posts/{id}/replies
     replies: List[Reply] = []
     created_at: datetime
+
+class ReplyListResponse(BaseModel):
+    replies: List[Reply]
+    next_cursor: Optional[str] = None
+
+class ForumSearchResult(BaseModel):
+    post: PostResponse
+    score: float
+    snippet: str
+    # [start, end] character offsets of matched words within snippet
+    highlights: List[List[int]] = []
+    matched_in: List[str] = []  # "post", "replies"
+
+class ForumSearchResponse(BaseModel):
+    results: List[ForumSearchResult]
+    next_cursor: Optional[str] = None
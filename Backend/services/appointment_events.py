@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from services.event_bus import event_bus
+from services.doctor_directory import doctor_directory
+
+# One event bus channel per user; their /appointments/stream listens on it
+CHANNEL_PREFIX = "appointments:"
+
+
+def appointment_channel(user_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+async def publish_status(appointment: dict, previous_status: Optional[str]):
+    """
+    Announces a status transition to the patient and, when the doctor record
+    is linked to a login, to the doctor. Best effort, like every publish.
+    """
+    appointment_id = str(appointment.get("_id") or appointment.get("id"))
+    event = {"type": "appointment_status", "data": {
+        "appointment_id": appointment_id,
+        "doctor_id": appointment["doctor_id"],
+        "type": appointment.get("type", "normal"),
+        "status": appointment["status"],
+        "previous_status": previous_status,
+        "scheduled_time": appointment.get("scheduled_time"),
+        "at": datetime.utcnow()
+    }}
+    recipients = {appointment["user_id"]}
+    doctor = await doctor_directory.get(appointment["doctor_id"])
+    if doctor and doctor.user_id:
+        recipients.add(doctor.user_id)
+    for user_id in recipients:
+        await event_bus.publish(appointment_channel(user_id), event)
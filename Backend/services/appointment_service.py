@@ -1,11 +1,24 @@
 from models.appointment import AppointmentModel
-from db.database import get_database
+from db.database import get_collection
 from typing import List
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
+from services.doctor_assignment import assignment_engine, AUTO, ACTIVE_STATUSES, CLOSED_STATUSES
+from services.calendar_service import claim_slot, release_slot, to_utc, SlotUnavailable
+from services.emergency_dispatch import dispatcher, UNASSIGNED
+from services.appointment_events import publish_status
 
-async def book_appointment(user_id: str, appointment_data: dict):
-    db = get_database()
+async def book_appointment(user_id: str, appointment_data: dict, specialization: str = None):
+    """
+    Stores a booking, reserving its calendar slot and counting it against the
+    doctor's load. doctor_id="auto" lets the assignment engine pick a doctor
+    who is free at that time (optionally within `specialization`).
+    Raises SlotUnavailable / SlotConflict for a bad or taken slot, and
+    NoDoctorAvailable if no doctor can take an auto booking. Emergencies
+    with doctor_id="auto" stay unassigned and go to the dispatch queue.
+    """
+    appointments = get_collection("appointments")
     
     # Emergency logic
     if appointment_data.get("type") == "emergency":
@@ -15,39 +28,82 @@ async def book_appointment(user_id: str, appointment_data: dict):
         appointment_data["status"] = "booked"
 
     appointment = AppointmentModel(user_id=user_id, **appointment_data)
-    result = await db["appointments"].insert_one(appointment.model_dump(by_alias=True, exclude=["id"]))
-    created_appt = await db["appointments"].find_one({"_id": result.inserted_id})
-    return AppointmentModel(**created_appt)
+    # The id is needed up front: the slot reservation points at it
+    appointment.id = str(ObjectId())
+    if appointment.scheduled_time:
+        appointment.scheduled_time = to_utc(appointment.scheduled_time)
+
+    async def claim(doctor_id: str) -> bool:
+        if appointment.scheduled_time:
+            await claim_slot(doctor_id, appointment.scheduled_time, appointment.id, user_id)
+        return True
+
+    if appointment.type == "emergency" and appointment.doctor_id == AUTO:
+        # The first doctor to accept the dispatch offer takes it
+        appointment.doctor_id = UNASSIGNED
+    elif appointment.doctor_id == AUTO:
+        async def try_claim(doctor_id: str) -> bool:
+            try:
+                return await claim(doctor_id)
+            except SlotUnavailable:
+                return False
+        appointment.doctor_id = await assignment_engine.assign(specialization, claim=try_claim)
+    else:
+        await claim(appointment.doctor_id)
+        await assignment_engine.track(appointment.doctor_id)
+
+    try:
+        await appointments.insert_one({"_id": ObjectId(appointment.id), **appointment.model_dump(by_alias=True, exclude=["id"])})
+    except Exception:
+        await release_slot(appointment.id)
+        if appointment.doctor_id != UNASSIGNED:
+            await assignment_engine.release(appointment.doctor_id)
+        raise
+    if appointment.type == "emergency":
+        await dispatcher.submit(appointment)
+    await publish_status(appointment.model_dump(), None)
+    return appointment
 
 async def get_patient_appointments(user_id: str) -> List[AppointmentModel]:
-    db = get_database()
-    cursor = db["appointments"].find({"user_id": user_id}).sort("created_at", -1)
+    appointments = get_collection("appointments")
+    cursor = appointments.find({"user_id": user_id}).sort("created_at", -1)
     appts = await cursor.to_list(length=100)
     return [AppointmentModel(**a) for a in appts]
 
 async def get_doctor_appointments(doctor_id: str) -> List[AppointmentModel]:
-    db = get_database()
+    appointments = get_collection("appointments")
     # In a real app, doctor_id would come from the logged-in user's profile.
     # For now, we might receive it or filter by it.
-    cursor = db["appointments"].find({"doctor_id": doctor_id}).sort("created_at", -1)
+    cursor = appointments.find({"doctor_id": doctor_id}).sort("created_at", -1)
     appts = await cursor.to_list(length=100)
     return [AppointmentModel(**a) for a in appts]
 
 async def update_appointment_status(appointment_id: str, status: str):
-    db = get_database()
-    await db["appointments"].update_one(
+    appointments = get_collection("appointments")
+    # Read the previous status in the same round trip so load and slot are released exactly once
+    previous = await appointments.find_one_and_update(
         {"_id": ObjectId(appointment_id)},
-        {"$set": {"status": status}}
+        {"$set": {"status": status}},
+        return_document=ReturnDocument.BEFORE
     )
-    updated_appt = await db["appointments"].find_one({"_id": ObjectId(appointment_id)})
-    if updated_appt:
-        return AppointmentModel(**updated_appt)
-    return None
+    if not previous:
+        return None
+    if previous.get("type") == "emergency":
+        dispatcher.withdraw(appointment_id)
+    if status in CLOSED_STATUSES and previous.get("status") in ACTIVE_STATUSES and previous["doctor_id"] != UNASSIGNED:
+        await assignment_engine.release(previous["doctor_id"])
+        if status == "cancelled":
+            # Completed appointments keep their slot as history
+            await release_slot(appointment_id)
+    previous_status = previous.get("status")
+    previous["status"] = status
+    await publish_status(previous, previous_status)
+    return AppointmentModel(**previous)
 
 async def get_appointment(appointment_id: str):
-    db = get_database()
+    appointments = get_collection("appointments")
     try:
-        appt = await db["appointments"].find_one({"_id": ObjectId(appointment_id)})
+        appt = await appointments.find_one({"_id": ObjectId(appointment_id)})
         return AppointmentModel(**appt) if appt else None
     except:
         return None
@@ -6,10 +6,15 @@ from groq import Groq
 from models.assessment import AssessmentSession, AssessmentResponseItem, AssessmentQuestion
 from db.database import db
 from bson import ObjectId
+from services.session_cache import SessionCache
+
+# Versioned writes retried this many times when another request updated the session first
+SAVE_RETRIES = 3
 
 class AssessmentService:
     def __init__(self):
         self.groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.sessions: SessionCache[AssessmentSession] = SessionCache()
 
     @property
     def collection(self):
@@ -28,6 +33,7 @@ class AssessmentService:
         if col is not None:
             new_session = await col.insert_one(session.model_dump(by_alias=True, exclude=["id"]))
             session.id = str(new_session.inserted_id)
+            self.sessions.put(session.id, session)
             print(f"✅ Session Started. ID: {session.id}")
         else:
             print("❌ Start Session Failed: Collection is None.")
@@ -37,12 +43,17 @@ class AssessmentService:
         return session
 
     async def get_session(self, session_id: str) -> Optional[AssessmentSession]:
+        session = self.sessions.get(session_id)
+        if session is not None:
+            return session
         if self.collection is None:
             return None
         try:
             doc = await self.collection.find_one({"_id": ObjectId(session_id)})
             if doc:
-                return AssessmentSession(**doc)
+                session = AssessmentSession(**doc)
+                self.sessions.put(session_id, session)
+                return session
             return None
         except Exception:
             return None
@@ -90,16 +101,19 @@ class AssessmentService:
             # Mark session as needing intervention (handled by controller)
             return analysis, True
 
+        return analysis, False
+
+    def dimension_changes(self, session: AssessmentSession, analysis: dict) -> Dict[str, float]:
         # Update Session Dimensions (Simple Moving Average or similar)
         # For prototype, we just average the new score with the old one
+        changes = {}
         updates = analysis.get("dimension_updates", {})
         for dim, score in updates.items():
             if dim in session.dimensions:
                 current = session.dimensions[dim]
                 # Weighted update: 70% old, 30% new
-                session.dimensions[dim] = (current * 0.7) + (score * 0.3)
-        
-        return analysis, False
+                changes[dim] = (current * 0.7) + (score * 0.3)
+        return changes
 
     async def generate_next_question(self, session: AssessmentSession) -> str:
         # 2. ORCHESTRATOR AGENT
@@ -155,20 +169,25 @@ class AssessmentService:
                 "next_question": None,
                 "feedback": "I'm noticing you might be going through a very difficult time. I want to prioritize your safety. Please consider reaching out to a professional or a crisis line. You are not alone."
             }
-            
-        # Record History
-        history_item = AssessmentResponseItem(
-            question_id=f"q_{len(session.history)+1}",
-            question_text=last_q,
-            user_response=response_text,
-            analysis=analysis.get("dimension_updates", {})
-        )
-        session.history.append(history_item)
-        session.questions_answered += 1
+
+        # Record History + Save State. On a version conflict the analysis is re-applied to the fresh session.
+        for _ in range(SAVE_RETRIES):
+            history_item = AssessmentResponseItem(
+                question_id=f"q_{len(session.history)+1}",
+                question_text=last_q,
+                user_response=response_text,
+                analysis=analysis.get("dimension_updates", {})
+            )
+            if await self._save_response(session, history_item, self.dimension_changes(session, analysis)):
+                break
+            session = await self.get_session(session_id)
+            if not session:
+                raise ValueError("Session not found")
+        else:
+            raise Exception("Session was updated concurrently. Please try again.")
         
         # Stop condition (e.g., 5 questions for now)
         if session.questions_answered >= 5:
-            await self._save_session(session)
             return {
                 "session_id": session_id,
                 "should_stop": True,
@@ -179,9 +198,6 @@ class AssessmentService:
         # Generate Next
         next_q = await self.generate_next_question(session)
         
-        # Save State
-        await self._save_session(session)
-        
         return {
             "session_id": session_id,
             "next_question": next_q,
@@ -189,11 +205,39 @@ class AssessmentService:
             "should_stop": False
         }
 
-    async def _save_session(self, session: AssessmentSession):
-        if self.collection is not None:
-            await self.collection.replace_one(
-                {"_id": ObjectId(session.id)},
-                session.model_dump(by_alias=True, exclude=["id"])
-            )
+    async def _save_response(self, session: AssessmentSession, item: AssessmentResponseItem, dimensions: Dict[str, float]) -> bool:
+        """
+        Writes one turn as a delta ($push the response, $inc counters, $set
+        changed dimensions) guarded by the session version, then applies the
+        same change to the cached model. Returns False if the version moved.
+        """
+        if self.collection is None:
+            return False
+
+        now = datetime.utcnow()
+        changes = {f"dimensions.{dim}": value for dim, value in dimensions.items()}
+        changes["last_updated"] = now
+        # Sessions from before the version backfill have no version field (the model reads them as 0)
+        changes["version"] = session.version + 1
+        version = session.version if session.version else {"$in": [0, None]}
+        result = await self.collection.update_one(
+            {"_id": ObjectId(session.id), "version": version},
+            {
+                "$push": {"history": item.model_dump()},
+                "$inc": {"questions_answered": 1},
+                "$set": changes
+            }
+        )
+        if result.matched_count == 0:
+            self.sessions.invalidate(session.id)
+            return False
+
+        session.history.append(item)
+        session.questions_answered += 1
+        session.dimensions.update(dimensions)
+        session.last_updated = now
+        session.version += 1
+        self.sessions.put(session.id, session)
+        return True
 
 assessment_service = AssessmentService()
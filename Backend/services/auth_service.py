@@ -1,5 +1,7 @@
 import bcrypt
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from models.user import UserModel, UserSettings
 from schemas.user import UserRegister, UserLogin
 from db.database import get_database
@@ -23,12 +25,14 @@ async def create_user(user_data: UserRegister):
         auth_provider="local"
     )
 
-    # Insert into DB
-    result = await db["users"].insert_one(new_user.model_dump(by_alias=True, exclude=["id"]))
-    
-    # Fetch created user
-    created_user = await db["users"].find_one({"_id": result.inserted_id})
-    return UserModel(**created_user)
+    # Insert into DB; the unique email index catches a registration racing the check above
+    try:
+        result = await db["users"].insert_one(new_user.model_dump(by_alias=True, exclude=["id"]))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    new_user.id = str(result.inserted_id)
+    return new_user
 
 async def authenticate_user(login_data: UserLogin):
     db = get_database()
@@ -55,12 +59,8 @@ async def get_user_by_email(email: str):
 
 async def get_user_or_create_google(email: str, name: str, google_id: str):
     db = get_database()
-    user = await db["users"].find_one({"email": email})
-    
-    if user:
-        return UserModel(**user)
-    
-    # Create new Google user
+
+    # Create new Google user, unless one with this email already exists
     new_user = UserModel(
         name=name,
         email=email,
@@ -68,21 +68,31 @@ async def get_user_or_create_google(email: str, name: str, google_id: str):
         google_id=google_id,
         settings=UserSettings()
     )
-    
-    result = await db["users"].insert_one(new_user.model_dump(by_alias=True, exclude=["id"]))
-    created_user = await db["users"].find_one({"_id": result.inserted_id})
-    return UserModel(**created_user)
+    fields = new_user.model_dump(by_alias=True, exclude=["id"])
+    fields.pop("email")
+
+    # Single atomic upsert: existing users come back untouched
+    try:
+        user = await db["users"].find_one_and_update(
+            {"email": email},
+            {"$setOnInsert": fields},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Lost a race with a concurrent first login; the other upsert created the user
+        user = await db["users"].find_one({"email": email})
+    return UserModel(**user)
 
 async def update_user(email: str, update_data: dict):
     db = get_database()
-    result = await db["users"].update_one(
+    updated_user = await db["users"].find_one_and_update(
         {"email": email},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if updated_user is None:
         return None
-        
-    updated_user = await db["users"].find_one({"email": email})
     return UserModel(**updated_user)
 
 async def change_password(email: str, new_password: str):
@@ -0,0 +1,145 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from pymongo.errors import DuplicateKeyError
+from db.database import get_collection
+from services.doctor_directory import doctor_directory
+
+# Appointments occupy fixed slots of this length inside each doctor's working hours.
+# Times are UTC, like every other timestamp in the app.
+SLOT_MINUTES = int(os.getenv("CALENDAR_SLOT_MINUTES", "60"))
+# Defaults for doctors without their own `working_hours` ({"days": [0-6], "start": "HH:MM", "end": "HH:MM"})
+DEFAULT_WORKING_DAYS = [int(d) for d in os.getenv("CALENDAR_WORKING_DAYS", "0,1,2,3,4").split(",")]
+DEFAULT_WORKING_START = os.getenv("CALENDAR_WORKING_START", "09:00")
+DEFAULT_WORKING_END = os.getenv("CALENDAR_WORKING_END", "17:00")
+# Longest window the free-slots query will expand
+MAX_FREE_SLOT_DAYS = 14
+
+SLOTS = "calendar_slots"
+
+
+class SlotUnavailable(Exception):
+    """The requested time is not a bookable slot for this doctor."""
+
+    def __init__(self, doctor_id: str, slot_start: datetime, reason: str):
+        super().__init__(f"{reason}: {doctor_id} at {slot_start.isoformat()}")
+        self.doctor_id = doctor_id
+        self.slot_start = slot_start
+        self.reason = reason
+
+
+class SlotConflict(SlotUnavailable):
+    """The slot is valid but already booked."""
+
+    def __init__(self, doctor_id: str, slot_start: datetime):
+        super().__init__(doctor_id, slot_start, "already booked")
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC, the form stored in Mongo."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def working_hours(doctor) -> dict:
+    hours = (getattr(doctor, "working_hours", None) or {}) if doctor else {}
+    return {
+        "days": hours.get("days", DEFAULT_WORKING_DAYS),
+        "start": _minutes(hours.get("start", DEFAULT_WORKING_START)),
+        "end": _minutes(hours.get("end", DEFAULT_WORKING_END)),
+    }
+
+
+def _day_slots(day: datetime, hours: dict) -> List[datetime]:
+    if day.weekday() not in hours["days"]:
+        return []
+    midnight = day.replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        midnight + timedelta(minutes=m)
+        for m in range(hours["start"], hours["end"] - SLOT_MINUTES + 1, SLOT_MINUTES)
+    ]
+
+
+def _is_slot(start: datetime, hours: dict) -> bool:
+    return start in _day_slots(start, hours)
+
+
+# --- Reservations ---
+
+async def claim_slot(doctor_id: str, slot_start: datetime, appointment_id: str, user_id: str) -> datetime:
+    """
+    Reserves the slot for an appointment. The unique (doctor_id, slot_start)
+    index makes the conflict check and the reservation one atomic insert.
+    Raises SlotUnavailable (not a working slot / in the past) or SlotConflict.
+    """
+    slot_start = to_utc(slot_start)
+    doctor = await doctor_directory.get(doctor_id)
+    if doctor is None:
+        raise SlotUnavailable(doctor_id, slot_start, "unknown doctor")
+    if slot_start <= datetime.utcnow():
+        raise SlotUnavailable(doctor_id, slot_start, "in the past")
+    if not _is_slot(slot_start, working_hours(doctor)):
+        raise SlotUnavailable(doctor_id, slot_start, "outside working hours")
+    try:
+        await get_collection(SLOTS).insert_one({
+            "doctor_id": doctor_id,
+            "slot_start": slot_start,
+            "slot_end": slot_start + timedelta(minutes=SLOT_MINUTES),
+            "appointment_id": appointment_id,
+            "user_id": user_id,
+            "created_at": datetime.utcnow()
+        })
+    except DuplicateKeyError:
+        raise SlotConflict(doctor_id, slot_start)
+    return slot_start
+
+
+async def release_slot(appointment_id: str):
+    await get_collection(SLOTS).delete_one({"appointment_id": appointment_id})
+
+
+# --- Availability ---
+
+async def get_free_slots(doctor_ids: Optional[List[str]] = None, start: Optional[datetime] = None, days: int = 7) -> Dict[str, List[datetime]]:
+    """
+    Free slots per doctor in [start, start + days). One indexed range query
+    on calendar_slots fetches every booked slot for all requested doctors;
+    the rest is generated from working hours in memory.
+    """
+    now = datetime.utcnow()
+    start = max(to_utc(start), now) if start else now
+    end = start + timedelta(days=min(max(days, 1), MAX_FREE_SLOT_DAYS))
+
+    doctors = await doctor_directory.get_all()
+    if doctor_ids is not None:
+        wanted = set(doctor_ids)
+        doctors = [d for d in doctors if str(d.id) in wanted]
+    ids = [str(d.id) for d in doctors]
+
+    taken = set()
+    cursor = get_collection(SLOTS).find(
+        {"doctor_id": {"$in": ids}, "slot_start": {"$gte": start, "$lt": end}},
+        {"doctor_id": 1, "slot_start": 1, "_id": 0}
+    )
+    async for doc in cursor:
+        taken.add((doc["doctor_id"], doc["slot_start"]))
+
+    free = {}
+    for d in doctors:
+        doctor_id, hours = str(d.id), working_hours(d)
+        slots = []
+        day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < end:
+            slots.extend(
+                s for s in _day_slots(day, hours)
+                if start <= s < end and (doctor_id, s) not in taken
+            )
+            day += timedelta(days=1)
+        free[doctor_id] = slots
+    return free
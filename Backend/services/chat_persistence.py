@@ -0,0 +1,106 @@
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+from pymongo.errors import BulkWriteError
+
+# A batch is written once it has this many messages or its oldest message has waited this long
+FLUSH_BATCH_SIZE = int(os.getenv("CHAT_FLUSH_BATCH_SIZE", "50"))
+FLUSH_INTERVAL_MS = int(os.getenv("CHAT_FLUSH_INTERVAL_MS", "200"))
+# Retries per batch before it is dropped (with a log line listing what was lost)
+FLUSH_MAX_RETRIES = int(os.getenv("CHAT_FLUSH_MAX_RETRIES", "5"))
+# Bounded queue: when Mongo falls this far behind, save_message waits instead of growing memory
+QUEUE_MAX_SIZE = int(os.getenv("CHAT_QUEUE_MAX_SIZE", "10000"))
+
+DUPLICATE_KEY = 11000
+
+
+class ChatWriteBehind:
+    """
+    Write-behind queue for chat messages. save_message enqueues a fully built
+    document (with a client-side _id, so retries are idempotent) and returns;
+    a background task writes batches through `writer(docs, retry=...)`.
+    Started and flushed by the app lifespan.
+    """
+
+    def __init__(self, writer: Callable[..., Awaitable[None]]):
+        self.writer = writer
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self):
+        if self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=QUEUE_MAX_SIZE)
+        self.task = asyncio.create_task(self._run())
+        print("✅ Chat write-behind queue started")
+
+    async def enqueue(self, doc: dict):
+        await self.queue.put(doc)
+
+    async def drain(self):
+        """Waits until everything enqueued so far has been written (or given up on)."""
+        if self.running:
+            await self.queue.join()
+
+    async def stop(self):
+        if not self.running:
+            return
+        await self.drain()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        print(f"Chat write-behind queue stopped ({self.flushed} written, {self.failed} dropped)")
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL_MS / 1000
+            while len(batch) < FLUSH_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _flush(self, batch: List[dict]):
+        pending = batch
+        for attempt in range(FLUSH_MAX_RETRIES + 1):
+            try:
+                await self.writer(pending, retry=attempt > 0)
+                self.flushed += len(pending)
+                return
+            except BulkWriteError as e:
+                # Rows that hit a duplicate key were written by an earlier attempt
+                failed_idx = {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY}
+                self.flushed += len(pending) - len(failed_idx)
+                pending = [doc for i, doc in enumerate(pending) if i in failed_idx]
+                if not pending:
+                    return
+                error = e
+            except Exception as e:
+                error = e
+
+            if attempt < FLUSH_MAX_RETRIES:
+                delay = min(0.1 * (2 ** attempt), 5.0)
+                print(f"⚠️ Chat flush failed ({error}), retrying {len(pending)} messages in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+        self.failed += len(pending)
+        print(f"❌ Dropping {len(pending)} chat messages after {FLUSH_MAX_RETRIES} retries: {[str(d.get('_id')) for d in pending]}")
@@ -1,33 +1,66 @@
 from models.chat import ChatMessageModel
-from db.database import get_database
+from services.memory_service import clear_summary
+from services.long_term_memory import long_term_memory
+from services.history_window import history_window
+from services.chat_persistence import ChatWriteBehind
+from services import chat_storage, session_index
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
 from typing import List
 
+async def _record_sessions(docs: List[dict]):
+    # The session index is a convenience view; a failure here must not make messages retry
+    try:
+        await session_index.record_messages(docs)
+    except Exception as e:
+        print(f"⚠️ Session index update failed: {e}")
+
+async def persist_messages(docs: List[dict], retry: bool = False):
+    try:
+        await chat_storage.write_messages(docs, retry=retry)
+    except BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+        await _record_sessions([d for i, d in enumerate(docs) if i not in failed])
+        raise
+    await _record_sessions(docs)
+
+# Batches chat writes off the request path; started/stopped in the app lifespan
+chat_writer = ChatWriteBehind(persist_messages)
+
 async def save_message(user_id: str, role: str, content: str, session_id: str = "default"):
-    db = get_database()
-    
     message = ChatMessageModel(
         user_id=user_id,
         session_id=session_id,
         role=role,
         content=content
     )
+    # Mongo stores milliseconds; truncate now so cached and stored timestamps compare equal
+    message.timestamp = message.timestamp.replace(microsecond=message.timestamp.microsecond // 1000 * 1000)
     
-    await db["chat_history"].insert_one(message.model_dump(by_alias=True, exclude=["id"]))
+    # _id is assigned here so the write-behind queue can retry without duplicating
+    doc = message.model_dump(by_alias=True, exclude=["id"])
+    doc["_id"] = ObjectId()
+    message.id = str(doc["_id"])
+
+    if chat_writer.running:
+        await chat_writer.enqueue(doc)
+    else:
+        await persist_messages([doc])
+
+    history_window.append(message)
+    # Embedded for long-term memory in the background
+    long_term_memory.schedule_index(message)
     return message
 
 async def get_chat_history(user_id: str, session_id: str = "default", limit: int = 50) -> List[ChatMessageModel]:
-    db = get_database()
-    if db is None:
-        print("⚠️ Database not connected. Returning empty history.")
-        return []
-        
-    cursor = db["chat_history"].find(
-        {"user_id": user_id, "session_id": session_id}
-    ).sort("timestamp", 1).limit(limit)  # 1 for ascending (oldest first)
-    
-    messages = await cursor.to_list(length=limit)
-    return [ChatMessageModel(**msg) for msg in messages]
+    # Newest `limit` messages, oldest first
+    return await history_window.get_recent(user_id, session_id, limit)
 
 async def clear_chat_history(user_id: str, session_id: str = "default"):
-    db = get_database()
-    await db["chat_history"].delete_many({"user_id": user_id, "session_id": session_id})
+    # Let queued messages land first so none of them survive the delete
+    await chat_writer.drain()
+    await chat_storage.delete_session(user_id, session_id)
+    await session_index.delete_session(user_id, session_id)
+    history_window.forget(user_id, session_id)
+    await clear_summary(user_id, session_id)
+    await long_term_memory.forget_session(user_id, session_id)
@@ -0,0 +1,147 @@
+import os
+from datetime import datetime
+from typing import List, Optional
+from pymongo import UpdateOne, ReadPreference
+from pymongo.errors import BulkWriteError
+from db.database import get_database, get_collection
+from models.chat import ChatMessageModel
+
+# "documents": one chat_history document per message (original layout)
+# "buckets": one chat_buckets document per (user_id, session_id, day) holding up to BUCKET_SIZE messages
+STORAGE_MODE = os.getenv("CHAT_STORAGE_MODE", "documents")
+BUCKET_SIZE = int(os.getenv("CHAT_BUCKET_SIZE", "100"))
+
+MESSAGES = "chat_history"
+BUCKETS = "chat_buckets"
+
+
+def buckets_enabled() -> bool:
+    return STORAGE_MODE == "buckets"
+
+
+def bucket_day(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def _bucket_entry(doc: dict) -> dict:
+    # user_id/session_id live on the bucket, not on every message
+    return {"_id": doc["_id"], "role": doc["role"], "content": doc["content"], "timestamp": doc["timestamp"]}
+
+
+def _from_bucket(bucket: dict, entry: dict) -> ChatMessageModel:
+    return ChatMessageModel.model_construct(
+        id=str(entry["_id"]),
+        user_id=bucket["user_id"],
+        session_id=bucket["session_id"],
+        role=entry["role"],
+        content=entry["content"],
+        timestamp=entry["timestamp"]
+    )
+
+
+def _from_document(doc: dict) -> ChatMessageModel:
+    _id = doc.pop("_id", None)
+    return ChatMessageModel.model_construct(id=str(_id) if _id else None, **doc)
+
+
+# --- Writes ---
+
+async def write_messages(docs: List[dict], retry: bool = False):
+    if not buckets_enabled():
+        await get_collection(MESSAGES).insert_many(docs, ordered=False)
+        return
+
+    if retry:
+        # $push isn't idempotent, so skip messages an earlier attempt already stored (read from the primary, not a lagging secondary)
+        stored = await get_collection(BUCKETS).with_options(read_preference=ReadPreference.PRIMARY).distinct("messages._id", {"messages._id": {"$in": [d["_id"] for d in docs]}})
+        stored = set(stored)
+        docs = [d for d in docs if d["_id"] not in stored]
+        if not docs:
+            return
+
+    # Group consecutive messages per bucket so a turn is usually a single $push
+    groups = {}
+    for doc in docs:
+        key = (doc["user_id"], doc["session_id"], bucket_day(doc["timestamp"]))
+        groups.setdefault(key, []).append(doc)
+
+    ops = []
+    for (user_id, session_id, day), group in groups.items():
+        for start in range(0, len(group), BUCKET_SIZE):
+            chunk = group[start:start + BUCKET_SIZE]
+            ops.append(UpdateOne(
+                {"user_id": user_id, "session_id": session_id, "day": day, "count": {"$lt": BUCKET_SIZE}},
+                {
+                    "$push": {"messages": {"$each": [_bucket_entry(d) for d in chunk]}},
+                    "$inc": {"count": len(chunk)},
+                    "$min": {"first_timestamp": chunk[0]["timestamp"]},
+                    "$max": {"last_timestamp": chunk[-1]["timestamp"]}
+                },
+                upsert=True
+            ))
+    # Ordered, so chunks of one session land in sequence
+    try:
+        await get_collection(BUCKETS).bulk_write(ops, ordered=True)
+    except BulkWriteError as e:
+        # Error indexes refer to bucket ops, not messages; let the caller retry the whole batch
+        raise RuntimeError(f"bucket write failed: {e.details.get('writeErrors', [])[:1]}") from e
+
+
+# --- Reads ---
+
+async def fetch_latest(user_id: str, session_id: str, n: int) -> List[ChatMessageModel]:
+    """Newest n messages of a session in chronological order."""
+    if get_database() is None:
+        print("⚠️ Database not connected. Returning empty history.")
+        return []
+
+    if not buckets_enabled():
+        cursor = get_collection(MESSAGES).find(
+            {"user_id": user_id, "session_id": session_id}
+        ).sort([("timestamp", -1), ("_id", -1)]).limit(n)  # newest first, reversed below; _id breaks same-millisecond ties
+        docs = await cursor.to_list(length=n)
+        docs.reverse()
+        return [_from_document(d) for d in docs]
+
+    # Newest buckets first; usually one or two cover the whole window
+    collected = []
+    cursor = get_collection(BUCKETS).find({"user_id": user_id, "session_id": session_id}).sort([("last_timestamp", -1), ("_id", -1)]).batch_size(2)
+    async for bucket in cursor:
+        collected = [_from_bucket(bucket, e) for e in bucket.get("messages", [])] + collected
+        if len(collected) >= n:
+            break
+    return collected[-n:] if n > 0 else []
+
+
+async def fetch_since(user_id: str, session_id: str, since: Optional[datetime], limit: int) -> List[ChatMessageModel]:
+    """Oldest `limit` messages newer than `since`, in chronological order."""
+    if get_database() is None:
+        return []
+
+    if not buckets_enabled():
+        query = {"user_id": user_id, "session_id": session_id}
+        if since:
+            query["timestamp"] = {"$gt": since}
+        cursor = get_collection(MESSAGES).find(query).sort([("timestamp", 1), ("_id", 1)]).limit(limit)
+        return [_from_document(d) for d in await cursor.to_list(length=limit)]
+
+    query = {"user_id": user_id, "session_id": session_id}
+    if since:
+        query["last_timestamp"] = {"$gt": since}
+
+    collected = []
+    cursor = get_collection(BUCKETS).find(query).sort([("first_timestamp", 1), ("_id", 1)]).batch_size(2)
+    async for bucket in cursor:
+        for entry in bucket.get("messages", []):
+            if since and entry["timestamp"] <= since:
+                continue
+            collected.append(_from_bucket(bucket, entry))
+        if len(collected) >= limit:
+            break
+    return collected[:limit]
+
+
+async def delete_session(user_id: str, session_id: str):
+    # Both layouts, so a half-migrated session is fully cleared
+    await get_collection(MESSAGES).delete_many({"user_id": user_id, "session_id": session_id})
+    await get_collection(BUCKETS).delete_many({"user_id": user_id, "session_id": session_id})
@@ -0,0 +1,183 @@
+import os
+import heapq
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.database import get_collection
+from services.doctor_directory import doctor_directory
+
+# Open (requested/booked/live) appointments a doctor can hold before auto-assignment skips them
+DOCTOR_MAX_ACTIVE_APPOINTMENTS = int(os.getenv("DOCTOR_MAX_ACTIVE_APPOINTMENTS", "20"))
+
+AUTO = "auto"
+ACTIVE_STATUSES = ["requested", "booked", "live"]
+CLOSED_STATUSES = ["completed", "cancelled"]
+# Heap key for "any specialization"
+ANY = "*"
+# Lower ranks first; Offline doctors are never auto-assigned
+AVAILABILITY_RANK = {"Available": 0, "Busy": 1}
+LOAD = "doctor_load"
+
+
+class NoDoctorAvailable(Exception):
+    pass
+
+
+class AssignmentEngine:
+    """
+    Picks a doctor for doctor_id="auto" bookings. Per-doctor load lives in
+    Mongo (doctor_load: {_id: doctor_id, active}) and is
+    mirrored in memory as one min-heap per specialization, keyed by
+    (availability rank, load). Stale heap entries are skipped lazily, so a
+    pick is O(log n). The pick is confirmed by a conditional $inc on the
+    doctor's load document, which is atomic across workers: if the doctor is
+    at capacity, or the caller's claim (their calendar slot) fails, the next
+    candidate is tried.
+    """
+
+    def __init__(self):
+        self.loads: Dict[str, int] = {}
+        self.ranks: Dict[str, int] = {}
+        self.specializations: Dict[str, str] = {}
+        self.versions: Dict[str, int] = {}
+        self.heaps: Dict[str, List[Tuple[int, int, int, str]]] = {}
+        self.directory_version: Optional[int] = None
+        self.lock = asyncio.Lock()
+        self.counter = itertools.count()
+        # Metrics
+        self.assigned = 0
+        self.rejected = 0
+        self.exhausted = 0
+
+    # --- In-memory index ---
+
+    async def _ensure_loaded(self):
+        doctors = await doctor_directory.get_all()
+        if self.directory_version == doctor_directory.reloads:
+            return
+        loads = {}
+        async for doc in get_collection(LOAD).find({}, {"active": 1}):
+            loads[doc["_id"]] = doc.get("active", 0)
+
+        self.loads, self.ranks, self.specializations, self.versions, self.heaps = {}, {}, {}, {}, {ANY: []}
+        for d in doctors:
+            rank = AVAILABILITY_RANK.get(d.availability_status)
+            if rank is None:
+                continue
+            doctor_id = str(d.id)
+            self.ranks[doctor_id] = rank
+            self.specializations[doctor_id] = d.specialization.lower()
+            self.heaps.setdefault(d.specialization.lower(), [])
+            self._set_load(doctor_id, loads.get(doctor_id, 0))
+        self.directory_version = doctor_directory.reloads
+
+    def _set_load(self, doctor_id: str, load: int):
+        if doctor_id not in self.ranks:
+            return
+        self.loads[doctor_id] = load
+        version = next(self.counter)
+        self.versions[doctor_id] = version
+        entry = (self.ranks[doctor_id], load, version, doctor_id)
+        heapq.heappush(self.heaps[ANY], entry)
+        heapq.heappush(self.heaps[self.specializations[doctor_id]], entry)
+
+    def _heap_for(self, specialization: Optional[str]) -> List[Tuple[int, int, int, str]]:
+        if specialization:
+            wanted = specialization.lower()
+            for key, heap in self.heaps.items():
+                if key != ANY and wanted in key:
+                    return heap
+        return self.heaps[ANY]
+
+    # --- Mongo reservations ---
+
+    async def _reserve(self, doctor_id: str, capped: bool) -> Optional[int]:
+        """Atomically takes a unit of the doctor's load; returns the new load, or None if `capped` and full."""
+        query = {"_id": doctor_id}
+        if capped:
+            query["active"] = {"$lt": DOCTOR_MAX_ACTIVE_APPOINTMENTS}
+        try:
+            doc = await get_collection(LOAD).find_one_and_update(
+                query, {"$inc": {"active": 1}}, upsert=True,
+                projection={"active": 1}, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The document exists but is at capacity
+            return None
+        return doc["active"]
+
+    async def assign(self, specialization: Optional[str] = None, claim: Optional[Callable[[str], Awaitable[bool]]] = None) -> str:
+        """
+        Reserves and returns the least-loaded eligible doctor. `claim(doctor_id)`
+        can veto a candidate after its load is reserved (e.g. the calendar slot
+        is taken); the load is then given back and the next one is tried. Each
+        doctor is tried at most once per call. Raises NoDoctorAvailable.
+        """
+        async with self.lock:
+            await self._ensure_loaded()
+            heap = self._heap_for(specialization)
+            skipped = []
+            try:
+                while heap:
+                    entry = heapq.heappop(heap)
+                    _, load, version, doctor_id = entry
+                    if self.versions.get(doctor_id) != version:
+                        continue  # superseded by a newer load
+                    if load >= DOCTOR_MAX_ACTIVE_APPOINTMENTS:
+                        skipped.append(entry)
+                        continue
+                    new_load = await self._reserve(doctor_id, capped=True)
+                    if new_load is None:
+                        # Another worker filled them up
+                        self.rejected += 1
+                        skipped.append(entry)
+                        continue
+                    if claim and not await claim(doctor_id):
+                        # Their load is back where it was, so the popped entry stays current;
+                        # it only goes back on the heap once this call is done
+                        self.rejected += 1
+                        await self._unreserve(doctor_id)
+                        skipped.append(entry)
+                        continue
+                    self._set_load(doctor_id, new_load)
+                    self.assigned += 1
+                    return doctor_id
+            finally:
+                for entry in skipped:
+                    heapq.heappush(heap, entry)
+            self.exhausted += 1
+            raise NoDoctorAvailable(specialization or ANY)
+
+    async def track(self, doctor_id: str):
+        """Counts a booking made with an explicit doctor (no capacity check)."""
+        new_load = await self._reserve(doctor_id, capped=False)
+        if new_load is not None and self.directory_version is not None:
+            self._set_load(doctor_id, new_load)
+
+    async def _unreserve(self, doctor_id: str) -> Optional[dict]:
+        return await get_collection(LOAD).find_one_and_update(
+            {"_id": doctor_id, "active": {"$gt": 0}}, {"$inc": {"active": -1}},
+            projection={"active": 1}, return_document=ReturnDocument.AFTER
+        )
+
+    async def release(self, doctor_id: str):
+        """Returns a unit of load when an open appointment is completed, cancelled or never stored."""
+        doc = await self._unreserve(doctor_id)
+        if doc and self.directory_version is not None:
+            self._set_load(doctor_id, doc["active"])
+
+    def stats(self) -> dict:
+        return {
+            "doctors": len(self.loads),
+            "loads": dict(self.loads),
+            "capacity": DOCTOR_MAX_ACTIVE_APPOINTMENTS,
+            "assigned": self.assigned,
+            "rejected": self.rejected,
+            "exhausted": self.exhausted
+        }
+
+
+# Singleton instance
+assignment_engine = AssignmentEngine()
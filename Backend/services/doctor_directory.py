@@ -0,0 +1,117 @@
+import os
+import time
+import asyncio
+from typing import Dict, List, Optional
+from pymongo.errors import OperationFailure
+from models.doctor import DoctorModel
+from db.database import get_collection
+
+# The directory is small and rarely edited: serve it from memory and reload at most this often
+DOCTOR_CACHE_TTL_SECONDS = int(os.getenv("DOCTOR_CACHE_TTL_SECONDS", "300"))
+# Drop the cache as soon as a doctor record changes (needs a replica set; TTL only otherwise)
+DOCTOR_CACHE_WATCH = os.getenv("DOCTOR_CACHE_WATCH", "true").lower() == "true"
+DOCTOR_DIRECTORY_LIMIT = 100
+
+
+class DoctorDirectory:
+    """
+    In-process copy of the doctors collection with an id index. Reads are
+    served from memory; the copy is reloaded when older than the TTL or
+    after invalidate(), which writers call and the change-stream watcher
+    triggers. Concurrent misses share one reload.
+    """
+
+    def __init__(self):
+        self.doctors: List[DoctorModel] = []
+        self.by_id: Dict[str, DoctorModel] = {}
+        self.loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+        self.watcher: Optional[asyncio.Task] = None
+        # Metrics
+        self.hits = 0
+        self.reloads = 0
+        self.invalidations = 0
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < DOCTOR_CACHE_TTL_SECONDS
+
+    async def _ensure_loaded(self):
+        if self._fresh():
+            self.hits += 1
+            return
+        async with self.lock:
+            # Another caller may have reloaded while we waited
+            if self._fresh():
+                self.hits += 1
+                return
+            docs = await get_collection("doctors").find({}).to_list(length=DOCTOR_DIRECTORY_LIMIT)
+            doctors = [DoctorModel(**doc) for doc in docs]
+            self.doctors = doctors
+            self.by_id = {str(d.id): d for d in doctors}
+            self.loaded_at = time.monotonic()
+            self.reloads += 1
+
+    async def get_all(self) -> List[DoctorModel]:
+        await self._ensure_loaded()
+        return list(self.doctors)
+
+    async def get(self, doctor_id: str) -> Optional[DoctorModel]:
+        await self._ensure_loaded()
+        return self.by_id.get(str(doctor_id))
+
+    async def name_map(self) -> Dict[str, str]:
+        await self._ensure_loaded()
+        return {doctor_id: d.name for doctor_id, d in self.by_id.items()}
+
+    def invalidate(self):
+        """Call after any write to the doctors collection."""
+        self.loaded_at = None
+        self.invalidations += 1
+
+    # --- Change stream ---
+
+    def start(self):
+        if DOCTOR_CACHE_WATCH and self.watcher is None:
+            self.watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self.watcher:
+            self.watcher.cancel()
+            try:
+                await self.watcher
+            except asyncio.CancelledError:
+                pass
+            self.watcher = None
+
+    async def _watch(self):
+        while True:
+            try:
+                async with get_collection("doctors").watch() as stream:
+                    print("✅ Doctor directory watching for changes")
+                    async for _ in stream:
+                        self.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Standalone servers have no change streams
+                print(f"⚠️ Doctor directory change stream unavailable ({e}); relying on TTL")
+                return
+            except Exception as e:
+                print(f"⚠️ Doctor directory watch interrupted ({e}), reconnecting")
+            # Changes may have been missed while disconnected
+            self.invalidate()
+            await asyncio.sleep(5)
+
+    def stats(self) -> dict:
+        return {
+            "doctors": len(self.doctors),
+            "fresh": self._fresh(),
+            "watching": self.watcher is not None and not self.watcher.done(),
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "invalidations": self.invalidations
+        }
+
+
+# Singleton instance
+doctor_directory = DoctorDirectory()
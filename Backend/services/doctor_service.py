@@ -1,12 +1,17 @@
 from models.doctor import DoctorModel
 from db.database import get_database
-from typing import List
+from typing import List, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from services.doctor_directory import doctor_directory
+
+class DoctorAccountTaken(Exception):
+    """The login is already linked to another doctor."""
+    pass
 
 async def get_all_doctors() -> List[DoctorModel]:
-    db = get_database()
-    cursor = db["doctors"].find({})
-    doctors = await cursor.to_list(length=100)
-    return [DoctorModel(**doc) for doc in doctors]
+    # Served from the in-process directory; reloads only when stale or invalidated
+    return await doctor_directory.get_all()
 
 async def seed_doctors():
     db = get_database()
@@ -38,6 +43,35 @@ async def seed_doctors():
         # Only insert if collection is empty to avoid duplicates on every restart
         if count == 0:
             await db["doctors"].insert_many(doctors_data)
+            doctor_directory.invalidate()
             print(f"✅ Seeded {len(doctors_data)} doctors.")
         else:
             print("Doctors already exist, skipping seed.")
+
+async def get_doctor_for_user(user_id: str) -> Optional[DoctorModel]:
+    """The doctor profile linked to this login, if any."""
+    for doctor in await doctor_directory.get_all():
+        if doctor.user_id == user_id:
+            return doctor
+    return None
+
+async def link_doctor_account(doctor_id: str, user_id: str) -> Optional[DoctorModel]:
+    """
+    Links a doctor to the login that may act for them in emergency dispatch
+    and gives that user the doctor role. Returns None for an unknown doctor;
+    raises DoctorAccountTaken if the login belongs to another doctor.
+    """
+    db = get_database()
+    other = await db["doctors"].find_one({"user_id": user_id, "_id": {"$ne": ObjectId(doctor_id)}}, {"_id": 1})
+    if other:
+        raise DoctorAccountTaken(str(other["_id"]))
+    doc = await db["doctors"].find_one_and_update(
+        {"_id": ObjectId(doctor_id)},
+        {"$set": {"user_id": user_id}},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is None:
+        return None
+    await db["users"].update_one({"_id": ObjectId(user_id)}, {"$set": {"role": "doctor"}})
+    doctor_directory.invalidate()
+    return DoctorModel(**doc)
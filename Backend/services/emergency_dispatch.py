@@ -0,0 +1,206 @@
+import os
+import heapq
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from db.database import get_collection
+from services.event_bus import event_bus
+from services.doctor_directory import doctor_directory
+from services.doctor_assignment import assignment_engine, AUTO
+from services.appointment_events import publish_status
+
+# Event bus channel doctors' dispatch streams listen on (/dispatch/stream)
+DISPATCH_CHANNEL = "dispatch"
+# Unclaimed requests are offered again this often, widening from Available to Busy doctors
+DISPATCH_REOFFER_SECONDS = int(os.getenv("DISPATCH_REOFFER_SECONDS", "15"))
+# doctor_id of an emergency nobody has accepted yet
+UNASSIGNED = "unassigned"
+
+PRIORITY_URGENT, PRIORITY_CRISIS = 0, 1
+
+
+class AlreadyClaimed(Exception):
+    pass
+
+
+class EmergencyDispatcher:
+    """
+    Routes emergency appointments to doctors. Open requests (type emergency,
+    status requested) are the durable queue in Mongo; this keeps them in a
+    heap ordered by (priority, age) and offers them to eligible doctors over
+    the event bus. The first accept() wins through a conditional update on
+    the appointment, so concurrent doctors and workers can't both claim it.
+    """
+
+    def __init__(self):
+        self.heap: List[Tuple[int, datetime, str]] = []
+        # appointment_id -> (priority, created_at, preferred doctor, offer rounds, doctors offered so far)
+        self.pending: Dict[str, dict] = {}
+        self.task: Optional[asyncio.Task] = None
+        # Metrics
+        self.offers = 0
+        self.claims = 0
+        self.lost_races = 0
+        self.accept_seconds = deque(maxlen=500)
+
+    # --- Queue ---
+
+    def _push(self, appointment_id: str, priority: int, created_at: datetime, doctor_id: Optional[str]):
+        if appointment_id in self.pending:
+            return
+        self.pending[appointment_id] = {"priority": priority, "created_at": created_at, "doctor_id": doctor_id, "rounds": 0, "offered": set()}
+        heapq.heappush(self.heap, (-priority, created_at, appointment_id))
+
+    def ordered(self) -> List[Tuple[str, dict]]:
+        """Pending requests, most urgent first (stale heap entries are dropped)."""
+        while self.heap and self.heap[0][2] not in self.pending:
+            heapq.heappop(self.heap)
+        return [(a, self.pending[a]) for _, _, a in sorted(self.heap) if a in self.pending]
+
+    def offered_to(self, doctor_id: str) -> List[Tuple[str, dict]]:
+        """Pending requests this doctor has been offered, most urgent first."""
+        return [(a, entry) for a, entry in self.ordered() if doctor_id in entry["offered"]]
+
+    def withdraw(self, appointment_id: str):
+        self.pending.pop(appointment_id, None)
+
+    async def submit(self, appointment) -> None:
+        """Queues a freshly stored emergency appointment and offers it straight away."""
+        preferred = appointment.doctor_id if appointment.doctor_id != UNASSIGNED else None
+        self._push(str(appointment.id), appointment.priority, appointment.created_at, preferred)
+        try:
+            await self._offer(str(appointment.id))
+        except Exception as e:
+            # Stored and queued; the re-offer loop tries again
+            print(f"⚠️ Emergency offer failed for {appointment.id}: {e}")
+
+    # --- Offers ---
+
+    async def _eligible_doctors(self, preferred: Optional[str], rounds: int) -> List[str]:
+        if preferred and rounds == 0:
+            return [preferred]
+        allowed = {"Available"} if rounds <= 1 else {"Available", "Busy"}
+        return [str(d.id) for d in await doctor_directory.get_all() if d.availability_status in allowed]
+
+    def offer_event(self, appointment_id: str, entry: dict, doctor_ids: List[str]) -> dict:
+        return {"type": "emergency_offer", "data": {
+            "appointment_id": appointment_id,
+            "priority": entry["priority"],
+            "created_at": entry["created_at"],
+            "waiting_seconds": round((datetime.utcnow() - entry["created_at"]).total_seconds(), 1),
+            "doctor_ids": doctor_ids
+        }}
+
+    async def _offer(self, appointment_id: str):
+        entry = self.pending.get(appointment_id)
+        if entry is None:
+            return
+        doctor_ids = await self._eligible_doctors(entry["doctor_id"], entry["rounds"])
+        entry["rounds"] += 1
+        if not doctor_ids:
+            return
+        entry["offered"].update(doctor_ids)
+        await event_bus.publish(DISPATCH_CHANNEL, self.offer_event(appointment_id, entry, doctor_ids))
+        self.offers += 1
+
+    async def _reoffer_loop(self):
+        while True:
+            await asyncio.sleep(DISPATCH_REOFFER_SECONDS)
+            try:
+                ids = [a for a, _ in self.ordered()]
+                if not ids:
+                    continue
+                # Drop anything claimed or cancelled elsewhere (other workers, status routes)
+                still_open = set()
+                cursor = get_collection("appointments").find(
+                    {"_id": {"$in": [ObjectId(a) for a in ids]}, "status": "requested"}, {"_id": 1}
+                )
+                async for doc in cursor:
+                    still_open.add(str(doc["_id"]))
+                for appointment_id in ids:
+                    if appointment_id in still_open:
+                        await self._offer(appointment_id)
+                    else:
+                        self.withdraw(appointment_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Emergency re-offer failed: {e}")
+
+    # --- Claims ---
+
+    async def accept(self, appointment_id: str, doctor_id: str) -> dict:
+        """Atomically assigns the request to `doctor_id`. Raises AlreadyClaimed if someone got there first."""
+        now = datetime.utcnow()
+        previous = await get_collection("appointments").find_one_and_update(
+            {"_id": ObjectId(appointment_id), "type": "emergency", "status": "requested"},
+            {"$set": {"status": "booked", "doctor_id": doctor_id, "scheduled_time": now, "accepted_at": now}},
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous is None:
+            self.lost_races += 1
+            self.withdraw(appointment_id)
+            raise AlreadyClaimed(appointment_id)
+
+        # Move the load from the preassigned doctor, if any, to whoever accepted
+        if previous["doctor_id"] != doctor_id:
+            if previous["doctor_id"] not in (UNASSIGNED, AUTO):
+                await assignment_engine.release(previous["doctor_id"])
+            await assignment_engine.track(doctor_id)
+
+        self.withdraw(appointment_id)
+        self.claims += 1
+        self.accept_seconds.append((now - previous["created_at"]).total_seconds())
+        await event_bus.publish(DISPATCH_CHANNEL, {"type": "emergency_claimed", "data": {
+            "appointment_id": appointment_id, "doctor_id": doctor_id
+        }})
+        previous.update({"status": "booked", "doctor_id": doctor_id, "scheduled_time": now, "accepted_at": now})
+        # The patient learns who accepted without polling
+        await publish_status(previous, "requested")
+        return previous
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        # Requests still open from before a restart go back in the queue
+        cursor = get_collection("appointments").find(
+            {"type": "emergency", "status": "requested"}, {"doctor_id": 1, "priority": 1, "created_at": 1}
+        )
+        async for doc in cursor:
+            preferred = doc["doctor_id"] if doc["doctor_id"] not in (UNASSIGNED, AUTO) else None
+            self._push(str(doc["_id"]), doc.get("priority", PRIORITY_URGENT), doc["created_at"], preferred)
+        self.task = asyncio.create_task(self._reoffer_loop())
+        print(f"✅ Emergency dispatch started ({len(self.pending)} open)")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict:
+        waits = sorted(self.accept_seconds)
+        oldest = min((e["created_at"] for e in self.pending.values()), default=None)
+        return {
+            "pending": len(self.pending),
+            "oldest_waiting_seconds": round((datetime.utcnow() - oldest).total_seconds(), 1) if oldest else 0.0,
+            "offers": self.offers,
+            "claims": self.claims,
+            "lost_races": self.lost_races,
+            "time_to_accept_seconds": {
+                "count": len(waits),
+                "avg": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "p50": round(waits[len(waits) // 2], 2) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else 0.0,
+                "max": round(waits[-1], 2) if waits else 0.0
+            }
+        }
+
+
+# Singleton instance
+dispatcher = EmergencyDispatcher()
@@ -0,0 +1,177 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Set
+from pymongo.errors import OperationFailure
+from pymongo.cursor import CursorType
+from db.database import get_database
+
+# "memory": fan-out inside this process only (single worker)
+# "mongo": events go through a capped collection tailed by every worker
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_COLLECTION = os.getenv("EVENT_BUS_COLLECTION", "event_bus")
+EVENT_BUS_CAPPED_BYTES = int(os.getenv("EVENT_BUS_CAPPED_BYTES", str(16 * 1024 * 1024)))
+# Per-subscriber buffer; a client that falls this far behind loses its oldest events
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_BUS_SUBSCRIBER_QUEUE_SIZE", "100"))
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", channel: str):
+        self.bus = bus
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def deliver(self, event: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None after `timeout` seconds (so callers can send keep-alives)."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class MemoryBackend:
+    """Publishes straight to this process's subscribers."""
+
+    def __init__(self, bus: "EventBus"):
+        self.bus = bus
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, channel: str, event: dict):
+        self.bus._dispatch(channel, event)
+
+
+class MongoBackend:
+    """
+    Cross-worker pub/sub on a capped collection: publish inserts, and one
+    tailable-await cursor per worker dispatches every new document to that
+    worker's local subscribers (including the publisher's own).
+    """
+
+    def __init__(self, bus: "EventBus"):
+        self.bus = bus
+        self.task: Optional[asyncio.Task] = None
+
+    def _collection(self):
+        return get_database()[EVENT_BUS_COLLECTION]
+
+    async def start(self):
+        db = get_database()
+        try:
+            await db.create_collection(EVENT_BUS_COLLECTION, capped=True, size=EVENT_BUS_CAPPED_BYTES)
+        except OperationFailure:
+            pass  # already exists
+        self.task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def publish(self, channel: str, event: dict):
+        await self._collection().insert_one({"channel": channel, "event": event, "origin": self.bus.worker_id, "at": datetime.utcnow()})
+
+    async def _tail(self):
+        collection = self._collection()
+        # Start after whatever is already there
+        last = await collection.find_one(sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id else {}
+            cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+            try:
+                while cursor.alive:
+                    async for doc in cursor:
+                        last_id = doc["_id"]
+                        self.bus._dispatch(doc["channel"], doc["event"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Event bus tail interrupted ({e}), reconnecting")
+            await asyncio.sleep(1)
+
+
+BACKENDS = {
+    "memory": MemoryBackend,
+    "mongo": MongoBackend,
+}
+
+
+class EventBus:
+    """
+    Channel-based pub/sub used for server-sent event streams. Services
+    publish(channel, event); SSE endpoints subscribe(channel) and read from
+    a bounded per-client queue. The backend decides whether events reach
+    only this worker (memory) or every worker (mongo).
+    """
+
+    def __init__(self, backend: str = EVENT_BUS_BACKEND):
+        self.worker_id = uuid.uuid4().hex
+        self.subscribers: Dict[str, Set[Subscription]] = {}
+        self.backend_name = backend if backend in BACKENDS else "memory"
+        self.backend = BACKENDS[self.backend_name](self)
+        self.published = 0
+        self.delivered = 0
+
+    async def start(self):
+        await self.backend.start()
+        print(f"✅ Event bus started ({self.backend_name})")
+
+    async def stop(self):
+        await self.backend.stop()
+
+    async def publish(self, channel: str, event: dict):
+        # Best effort: a failed publish must never fail the write that triggered it
+        try:
+            await self.backend.publish(channel, event)
+            self.published += 1
+        except Exception as e:
+            print(f"⚠️ Event publish failed on {channel}: {e}")
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(self, channel)
+        self.subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        subs = self.subscribers.get(subscription.channel)
+        if subs is not None:
+            subs.discard(subscription)
+            if not subs:
+                del self.subscribers[subscription.channel]
+
+    def _dispatch(self, channel: str, event: dict):
+        for subscription in list(self.subscribers.get(channel, ())):
+            subscription.deliver(event)
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend_name,
+            "published": self.published,
+            "delivered": self.delivered,
+            "subscribers": {channel: len(subs) for channel, subs in self.subscribers.items()}
+        }
+
+
+# Singleton instance
+event_bus = EventBus()
@@ -0,0 +1,122 @@
+import os
+import re
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from db.database import get_collection
+from services.forum_service import REPLIES, FEED_PROJECTION
+from services.moderation import VISIBLE
+
+# Matches considered per query, across posts and replies; pages are cut from this ranked set
+SEARCH_MAX_CANDIDATES = int(os.getenv("FORUM_SEARCH_MAX_CANDIDATES", "200"))
+# A thread matched only through a reply ranks below an equally good match in the post itself
+REPLY_MATCH_WEIGHT = float(os.getenv("FORUM_SEARCH_REPLY_WEIGHT", "0.6"))
+SNIPPET_CHARS = 160
+
+TEXT_SCORE = {"$meta": "textScore"}
+
+
+def _terms(query: str) -> List[str]:
+    # Positive terms only (Mongo $search treats -word as a negation)
+    return [t.lower() for t in re.findall(r"(?<![-\w])\w+", query) if len(t) > 1]
+
+
+def _term_pattern(terms: List[str]) -> Optional[re.Pattern]:
+    if not terms:
+        return None
+    # Rough stand-in for the text index's stemming: match on the first few letters of each term
+    stems = sorted({t[:max(4, len(t) - 2)] if len(t) > 4 else t for t in terms}, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(s) for s in stems) + r")\w*", re.IGNORECASE)
+
+
+def make_snippet(content: str, pattern: Optional[re.Pattern]) -> Tuple[str, List[List[int]]]:
+    """
+    A window of `content` around the first match, plus [start, end] offsets
+    of every matched word inside the snippet (for highlighting).
+    """
+    first = pattern.search(content) if pattern else None
+    if first is None:
+        snippet = content[:SNIPPET_CHARS]
+        prefix, suffix = "", "…" if len(content) > SNIPPET_CHARS else ""
+    else:
+        start = max(0, first.start() - SNIPPET_CHARS // 3)
+        # Don't cut a word in half at the front
+        if start > 0:
+            space = content.rfind(" ", 0, start)
+            start = space + 1 if space != -1 and first.start() - space < SNIPPET_CHARS // 2 else start
+        end = min(len(content), start + SNIPPET_CHARS)
+        snippet = content[start:end]
+        prefix, suffix = ("…" if start > 0 else ""), ("…" if end < len(content) else "")
+
+    highlights = [[m.start() + len(prefix), m.end() + len(prefix)] for m in pattern.finditer(snippet)] if pattern else []
+    return prefix + snippet + suffix, highlights
+
+
+def _decode_offset(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(cursor)
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+
+async def search_posts(query: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Ranked forum search over post and reply content using the Mongo text
+    indexes (migration 7). A thread's score is its post's text score plus a
+    weighted best reply score; ties go to the newer post. Returns
+    [{post, score, snippet, highlights, matched_in}] and the next cursor.
+    Raises ValueError on a bad cursor.
+    """
+    offset = _decode_offset(cursor)
+    query = query.strip()
+    if not query:
+        return [], None
+
+    posts = get_collection("posts")
+    search = {"$text": {"$search": query}, **VISIBLE}
+
+    post_hits = await posts.find(search, {**FEED_PROJECTION, "score": TEXT_SCORE}).sort([("score", TEXT_SCORE)]).limit(SEARCH_MAX_CANDIDATES).to_list(length=SEARCH_MAX_CANDIDATES)
+    reply_hits = await get_collection(REPLIES).find(search, {"post_id": 1, "content": 1, "score": TEXT_SCORE}).sort([("score", TEXT_SCORE)]).limit(SEARCH_MAX_CANDIDATES).to_list(length=SEARCH_MAX_CANDIDATES)
+
+    threads = {}
+    for doc in post_hits:
+        threads[str(doc["_id"])] = {"post": doc, "post_score": doc.pop("score"), "reply": None, "reply_score": 0.0}
+    for reply in reply_hits:
+        entry = threads.setdefault(reply["post_id"], {"post": None, "post_score": 0.0, "reply": None, "reply_score": 0.0})
+        # Replies come best-first, so the first one seen per thread is its best
+        if entry["reply"] is None:
+            entry["reply"], entry["reply_score"] = reply, reply["score"]
+
+    # Posts matched only through replies
+    missing = [ObjectId(pid) for pid, e in threads.items() if e["post"] is None and ObjectId.is_valid(pid)]
+    if missing:
+        async for doc in posts.find({"_id": {"$in": missing}, **VISIBLE}, FEED_PROJECTION):
+            threads[str(doc["_id"])]["post"] = doc
+    ranked = [e for e in threads.values() if e["post"] is not None]
+    for e in ranked:
+        e["score"] = e["post_score"] + REPLY_MATCH_WEIGHT * e["reply_score"]
+    ranked.sort(key=lambda e: (e["score"], e["post"]["created_at"]), reverse=True)
+
+    pattern = _term_pattern(_terms(query))
+    results = []
+    for e in ranked[offset:offset + limit]:
+        post = e["post"]
+        post["id"] = str(post["_id"])
+        post.setdefault("reply_count", 0)
+        matched_in = (["post"] if e["post_score"] else []) + (["replies"] if e["reply"] else [])
+        source = post["content"] if e["post_score"] or e["reply"] is None else e["reply"]["content"]
+        snippet, highlights = make_snippet(source, pattern)
+        results.append({
+            "post": post,
+            "score": round(e["score"], 4),
+            "snippet": snippet,
+            "highlights": highlights,
+            "matched_in": matched_in
+        })
+
+    next_offset = offset + limit
+    return results, (str(next_offset) if next_offset < len(ranked) else None)
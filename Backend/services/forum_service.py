@@ -1,77 +1,141 @@
 from datetime import datetime
 from bson import ObjectId
-from db.database import get_database
-from typing import List, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.database import get_collection
+from typing import List, Optional, Tuple
+from utils.pagination import keyset_filter, keyset_sort, split_page
+from services.event_bus import event_bus
+from services.moderation import moderation, VISIBLE, PENDING, APPROVED
+
+# Event bus channel for live forum updates (/forum/stream)
+FORUM_CHANNEL = "forum"
+
+# Replies and likes live in their own collections; posts only carry reply_count / likes
+REPLIES = "replies"
+LIKES = "post_likes"
+# Feed rows never ship per-user arrays (left over on posts from before migration 6)
+FEED_PROJECTION = {"replies": 0, "liked_by": 0}
+
+def _public(doc: dict) -> dict:
+    return {k: v for k, v in doc.items() if k not in ("_id", "moderation_status", "moderation_flags", "moderated_at")}
+
+async def _announce(kind: str, doc: dict):
+    doc["id"] = str(doc["_id"])
+    event_type = "post_created" if kind == "post" else "reply_created"
+    await event_bus.publish(FORUM_CHANNEL, {"type": event_type, "data": _public(doc)})
+
+# New content goes live (feed, search, stream) once moderation approves it
+moderation.on_approved = _announce
+
+def _initial_status() -> str:
+    # Without a running pipeline nothing would ever leave "pending"
+    return PENDING if moderation.running else APPROVED
 
 async def create_post(user_id: str, content: str, color: str) -> dict:
-    db = get_database()
+    posts = get_collection("posts")
     post = {
         "user_id": user_id,
         "username": "Anonymous",
         "content": content,
         "color": color,
         "likes": 0,
-        "liked_by": [],
-        "replies": [],
+        "reply_count": 0,
+        "moderation_status": _initial_status(),
         "created_at": datetime.utcnow()
     }
-    result = await db.posts.insert_one(post)
+    result = await posts.insert_one(post)
     post["id"] = str(result.inserted_id)
+    if post["moderation_status"] == APPROVED:
+        await _announce("post", post)
+    else:
+        moderation.submit("post", post["id"])
     return post
 
-async def get_all_posts() -> List[dict]:
-    db = get_database()
-    cursor = db.posts.find().sort("created_at", -1)
-    posts = []
-    async for doc in cursor:
+async def get_posts_page(limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Newest posts first, keyset-paginated on (created_at, _id). Returns the
+    page and the cursor for the next one. Raises ValueError on a bad cursor.
+    """
+    posts = get_collection("posts")
+    query = {**VISIBLE, **keyset_filter("created_at", cursor)}
+    docs = await posts.find(query, FEED_PROJECTION).sort(keyset_sort("created_at")).limit(limit + 1).to_list(length=limit + 1)
+    feed, next_cursor = split_page(docs, limit, "created_at")
+    for doc in feed:
         doc["id"] = str(doc["_id"])
-        # Format replies
-        if "replies" in doc:
-            for r in doc["replies"]:
-                r["id"] = str(r["id"]) if "id" in r else str(ObjectId())
-        posts.append(doc)
-    return posts
+        doc.setdefault("reply_count", 0)
+    return feed, next_cursor
+
+async def get_replies_page(post_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """A post's replies oldest first, keyset-paginated on (created_at, _id)."""
+    replies = get_collection(REPLIES)
+    query = {"post_id": post_id, **VISIBLE, **keyset_filter("created_at", cursor, descending=False)}
+    docs = await replies.find(query).sort(keyset_sort("created_at", descending=False)).limit(limit + 1).to_list(length=limit + 1)
+    page, next_cursor = split_page(docs, limit, "created_at")
+    for doc in page:
+        doc["id"] = str(doc["_id"])
+    return page, next_cursor
 
 async def add_reply(post_id: str, user_id: str, content: str) -> Optional[dict]:
-    db = get_database()
-    reply_id = str(ObjectId())
+    posts = get_collection("posts")
+    result = await posts.update_one(
+        {"_id": ObjectId(post_id)},
+        {"$inc": {"reply_count": 1}}
+    )
+    
+    if result.matched_count == 0:
+        return None
+
     reply = {
-        "id": reply_id,
+        "post_id": post_id,
         "user_id": user_id,
         "username": "Anonymous",
         "content": content,
+        "moderation_status": _initial_status(),
         "created_at": datetime.utcnow()
     }
-    
-    result = await db.posts.update_one(
-        {"_id": ObjectId(post_id)},
-        {"$push": {"replies": reply}}
-    )
-    
-    if result.modified_count == 0:
-        return None
-        
+    inserted = await get_collection(REPLIES).insert_one(reply)
+    reply["id"] = str(inserted.inserted_id)
+    if reply["moderation_status"] == APPROVED:
+        await _announce("reply", reply)
+    else:
+        moderation.submit("reply", reply["id"])
     return reply
 
 async def like_post(post_id: str, user_id: str) -> dict:
-    db = get_database()
-    post = await db.posts.find_one({"_id": ObjectId(post_id)})
+    """
+    Toggles the user's like. The unique (post_id, user_id) index on post_likes
+    decides the direction atomically: a fresh insert is a like, a duplicate
+    key means it was already liked, so the like is removed. The post only
+    keeps the counter, moved with $inc.
+    """
+    posts = get_collection("posts")
+    likes = get_collection(LIKES)
+    _id = ObjectId(post_id)
+
+    try:
+        await likes.insert_one({"post_id": post_id, "user_id": user_id, "created_at": datetime.utcnow()})
+        delta, status = 1, "liked"
+    except DuplicateKeyError:
+        removed = await likes.delete_one({"post_id": post_id, "user_id": user_id})
+        if removed.deleted_count == 0:
+            # A concurrent unlike got there first; report the current count
+            post = await posts.find_one({"_id": _id}, {"likes": 1})
+            if not post:
+                return {"status": "not_found", "likes": 0}
+            return {"status": "unliked", "likes": post.get("likes", 0)}
+        delta, status = -1, "unliked"
+
+    post = await posts.find_one_and_update(
+        {"_id": _id},
+        {"$inc": {"likes": delta}},
+        projection={"likes": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not post:
+        if delta == 1:
+            await likes.delete_one({"post_id": post_id, "user_id": user_id})
         return {"status": "not_found", "likes": 0}
-        
-    liked_by = post.get("liked_by", [])
-    
-    if user_id in liked_by:
-        # User already liked, so unlike
-        await db.posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"likes": -1}, "$pull": {"liked_by": user_id}}
-        )
-        return {"status": "unliked", "likes": post.get("likes", 1) - 1}
-    else:
-        # New like
-        await db.posts.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"likes": 1}, "$push": {"liked_by": user_id}}
-        )
-        return {"status": "liked", "likes": post.get("likes", 0) + 1}
+    # Who liked stays private; subscribers only see the new count
+    await event_bus.publish(FORUM_CHANNEL, {"type": "post_liked", "data": {"post_id": post_id, "likes": post["likes"]}})
+    return {"status": status, "likes": post["likes"]}
@@ -0,0 +1,65 @@
+import os
+import time
+from collections import OrderedDict, deque
+from typing import List
+from services import chat_storage
+from models.chat import ChatMessageModel
+
+# Newest messages kept per session; reads of up to this many never touch Mongo
+WINDOW_SIZE = int(os.getenv("CHAT_WINDOW_SIZE", "50"))
+# Sessions cached per process (least recently used are evicted)
+MAX_SESSIONS = int(os.getenv("CHAT_WINDOW_MAX_SESSIONS", "2000"))
+# Reload from Mongo after this long, in case another worker wrote to the session
+WINDOW_TTL_SECONDS = int(os.getenv("CHAT_WINDOW_TTL_SECONDS", "300"))
+
+
+class _SessionBuffer:
+    def __init__(self, messages: List[ChatMessageModel]):
+        self.messages = deque(messages, maxlen=WINDOW_SIZE)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.loaded_at > WINDOW_TTL_SECONDS
+
+
+class HistoryWindow:
+    """
+    Per-session ring buffer of the newest chat messages. A buffer is filled
+    from Mongo on first read (newest N, see chat_storage.fetch_latest) and
+    save_message appends to it, so the
+    usual per-turn read needs no database call.
+    """
+
+    def __init__(self):
+        self.sessions: "OrderedDict[tuple, _SessionBuffer]" = OrderedDict()
+
+    async def get_recent(self, user_id: str, session_id: str, n: int = WINDOW_SIZE) -> List[ChatMessageModel]:
+        """Newest n messages of the session, in chronological order."""
+        if n > WINDOW_SIZE:
+            return await chat_storage.fetch_latest(user_id, session_id, n)
+
+        key = (user_id, session_id)
+        buffer = self.sessions.get(key)
+        if buffer is None or buffer.expired:
+            buffer = _SessionBuffer(await chat_storage.fetch_latest(user_id, session_id, WINDOW_SIZE))
+            self.sessions[key] = buffer
+            while len(self.sessions) > MAX_SESSIONS:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(key)
+
+        messages = list(buffer.messages)
+        return messages[-n:] if n > 0 else []
+
+    def append(self, message: ChatMessageModel):
+        # Only sessions already loaded are updated, otherwise the buffer would look complete when it isn't
+        buffer = self.sessions.get((message.user_id, message.session_id))
+        if buffer is not None:
+            buffer.messages.append(message)
+
+    def forget(self, user_id: str, session_id: str):
+        self.sessions.pop((user_id, session_id), None)
+
+
+# Singleton instance
+history_window = HistoryWindow()
@@ -0,0 +1,164 @@
+import os
+import asyncio
+import numpy as np
+from typing import Optional, Dict
+from rag.rag_retriever import rag_retriever
+
+# Minimum cosine similarity to the best exemplar before we skip the LLM
+ROUTER_CONFIDENCE = float(os.getenv("INTENT_ROUTER_CONFIDENCE", "0.72"))
+# Best intent must beat the runner-up by this much, otherwise it's ambiguous
+ROUTER_MARGIN = float(os.getenv("INTENT_ROUTER_MARGIN", "0.06"))
+ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+# Labelled exemplars per intent. "small_talk" has no tool and always goes to the LLM,
+# it exists so casual messages don't get pulled towards the closest tool.
+INTENT_EXEMPLARS: Dict[str, list] = {
+    "check_appointments": [
+        "When is my appointment?",
+        "Do I have any appointments?",
+        "What's my schedule?",
+        "Show me my upcoming appointments",
+        "When am I seeing the doctor?",
+        "Can you check my bookings?",
+        "List my appointments",
+        "What time is my session with the therapist?",
+    ],
+    "cancel_appointment": [
+        "Cancel my appointment",
+        "I need to cancel",
+        "I can't make it to my appointment",
+        "Please cancel my session with the doctor",
+        "Call off my booking",
+        "I want to cancel my therapy session",
+        "Remove my appointment",
+    ],
+    "book_appointment": [
+        "I want to see a doctor",
+        "Book an appointment",
+        "Schedule a session with a therapist",
+        "Can I book a consultation?",
+        "I'd like to talk to a psychologist",
+        "Set up an appointment for me",
+        "Find me a doctor to talk to",
+    ],
+    "book_emergency": [
+        "I need help right now, it's an emergency",
+        "I need to talk to a doctor immediately",
+        "Get me an urgent appointment",
+        "This is urgent, I need a doctor now",
+        "Emergency appointment please",
+    ],
+    "consult_knowledge_base": [
+        "How can I cope with anxiety?",
+        "What are some strategies for dealing with stress?",
+        "What is depression?",
+        "How do I handle a panic attack?",
+        "Tips for better sleep when I'm anxious",
+        "What are grounding techniques?",
+        "How do I deal with negative thoughts?",
+        "What are the symptoms of burnout?",
+    ],
+    "small_talk": [
+        "Hi",
+        "Hello, how are you?",
+        "Thanks, that helps",
+        "I had a long day at work",
+        "I'm feeling a bit down today",
+        "Good morning",
+        "Tell me about yourself",
+        "I just want to talk",
+    ],
+}
+
+# Intent label -> tool name. Labels not listed here fall back to the LLM.
+# Only read-only tools that need nothing from the message beyond the text itself are
+# fast-pathed. Booking and cancelling change data and depend on details the user gave
+# (time, doctor, which appointment), so they keep their exemplars, to be recognised,
+# but always go through the LLM.
+INTENT_TOOLS = {
+    "check_appointments": "check_appointments",
+    "consult_knowledge_base": "consult_knowledge_base",
+}
+
+
+class IntentRouter:
+    """
+    Nearest-exemplar intent classifier on top of the MiniLM embedder that
+    rag_retriever already keeps in memory. High-confidence tool intents are
+    routed straight to the tool handler; everything else goes to the LLM.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.matrix = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def embeddings(self):
+        return rag_retriever.embeddings
+
+    def _build_index(self):
+        texts = []
+        labels = []
+        for label, examples in INTENT_EXEMPLARS.items():
+            texts.extend(examples)
+            labels.extend([label] * len(examples))
+
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.labels = labels
+        self.matrix = vectors
+        print(f"✅ Intent router ready ({len(texts)} exemplars, {len(INTENT_EXEMPLARS)} intents)")
+
+    def _classify(self, message: str):
+        query = np.asarray(self.embeddings.embed_query(message), dtype=np.float32)
+        query /= (np.linalg.norm(query) or 1.0)
+        sims = self.matrix @ query
+
+        # Best score per intent
+        scores = {}
+        for label, score in zip(self.labels, sims):
+            if score > scores.get(label, -1.0):
+                scores[label] = float(score)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        best_label, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+        return best_label, best_score, best_score - runner_up
+
+    async def route(self, message: str) -> Optional[dict]:
+        """
+        Returns a tool_call dict ({"name", "parameters"}) when the message maps to a
+        tool with high confidence, otherwise None so the caller asks the LLM.
+        """
+        if not ROUTER_ENABLED or self.embeddings is None or not message.strip():
+            return None
+
+        if self.matrix is None:
+            async with self._lock:
+                if self.matrix is None:
+                    try:
+                        await asyncio.to_thread(self._build_index)
+                    except Exception as e:
+                        print(f"❌ Intent router init failed: {e}")
+                        return None
+
+        try:
+            label, score, margin = await asyncio.to_thread(self._classify, message)
+        except Exception as e:
+            print(f"❌ Intent routing error: {e}")
+            return None
+
+        if label not in INTENT_TOOLS or score < ROUTER_CONFIDENCE or margin < ROUTER_MARGIN:
+            print(f"🧭 Router unsure ({label}, score={score:.2f}, margin={margin:.2f}), using LLM.")
+            return None
+
+        tool_name = INTENT_TOOLS[label]
+        params = {"query": message} if tool_name == "consult_knowledge_base" else {}
+
+        print(f"🧭 Routed locally to {tool_name} (score={score:.2f}, margin={margin:.2f})")
+        return {"name": tool_name, "parameters": params}
+
+
+# Singleton instance
+intent_router = IntentRouter()
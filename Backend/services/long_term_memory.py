@@ -0,0 +1,205 @@
+import os
+import asyncio
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional
+from bson import Binary
+from db.database import get_collection
+from models.chat import ChatMessageModel
+
+MEMORY_ENABLED = os.getenv("LONG_TERM_MEMORY_ENABLED", "true").lower() == "true"
+# Snippets injected per prompt and the minimum cosine similarity to qualify
+MEMORY_TOP_K = int(os.getenv("LONG_TERM_MEMORY_TOP_K", "3"))
+MEMORY_MIN_SCORE = float(os.getenv("LONG_TERM_MEMORY_MIN_SCORE", "0.45"))
+# Per-user shards kept in memory (least recently used are evicted)
+MAX_LOADED_SHARDS = int(os.getenv("LONG_TERM_MEMORY_MAX_SHARDS", "500"))
+# Messages shorter than this ("ok", "thanks") aren't worth remembering
+MIN_CONTENT_CHARS = 20
+SNIPPET_CHARS = 200
+EMBED_BATCH_SIZE = 16
+
+COLLECTION = "chat_memory_vectors"
+
+
+class UserShard:
+    """One user's memory: float16 unit vectors plus the snippet metadata."""
+
+    def __init__(self):
+        self.vectors = np.zeros((0, 0), dtype=np.float16)
+        self.items = []
+        self.ids = set()
+
+    def add(self, vectors: np.ndarray, items: list):
+        # A shard loaded while a batch was being inserted may already hold some of its rows
+        keep = [i for i, item in enumerate(items) if item["id"] not in self.ids]
+        if not keep:
+            return
+        vectors, items = vectors[keep], [items[i] for i in keep]
+        self.ids.update(item["id"] for item in items)
+        if self.vectors.size == 0:
+            self.vectors = vectors.astype(np.float16)
+        else:
+            self.vectors = np.vstack([self.vectors, vectors.astype(np.float16)])
+        self.items.extend(items)
+
+    def drop_session(self, session_id: str):
+        keep = [i for i, item in enumerate(self.items) if item["session_id"] != session_id]
+        self.items = [self.items[i] for i in keep]
+        self.ids = {item["id"] for item in self.items}
+        self.vectors = self.vectors[keep] if keep else np.zeros((0, 0), dtype=np.float16)
+
+
+def _embeddings():
+    # Imported lazily so saving a chat message never forces the model to load
+    from rag.rag_retriever import rag_retriever
+    return rag_retriever.embeddings
+
+
+def _unit(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LongTermMemory:
+    """
+    Per-user vector memory over chat_history. Messages are embedded in the
+    background after they are saved and stored as float16 vectors in Mongo,
+    one document per message keyed by user_id. A user's shard is loaded into
+    memory on first search and kept up to date as new messages are indexed.
+    """
+
+    def __init__(self):
+        self.shards: "OrderedDict[str, UserShard]" = OrderedDict()
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+    # --- Indexing ---
+
+    def schedule_index(self, message: ChatMessageModel):
+        if not MEMORY_ENABLED or len(message.content.strip()) < MIN_CONTENT_CHARS:
+            return
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+        self.queue.put_nowait(message)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < EMBED_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._index_batch(batch)
+            except Exception as e:
+                print(f"❌ Memory indexing failed for {len(batch)} messages: {e}")
+
+    async def _index_batch(self, messages: List[ChatMessageModel]):
+        embeddings = _embeddings()
+        collection = get_collection(COLLECTION)
+        if embeddings is None or collection is None:
+            return
+
+        vectors = _unit(await asyncio.to_thread(embeddings.embed_documents, [m.content for m in messages]))
+        half = vectors.astype(np.float16)
+
+        docs = []
+        for msg, vec in zip(messages, half):
+            docs.append({
+                "user_id": msg.user_id,
+                "session_id": msg.session_id,
+                "role": msg.role,
+                "content": msg.content[:SNIPPET_CHARS * 2],
+                "timestamp": msg.timestamp,
+                "vector": Binary(vec.tobytes())
+            })
+        await collection.insert_many(docs, ordered=False)
+
+        # Keep already-loaded shards current without reloading them
+        for doc, vec in zip(docs, half):
+            shard = self.shards.get(doc["user_id"])
+            if shard is not None:
+                shard.add(vec[np.newaxis, :], [self._item(doc)])
+
+    # --- Search ---
+
+    @staticmethod
+    def _item(doc: dict) -> dict:
+        return {
+            "id": str(doc["_id"]),
+            "session_id": doc["session_id"],
+            "role": doc["role"],
+            "content": doc["content"],
+            "timestamp": doc["timestamp"]
+        }
+
+    async def _load_shard(self, user_id: str) -> UserShard:
+        shard = self.shards.get(user_id)
+        if shard is not None:
+            self.shards.move_to_end(user_id)
+            return shard
+
+        shard = UserShard()
+        collection = get_collection(COLLECTION)
+        if collection is not None:
+            cursor = collection.find({"user_id": user_id}, {"user_id": 0})
+            vectors, items = [], []
+            async for doc in cursor:
+                vectors.append(np.frombuffer(doc["vector"], dtype=np.float16))
+                items.append(self._item(doc))
+            if vectors:
+                shard.add(np.vstack(vectors), items)
+
+        self.shards[user_id] = shard
+        while len(self.shards) > MAX_LOADED_SHARDS:
+            self.shards.popitem(last=False)
+        return shard
+
+    async def search(self, user_id: str, query: str, k: int = MEMORY_TOP_K) -> List[dict]:
+        """Most relevant past snippets for this user."""
+        embeddings = _embeddings() if MEMORY_ENABLED else None
+        if embeddings is None or not query.strip():
+            return []
+
+        shard, query_vec = await asyncio.gather(
+            self._load_shard(user_id),
+            asyncio.to_thread(embeddings.embed_query, query)
+        )
+        if not shard.items:
+            return []
+
+        scores = shard.vectors.astype(np.float32) @ _unit(query_vec)
+        order = np.argsort(-scores)
+
+        results = []
+        for idx in order:
+            if scores[idx] < MEMORY_MIN_SCORE or len(results) >= k:
+                break
+            results.append({**shard.items[idx], "score": float(scores[idx])})
+        return results
+
+    async def forget_session(self, user_id: str, session_id: str):
+        collection = get_collection(COLLECTION)
+        if collection is not None:
+            await collection.delete_many({"user_id": user_id, "session_id": session_id})
+        shard = self.shards.get(user_id)
+        if shard is not None:
+            shard.drop_session(session_id)
+
+
+def format_memories(memories: List[dict]) -> Optional[str]:
+    if not memories:
+        return None
+    lines = []
+    for m in memories:
+        who = "User" if m["role"] == "user" else "SANA"
+        when = m["timestamp"].strftime("%b %d") if m.get("timestamp") else ""
+        snippet = m["content"][:SNIPPET_CHARS]
+        lines.append(f"- ({when}) {who}: {snippet}")
+    return "Relevant moments from past conversations with this user:\n" + "\n".join(lines)
+
+
+# Singleton instance
+long_term_memory = LongTermMemory()
@@ -0,0 +1,182 @@
+import os
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from groq import Groq
+from db.database import get_database
+from models.chat import ChatMessageModel
+from services.history_window import history_window
+from services import chat_storage
+
+# Token budget for summary + recent turns in each prompt (excluding the system instruction)
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1200"))
+# Fold older turns into the summary once unsummarized history exceeds this
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_SUMMARY_TRIGGER_TOKENS", "1500"))
+# Messages always kept verbatim at the end of the history
+KEEP_RECENT_MESSAGES = int(os.getenv("CHAT_KEEP_RECENT_MESSAGES", "6"))
+# Upper bound on unsummarized messages read per turn
+MAX_WINDOW_MESSAGES = 40
+SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "llama-3.3-70b-versatile")
+
+SUMMARY_PROMPT = """You maintain the memory of SANA, a mental health companion.
+Update the running summary of the conversation with the new messages below.
+Keep names, feelings, concerns, coping strategies discussed, appointments and anything the user asked SANA to remember.
+Write in third person, at most 150 words, no preamble.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}
+"""
+
+groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+
+# (user_id, session_id) -> summary document, so the prompt path doesn't re-read it every turn
+_summary_cache = {}
+# (user_id, session_id) -> running fold task
+_folds_in_flight = {}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+async def get_summary(user_id: str, session_id: str) -> Optional[dict]:
+    key = (user_id, session_id)
+    if key in _summary_cache:
+        return _summary_cache[key]
+
+    db = get_database()
+    if db is None:
+        return None
+    doc = await db["chat_summaries"].find_one({"user_id": user_id, "session_id": session_id})
+    _summary_cache[key] = doc
+    return doc
+
+
+async def _unsummarized_messages(user_id: str, session_id: str, since: Optional[datetime], oldest_first: bool = False) -> List[ChatMessageModel]:
+    """
+    Up to MAX_WINDOW_MESSAGES messages newer than `since`, in chronological order.
+    The prompt wants the newest ones; folding wants the oldest ones.
+    """
+    if not oldest_first:
+        # Prompt path: served from the in-process window, no database read
+        recent = await history_window.get_recent(user_id, session_id, MAX_WINDOW_MESSAGES)
+        return [m for m in recent if not since or m.timestamp > since]
+
+    return await chat_storage.fetch_since(user_id, session_id, since, MAX_WINDOW_MESSAGES)
+
+
+async def build_history_messages(user_id: str, session_id: str) -> List[dict]:
+    """
+    Returns the Groq messages that stand in for conversation history: the rolling
+    summary (if any) followed by the most recent turns that fit HISTORY_TOKEN_BUDGET.
+    """
+    summary_doc = await get_summary(user_id, session_id)
+    since = summary_doc.get("summarized_until") if summary_doc else None
+    recent = await _unsummarized_messages(user_id, session_id, since)
+
+    messages = []
+    budget = HISTORY_TOKEN_BUDGET
+
+    if summary_doc and summary_doc.get("summary"):
+        summary_text = f"Summary of the earlier conversation:\n{summary_doc['summary']}"
+        budget -= estimate_tokens(summary_text)
+        messages.append({"role": "system", "content": summary_text})
+
+    # Walk back from the newest message until the budget runs out
+    kept = []
+    for msg in reversed(recent):
+        cost = estimate_tokens(msg.content)
+        if cost > budget and kept:
+            break
+        budget -= cost
+        kept.append({"role": msg.role, "content": msg.content})
+
+    messages.extend(reversed(kept))
+    return messages
+
+
+async def _summarize(previous: str, messages: List[ChatMessageModel]) -> str:
+    transcript = "\n".join(f"{m.role}: {m.content}" for m in messages)
+    completion = await asyncio.to_thread(
+        groq_client.chat.completions.create,
+        model=SUMMARY_MODEL,
+        messages=[{"role": "user", "content": SUMMARY_PROMPT.format(summary=previous or "(empty)", messages=transcript)}],
+        temperature=0.2,
+        max_tokens=250
+    )
+    return completion.choices[0].message.content.strip()
+
+
+async def fold_history(user_id: str, session_id: str):
+    """Folds older unsummarized turns into the rolling summary once the threshold is crossed."""
+    db = get_database()
+    if db is None:
+        return
+
+    summary_doc = await get_summary(user_id, session_id)
+    since = summary_doc.get("summarized_until") if summary_doc else None
+    messages = await _unsummarized_messages(user_id, session_id, since, oldest_first=True)
+
+    total = sum(estimate_tokens(m.content) for m in messages)
+    if total < SUMMARY_TRIGGER_TOKENS or len(messages) <= KEEP_RECENT_MESSAGES:
+        return
+
+    to_fold = messages[:-KEEP_RECENT_MESSAGES]
+    previous = summary_doc.get("summary", "") if summary_doc else ""
+    summary = await _summarize(previous, to_fold)
+
+    update = {
+        "summary": summary,
+        "summarized_until": to_fold[-1].timestamp,
+        "updated_at": datetime.utcnow()
+    }
+    if summary_doc:
+        # Only apply on top of the summary we read, another worker may have folded already
+        result = await db["chat_summaries"].update_one(
+            {"_id": summary_doc["_id"], "summarized_until": since},
+            {"$set": update, "$inc": {"folded_messages": len(to_fold)}}
+        )
+        if result.modified_count == 0:
+            _summary_cache.pop((user_id, session_id), None)
+            return
+    else:
+        await db["chat_summaries"].update_one(
+            {"user_id": user_id, "session_id": session_id},
+            {"$set": update, "$inc": {"folded_messages": len(to_fold)}},
+            upsert=True
+        )
+
+    _summary_cache.pop((user_id, session_id), None)
+    print(f"🧠 Folded {len(to_fold)} messages into summary for session {session_id}")
+
+
+def schedule_fold(user_id: str, session_id: str):
+    """Runs fold_history in the background; at most one fold per session at a time."""
+    key = (user_id, session_id)
+    if key in _folds_in_flight:
+        return
+
+    async def _run():
+        try:
+            await fold_history(user_id, session_id)
+        except Exception as e:
+            print(f"❌ Summary fold failed: {e}")
+        finally:
+            _folds_in_flight.pop(key, None)
+
+    _folds_in_flight[key] = asyncio.create_task(_run())
+
+
+def forget_session(user_id: str, session_id: str):
+    _summary_cache.pop((user_id, session_id), None)
+
+
+async def clear_summary(user_id: str, session_id: str):
+    db = get_database()
+    forget_session(user_id, session_id)
+    if db is not None:
+        await db["chat_summaries"].delete_one({"user_id": user_id, "session_id": session_id})
@@ -0,0 +1,259 @@
+import os
+import re
+import time
+import asyncio
+import numpy as np
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from bson import ObjectId
+from db.database import get_collection
+
+MODERATION_ENABLED = os.getenv("MODERATION_ENABLED", "true").lower() == "true"
+# Bounded queue: when full, new items wait in Mongo as "pending" and the sweeper brings them in later
+MODERATION_QUEUE_SIZE = int(os.getenv("MODERATION_QUEUE_SIZE", "1000"))
+MODERATION_BATCH_SIZE = int(os.getenv("MODERATION_BATCH_SIZE", "32"))
+MODERATION_BATCH_WAIT_MS = int(os.getenv("MODERATION_BATCH_WAIT_MS", "250"))
+MODERATION_SWEEP_SECONDS = int(os.getenv("MODERATION_SWEEP_SECONDS", "30"))
+# Cosine similarity to a flagged exemplar above which content is held for human review
+MODERATION_SIMILARITY = float(os.getenv("MODERATION_SIMILARITY", "0.62"))
+
+PENDING, APPROVED, HIDDEN, REVIEW = "pending", "approved", "hidden", "review"
+# Filter for content readers may see; documents from before moderation have no status
+VISIBLE = {"moderation_status": {"$in": [APPROVED, None]}}
+
+COLLECTIONS = {"post": "posts", "reply": "replies"}
+
+# Hard rules: content is hidden outright
+BLOCK_PATTERNS = [
+    (re.compile(r"\byou\s+should\s+(just\s+)?(kill|hurt)\s+yourself\b", re.I), "harassment"),
+    (re.compile(r"\b(kys|go\s+die)\b", re.I), "harassment"),
+    (re.compile(r"\b(buy|cheap|discount)\b.*\b(pills|meds|xanax|oxy\w*)\b", re.I), "spam"),
+    (re.compile(r"(https?://\S+.*){3,}", re.I), "spam"),
+]
+# Distress is what peer support is for: never hidden, only tagged so responders can prioritise
+CRISIS_PATTERNS = [
+    re.compile(r"\b(want|going|plan(ning)?)\s+to\s+(die|end it|kill myself)\b", re.I),
+    re.compile(r"\b(suicid\w*|self[- ]harm\w*)\b", re.I),
+]
+# Semantic neighbours of these are held for review (method details, targeted abuse, scams)
+FLAGGED_EXEMPLARS = [
+    "step by step instructions for how to overdose or harm yourself",
+    "the most painless method to end your life and the dose you need",
+    "you are worthless and everyone here would be better off without you",
+    "message me privately to buy prescription medication without a prescription",
+    "here is her home address and phone number, go and find her",
+]
+
+
+def _embeddings():
+    # Imported lazily so the write path never waits on the model
+    from rag.rag_retriever import rag_retriever
+    return rag_retriever.embeddings
+
+
+def _unit(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class ModerationPipeline:
+    """
+    Off-path moderation for forum posts and replies. Writes store content as
+    "pending" and submit() it without waiting; a background worker classifies
+    batches (lexicon rules, then embedding similarity to flagged exemplars)
+    and writes moderation_status back. Readers filter on VISIBLE. Approved
+    content is announced through `on_approved` (the forum live stream).
+    """
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.sweeper: Optional[asyncio.Task] = None
+        self.in_flight = set()
+        self.exemplar_vectors: Optional[np.ndarray] = None
+        self.on_approved = None
+        # Metrics
+        self.counts = {"submitted": 0, "deferred": 0, "processed": 0, APPROVED: 0, HIDDEN: 0, REVIEW: 0, "errors": 0, "skipped": 0}
+        self.batch_ms = deque(maxlen=100)
+        self.processed_at = deque(maxlen=1000)
+
+    @property
+    def running(self) -> bool:
+        return self.worker is not None and not self.worker.done()
+
+    def start(self):
+        if not MODERATION_ENABLED or self.running:
+            return
+        self.queue = asyncio.Queue(maxsize=MODERATION_QUEUE_SIZE)
+        self.worker = asyncio.create_task(self._run())
+        self.sweeper = asyncio.create_task(self._sweep())
+        print("✅ Moderation pipeline started")
+
+    async def stop(self):
+        for task in (self.sweeper, self.worker):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def submit(self, kind: str, doc_id: str) -> bool:
+        """Queues content for classification. Never blocks; returns False if deferred to the sweeper."""
+        if not self.running:
+            return False
+        self.counts["submitted"] += 1
+        return self._offer(kind, doc_id)
+
+    def _offer(self, kind: str, doc_id: str) -> bool:
+        key = (kind, doc_id)
+        if key in self.in_flight:
+            return True
+        try:
+            self.queue.put_nowait(key)
+        except asyncio.QueueFull:
+            # Backpressure: the document stays pending in Mongo until the queue drains
+            self.counts["deferred"] += 1
+            return False
+        self.in_flight.add(key)
+        return True
+
+    # --- Worker ---
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + MODERATION_BATCH_WAIT_MS / 1000
+            while len(batch) < MODERATION_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            try:
+                await self._moderate_batch(batch)
+            except Exception as e:
+                # Items stay pending and are picked up again by the sweeper
+                self.counts["errors"] += 1
+                print(f"❌ Moderation batch of {len(batch)} failed: {e}")
+            finally:
+                self.batch_ms.append((time.perf_counter() - started) * 1000)
+                for key in batch:
+                    self.in_flight.discard(key)
+                    self.queue.task_done()
+
+    async def _moderate_batch(self, batch: List[Tuple[str, str]]):
+        docs = []
+        for kind, collection in COLLECTIONS.items():
+            ids = [ObjectId(doc_id) for k, doc_id in batch if k == kind]
+            if ids:
+                async for doc in get_collection(collection).find({"_id": {"$in": ids}, "moderation_status": PENDING}):
+                    docs.append((kind, doc))
+        if not docs:
+            return
+
+        verdicts = await self.classify([doc["content"] for _, doc in docs])
+        now = datetime.utcnow()
+
+        # Conditional per document: another worker may have moderated some of these
+        # meanwhile, and only whoever moves a document out of pending applies its side effects
+        results = await asyncio.gather(*[
+            get_collection(COLLECTIONS[kind]).update_one(
+                {"_id": doc["_id"], "moderation_status": PENDING},
+                {"$set": {"moderation_status": status, "moderation_flags": flags, "moderated_at": now}}
+            )
+            for (kind, doc), (status, flags) in zip(docs, verdicts)
+        ])
+
+        for (kind, doc), (status, flags), result in zip(docs, verdicts, results):
+            if result.matched_count == 0:
+                self.counts["skipped"] += 1
+                continue
+            self.counts["processed"] += 1
+            self.counts[status] += 1
+            self.processed_at.append(time.monotonic())
+            doc["moderation_status"], doc["moderation_flags"] = status, flags
+            if status != APPROVED and kind == "reply":
+                # reply_count only counts what readers can see
+                await get_collection("posts").update_one({"_id": ObjectId(doc["post_id"])}, {"$inc": {"reply_count": -1}})
+            if status == APPROVED and self.on_approved:
+                await self.on_approved(kind, doc)
+
+    async def classify(self, texts: List[str]) -> List[Tuple[str, List[str]]]:
+        """(status, flags) per text."""
+        verdicts = []
+        for text in texts:
+            flags = [reason for pattern, reason in BLOCK_PATTERNS if pattern.search(text)]
+            if any(p.search(text) for p in CRISIS_PATTERNS):
+                flags.append("crisis")
+            blocked = [f for f in flags if f != "crisis"]
+            verdicts.append((HIDDEN if blocked else APPROVED, flags))
+
+        # Semantic pass over whatever the lexicon let through
+        undecided = [i for i, (status, _) in enumerate(verdicts) if status == APPROVED]
+        if undecided:
+            similarity = await self._exemplar_similarity([texts[i] for i in undecided])
+            if similarity is not None:
+                for i, score in zip(undecided, similarity):
+                    if score >= MODERATION_SIMILARITY:
+                        verdicts[i] = (REVIEW, verdicts[i][1] + ["similar_to_flagged"])
+        return verdicts
+
+    async def _exemplar_similarity(self, texts: List[str]) -> Optional[np.ndarray]:
+        try:
+            embeddings = _embeddings()
+        except Exception:
+            embeddings = None
+        if embeddings is None:
+            return None
+        if self.exemplar_vectors is None:
+            self.exemplar_vectors = _unit(await asyncio.to_thread(embeddings.embed_documents, FLAGGED_EXEMPLARS))
+        vectors = _unit(await asyncio.to_thread(embeddings.embed_documents, texts))
+        return (vectors @ self.exemplar_vectors.T).max(axis=1)
+
+    # --- Sweeper ---
+
+    async def _sweep(self):
+        """Re-queues content left pending by a full queue, a failed batch or a restart."""
+        while True:
+            try:
+                cutoff = datetime.utcnow() - timedelta(seconds=5)
+                for kind, collection in COLLECTIONS.items():
+                    space = MODERATION_QUEUE_SIZE - self.queue.qsize()
+                    if space <= 0:
+                        break
+                    cursor = get_collection(collection).find(
+                        {"moderation_status": PENDING, "created_at": {"$lt": cutoff}}, {"_id": 1}
+                    ).sort("created_at", 1).limit(space)
+                    async for doc in cursor:
+                        if not self._offer(kind, str(doc["_id"])):
+                            break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Moderation sweep failed: {e}")
+            await asyncio.sleep(MODERATION_SWEEP_SECONDS)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        last_minute = sum(1 for t in self.processed_at if now - t <= 60)
+        return {
+            "enabled": MODERATION_ENABLED,
+            "running": self.running,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_capacity": MODERATION_QUEUE_SIZE,
+            "per_minute": last_minute,
+            "avg_batch_ms": round(sum(self.batch_ms) / len(self.batch_ms), 2) if self.batch_ms else 0.0,
+            **self.counts
+        }
+
+
+# Singleton instance
+moderation = ModerationPipeline()
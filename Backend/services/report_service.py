@@ -6,8 +6,8 @@ async def create_report(user_id: str, report_data: dict):
     db = get_database()
     report = ReportModel(user_id=user_id, **report_data)
     result = await db["reports"].insert_one(report.model_dump(by_alias=True, exclude=["id"]))
-    created_report = await db["reports"].find_one({"_id": result.inserted_id})
-    return ReportModel(**created_report)
+    report.id = str(result.inserted_id)
+    return report
 
 async def get_user_reports(user_id: str, limit: int = 10) -> List[ReportModel]:
     db = get_database()
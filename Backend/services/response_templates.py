@@ -0,0 +1,300 @@
+import os
+import random
+import asyncio
+from typing import Optional
+
+# LLM polish is off by default; when on, it only runs if it finishes inside the budget
+POLISH_ENABLED = os.getenv("RESPONSE_POLISH_ENABLED", "false").lower() == "true"
+POLISH_BUDGET_MS = int(os.getenv("RESPONSE_POLISH_BUDGET_MS", "400"))
+
+DEFAULT_LANGUAGE = "en"
+
+# Several phrasings per outcome so repeated questions don't sound canned.
+TEMPLATES = {
+    "en": {
+        "appointments_listed": [
+            "Here's what you have coming up:\n{appointments}\nWould you like to change anything?",
+            "I found {count} appointment(s) for you:\n{appointments}\nLet me know if you need to reschedule.",
+            "Sure! These are your appointments:\n{appointments}\nIs there anything else I can help with?",
+        ],
+        "appointment_line": "{index}. {type} appointment with {doctor} on {time} ({status})",
+        "no_appointments": [
+            "You don't have any appointments scheduled at the moment. Would you like me to help you book one?",
+            "Your schedule is clear right now. Shall I book a session with one of our doctors?",
+        ],
+        "appointment_booked": [
+            "I've booked a {type} appointment with {doctor} ({time}). Is there anything else on your mind?",
+            "Done! You're booked with {doctor} ({time}). I'm here if you want to talk in the meantime.",
+        ],
+        "emergency_requested": [
+            "I've sent an emergency request to {doctor}. Someone will be with you as soon as possible. Please stay with me.",
+            "Your emergency request is in with {doctor}. Help is on the way, and I'm right here with you.",
+        ],
+        "booking_failed": [
+            "I tried to book the appointment, but something went wrong. Please try again.",
+        ],
+        "appointment_cancelled": [
+            "I've cancelled your {type} appointment with {doctor} scheduled for {time}. Would you like to reschedule or is there anything else I can help with?",
+            "All set, your {type} appointment with {doctor} on {time} is cancelled. Want me to find another time?",
+        ],
+        "appointment_cancelled_by_id": [
+            "I've cancelled that appointment for you. Is there anything else I can help you with? If you'd like to reschedule, just let me know.",
+        ],
+        "nothing_to_cancel": [
+            "You don't have any active appointments to cancel right now.",
+            "There's nothing to cancel. You don't have any active appointments at the moment.",
+        ],
+        "cancel_choice": [
+            "You have multiple appointments. Which one would you like to cancel?\n\n{appointments}\n\nJust tell me the number or describe which one.",
+        ],
+        "cancel_line": "{index}. {type} with {doctor} on {time}",
+        "no_doctor_available": [
+            "I couldn't find a doctor free for that right now. Would you like to try a different time?",
+        ],
+        "slot_unavailable": [
+            "{doctor} isn't available at that time. These times are open:\n{slots}\nWould one of them work for you?",
+        ],
+        "appointment_not_found": [
+            "I couldn't find that appointment. Would you like me to show you your current appointments?",
+        ],
+        "appointment_not_yours": [
+            "I'm sorry, but I can't cancel that appointment as it doesn't belong to you.",
+        ],
+        "cancel_failed": [
+            "I had trouble cancelling that appointment. Could you try again?",
+        ],
+        "knowledge_unavailable": [
+            "I want to be careful here. I don't have enough verified information to answer that safely. Let's talk to a professional.",
+        ],
+        "check_appointments_failed": [
+            "I'm having trouble checking your appointments right now. Could you try again?",
+        ],
+        "cancel_appointment_failed": [
+            "I'm having trouble cancelling that appointment right now. Please try again.",
+        ],
+        "tool_failed": [
+            "I ran into a problem doing that. Could you try again in a moment?",
+        ],
+        "pending_time": "pending scheduling",
+        "a_doctor": "a doctor",
+        "time_format": "{month} {day} at {hour12}:{minute} {ampm}",
+        "months": ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"],
+        "labels": {
+            "normal": "normal", "emergency": "emergency",
+            "requested": "requested", "booked": "booked", "live": "live", "completed": "completed", "cancelled": "cancelled",
+        },
+    },
+    "es": {
+        "appointments_listed": [
+            "Estas son tus próximas citas:\n{appointments}\n¿Quieres cambiar algo?",
+            "Encontré {count} cita(s) para ti:\n{appointments}\nAvísame si necesitas reprogramar.",
+        ],
+        "appointment_line": "{index}. Cita {type} con {doctor} el {time} ({status})",
+        "no_appointments": [
+            "No tienes citas programadas en este momento. ¿Quieres que te ayude a reservar una?",
+        ],
+        "appointment_booked": [
+            "He reservado una cita {type} con {doctor} ({time}). ¿Hay algo más en lo que pueda ayudarte?",
+        ],
+        "emergency_requested": [
+            "He enviado una solicitud de emergencia a {doctor}. Alguien te atenderá lo antes posible. Quédate conmigo.",
+        ],
+        "booking_failed": [
+            "Intenté reservar la cita, pero algo salió mal. Por favor, inténtalo de nuevo.",
+        ],
+        "appointment_cancelled": [
+            "He cancelado tu cita {type} con {doctor} programada para {time}. ¿Quieres reprogramarla?",
+        ],
+        "appointment_cancelled_by_id": [
+            "He cancelado esa cita. Si quieres reprogramarla, solo dímelo.",
+        ],
+        "nothing_to_cancel": [
+            "No tienes citas activas para cancelar en este momento.",
+        ],
+        "cancel_choice": [
+            "Tienes varias citas. ¿Cuál quieres cancelar?\n\n{appointments}\n\nDime el número o descríbela.",
+        ],
+        "cancel_line": "{index}. {type} con {doctor} el {time}",
+        "no_doctor_available": [
+            "No encontré ningún médico disponible para eso ahora mismo. ¿Quieres probar otro horario?",
+        ],
+        "slot_unavailable": [
+            "{doctor} no está disponible a esa hora. Estos horarios están libres:\n{slots}\n¿Te sirve alguno?",
+        ],
+        "appointment_not_found": [
+            "No encontré esa cita. ¿Quieres que te muestre tus citas actuales?",
+        ],
+        "appointment_not_yours": [
+            "Lo siento, no puedo cancelar esa cita porque no es tuya.",
+        ],
+        "cancel_failed": [
+            "Tuve problemas para cancelar esa cita. ¿Puedes intentarlo de nuevo?",
+        ],
+        "knowledge_unavailable": [
+            "Quiero tener cuidado con esto. No tengo suficiente información verificada para responder de forma segura. Hablemos con un profesional.",
+        ],
+        "check_appointments_failed": [
+            "Ahora mismo tengo problemas para consultar tus citas. ¿Puedes intentarlo de nuevo?",
+        ],
+        "cancel_appointment_failed": [
+            "Ahora mismo tengo problemas para cancelar esa cita. Por favor, inténtalo de nuevo.",
+        ],
+        "tool_failed": [
+            "Tuve un problema al hacerlo. ¿Puedes intentarlo de nuevo en un momento?",
+        ],
+        "pending_time": "pendiente de programar",
+        "a_doctor": "un médico",
+        "time_format": "{day} de {month} a las {hour}:{minute}",
+        "months": ["enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"],
+        "labels": {
+            "normal": "normal", "emergency": "de emergencia",
+            "requested": "solicitada", "booked": "reservada", "live": "en curso", "completed": "completada", "cancelled": "cancelada",
+        },
+    },
+    "hi": {
+        "appointments_listed": [
+            "ये आपकी आने वाली अपॉइंटमेंट्स हैं:\n{appointments}\nक्या आप कुछ बदलना चाहेंगे?",
+        ],
+        "appointment_line": "{index}. {doctor} के साथ {type} अपॉइंटमेंट, {time} ({status})",
+        "no_appointments": [
+            "अभी आपकी कोई अपॉइंटमेंट नहीं है। क्या मैं एक बुक करने में मदद करूँ?",
+        ],
+        "appointment_booked": [
+            "मैंने {doctor} के साथ {type} अपॉइंटमेंट बुक कर दी है ({time})। क्या कुछ और है जिसमें मैं मदद कर सकूँ?",
+        ],
+        "emergency_requested": [
+            "मैंने {doctor} को आपातकालीन अनुरोध भेज दिया है। जल्द ही कोई आपसे जुड़ेगा। कृपया मेरे साथ रहें।",
+        ],
+        "booking_failed": [
+            "मैंने अपॉइंटमेंट बुक करने की कोशिश की, लेकिन कुछ गलत हो गया। कृपया फिर से कोशिश करें।",
+        ],
+        "appointment_cancelled": [
+            "मैंने {doctor} के साथ {time} की आपकी {type} अपॉइंटमेंट रद्द कर दी है। क्या आप दोबारा समय तय करना चाहेंगे?",
+        ],
+        "appointment_cancelled_by_id": [
+            "मैंने वह अपॉइंटमेंट रद्द कर दी है। अगर आप दोबारा समय तय करना चाहें तो बताइए।",
+        ],
+        "nothing_to_cancel": [
+            "अभी रद्द करने के लिए आपकी कोई सक्रिय अपॉइंटमेंट नहीं है।",
+        ],
+        "cancel_choice": [
+            "आपकी कई अपॉइंटमेंट्स हैं। आप कौन सी रद्द करना चाहेंगे?\n\n{appointments}\n\nबस नंबर बताइए।",
+        ],
+        "cancel_line": "{index}. {doctor} के साथ {type}, {time}",
+        "no_doctor_available": [
+            "मुझे अभी इसके लिए कोई डॉक्टर उपलब्ध नहीं मिला। क्या आप कोई और समय आज़माना चाहेंगे?",
+        ],
+        "slot_unavailable": [
+            "{doctor} उस समय उपलब्ध नहीं हैं। ये समय खाली हैं:\n{slots}\nक्या इनमें से कोई समय आपके लिए ठीक रहेगा?",
+        ],
+        "appointment_not_found": [
+            "मुझे वह अपॉइंटमेंट नहीं मिली। क्या मैं आपकी मौजूदा अपॉइंटमेंट्स दिखाऊँ?",
+        ],
+        "appointment_not_yours": [
+            "माफ़ कीजिए, मैं वह अपॉइंटमेंट रद्द नहीं कर सकती क्योंकि वह आपकी नहीं है।",
+        ],
+        "cancel_failed": [
+            "उस अपॉइंटमेंट को रद्द करने में दिक्कत हुई। क्या आप फिर से कोशिश करेंगे?",
+        ],
+        "knowledge_unavailable": [
+            "मैं यहाँ सावधानी रखना चाहती हूँ। इसका सुरक्षित जवाब देने के लिए मेरे पास पर्याप्त प्रमाणित जानकारी नहीं है। चलिए किसी विशेषज्ञ से बात करते हैं।",
+        ],
+        "check_appointments_failed": [
+            "अभी आपकी अपॉइंटमेंट्स देखने में दिक्कत हो रही है। क्या आप फिर से कोशिश करेंगे?",
+        ],
+        "cancel_appointment_failed": [
+            "अभी उस अपॉइंटमेंट को रद्द करने में दिक्कत हो रही है। कृपया फिर से कोशिश करें।",
+        ],
+        "tool_failed": [
+            "ऐसा करने में कुछ दिक्कत आई। क्या आप थोड़ी देर में फिर से कोशिश करेंगे?",
+        ],
+        "pending_time": "समय तय होना बाकी",
+        "a_doctor": "एक डॉक्टर",
+        "time_format": "{day} {month}, {hour}:{minute} बजे",
+        "months": ["जनवरी", "फ़रवरी", "मार्च", "अप्रैल", "मई", "जून", "जुलाई", "अगस्त", "सितंबर", "अक्टूबर", "नवंबर", "दिसंबर"],
+        "labels": {
+            "normal": "सामान्य", "emergency": "आपातकालीन",
+            "requested": "अनुरोधित", "booked": "बुक", "live": "चालू", "completed": "पूरी", "cancelled": "रद्द",
+        },
+    },
+}
+
+
+def _language(language: Optional[str]) -> str:
+    if not language:
+        return DEFAULT_LANGUAGE
+    code = language.split("-")[0].lower()
+    return code if code in TEMPLATES else DEFAULT_LANGUAGE
+
+
+def _template(key: str, language: str):
+    table = TEMPLATES[_language(language)]
+    if key in table:
+        return table[key]
+    return TEMPLATES[DEFAULT_LANGUAGE][key]
+
+
+def render(key: str, language: str = DEFAULT_LANGUAGE, **fields) -> str:
+    template = _template(key, language)
+    if isinstance(template, list):
+        template = random.choice(template)
+    return template.format(**fields)
+
+
+def format_time(scheduled_time, language: str = DEFAULT_LANGUAGE) -> str:
+    if not scheduled_time:
+        return _template("pending_time", language)
+    # Built from per-language parts rather than strftime, whose names follow the server locale
+    return _template("time_format", language).format(
+        month=_template("months", language)[scheduled_time.month - 1],
+        day=scheduled_time.day,
+        hour=f"{scheduled_time.hour:02d}",
+        hour12=f"{(scheduled_time.hour % 12) or 12:02d}",
+        minute=f"{scheduled_time.minute:02d}",
+        ampm="AM" if scheduled_time.hour < 12 else "PM"
+    )
+
+
+def format_label(value: str, language: str = DEFAULT_LANGUAGE) -> str:
+    """Appointment type / status word in the user's language (unknown values pass through)."""
+    return _template("labels", language).get(value, value)
+
+
+def format_doctor(doctor_name: Optional[str], language: str = DEFAULT_LANGUAGE) -> str:
+    if not doctor_name:
+        return _template("a_doctor", language)
+    return doctor_name if doctor_name.startswith("Dr.") else f"Dr. {doctor_name}"
+
+
+def render_appointment_list(appointments: list, doctor_map: dict, language: str = DEFAULT_LANGUAGE, line_key: str = "appointment_line") -> str:
+    lines = []
+    for idx, appt in enumerate(appointments, 1):
+        lines.append(render(
+            line_key,
+            language,
+            index=idx,
+            type=format_label(appt.type, language).capitalize(),
+            doctor=format_doctor(doctor_map.get(appt.doctor_id), language),
+            time=format_time(appt.scheduled_time, language),
+            status=format_label(appt.status, language)
+        ))
+    return "\n".join(lines)
+
+
+async def polish(text: str, llm_call, budget_ms: int = POLISH_BUDGET_MS) -> str:
+    """
+    Optionally rewrites a rendered template with the LLM. llm_call is an async
+    callable taking the draft text. The template is returned unchanged when polish
+    is disabled, the call fails, or it doesn't finish inside budget_ms.
+    """
+    if not POLISH_ENABLED or budget_ms <= 0:
+        return text
+    try:
+        polished = await asyncio.wait_for(llm_call(text), timeout=budget_ms / 1000)
+        return polished.strip() if polished else text
+    except asyncio.TimeoutError:
+        print(f"⏱️ Response polish exceeded {budget_ms}ms budget, using template.")
+        return text
+    except Exception as e:
+        print(f"❌ Response polish failed: {e}")
+        return text
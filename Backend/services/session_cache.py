@@ -0,0 +1,46 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
+
+# Sessions kept per cache (least recently used are evicted)
+SESSION_CACHE_MAX = int(os.getenv("SESSION_CACHE_MAX", "1000"))
+# Reload from Mongo after this long; versioned writes catch anything staler in between
+SESSION_CACHE_TTL_SECONDS = int(os.getenv("SESSION_CACHE_TTL_SECONDS", "900"))
+
+T = TypeVar("T")
+
+
+class SessionCache(Generic[T]):
+    """
+    Write-through cache of in-progress session models keyed by session id.
+    Services put() the model after every successful versioned write, so the
+    next turn starts from memory instead of a find_one. A write that loses
+    the version check invalidates the entry and reloads.
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX, ttl_seconds: int = SESSION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> Optional[T]:
+        entry = self.entries.get(session_id)
+        if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+            self.entries.pop(session_id, None)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(session_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, session_id: str, session: T):
+        self.entries[session_id] = (session, time.monotonic())
+        self.entries.move_to_end(session_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, session_id: str):
+        self.entries.pop(session_id, None)
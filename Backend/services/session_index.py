@@ -0,0 +1,63 @@
+from typing import List, Optional, Tuple
+from pymongo import UpdateOne
+from db.database import get_collection
+from utils.pagination import keyset_filter, keyset_sort, split_page
+
+COLLECTION = "chat_sessions"
+PREVIEW_CHARS = 120
+
+
+async def record_messages(docs: List[dict]):
+    """
+    Folds a batch of saved chat messages into chat_sessions: one atomic upsert
+    per session bumping message_count and moving last_message/last_activity.
+    """
+    collection = get_collection(COLLECTION)
+    if collection is None or not docs:
+        return
+
+    sessions = {}
+    for doc in docs:
+        key = (doc["user_id"], doc["session_id"])
+        entry = sessions.setdefault(key, {"count": 0, "first": doc, "last": doc})
+        entry["count"] += 1
+        if doc["timestamp"] >= entry["last"]["timestamp"]:
+            entry["last"] = doc
+        if doc["timestamp"] < entry["first"]["timestamp"]:
+            entry["first"] = doc
+
+    ops = []
+    for (user_id, session_id), entry in sessions.items():
+        last = entry["last"]
+        ops.append(UpdateOne(
+            {"user_id": user_id, "session_id": session_id},
+            {
+                "$setOnInsert": {"created_at": entry["first"]["timestamp"]},
+                "$inc": {"message_count": entry["count"]},
+                "$max": {"last_activity": last["timestamp"]},
+                "$set": {
+                    "last_message": last["content"][:PREVIEW_CHARS],
+                    "last_role": last["role"]
+                }
+            },
+            upsert=True
+        ))
+    await collection.bulk_write(ops, ordered=False)
+
+
+async def list_sessions(user_id: str, limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    A user's conversations, most recently active first. Keyset pagination on
+    (last_activity, _id): pass the returned cursor to get the next page.
+    """
+    query = {"user_id": user_id, **keyset_filter("last_activity", cursor)}
+    docs = await get_collection(COLLECTION).find(query).sort(keyset_sort("last_activity")).limit(limit + 1).to_list(length=limit + 1)
+    return split_page(docs, limit, "last_activity")
+
+
+async def get_session(user_id: str, session_id: str) -> Optional[dict]:
+    return await get_collection(COLLECTION).find_one({"user_id": user_id, "session_id": session_id})
+
+
+async def delete_session(user_id: str, session_id: str):
+    await get_collection(COLLECTION).delete_one({"user_id": user_id, "session_id": session_id})
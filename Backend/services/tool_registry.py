@@ -0,0 +1,421 @@
+import time
+import asyncio
+import traceback
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from services import response_templates as templates
+from services.appointment_service import book_appointment, get_patient_appointments, update_appointment_status, get_appointment
+from services.doctor_service import get_all_doctors
+from services.doctor_assignment import NoDoctorAvailable
+from services.calendar_service import get_free_slots, SlotUnavailable
+from services.emergency_dispatch import PRIORITY_CRISIS
+from services.moderation import CRISIS_PATTERNS
+
+
+@dataclass
+class ToolContext:
+    user_id: str
+    session_id: str
+    user_message: str
+    language: str = "en"
+    # Optional async rewrite hook for templated replies (see response_templates.polish)
+    polish: Optional[Callable[[str], Awaitable[str]]] = None
+
+
+@dataclass
+class ToolResult:
+    text: str
+    facialExpression: Optional[str] = None
+    animation: Optional[str] = None
+    data: Optional[dict] = None
+
+
+@dataclass
+class Tool:
+    name: str
+    handler: Callable[..., Awaitable[ToolResult]]
+    # Names of DATA_LOADERS entries the handler needs, fetched before it runs
+    depends_on: Tuple[str, ...] = ()
+    # Writes data: runs alone, in call order, and reloads `invalidates` for the tools after it
+    side_effects: bool = False
+    invalidates: Tuple[str, ...] = ()
+
+
+@dataclass
+class ToolMetrics:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    def record(self, elapsed_ms: float, failed: bool = False):
+        self.calls += 1
+        self.errors += 1 if failed else 0
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2)
+        }
+
+
+# Shared data a tool can declare. Every loader needed by a turn runs once, concurrently.
+DATA_LOADERS: Dict[str, Callable[[ToolContext], Awaitable]] = {
+    "appointments": lambda ctx: get_patient_appointments(ctx.user_id),
+    "doctors": lambda ctx: get_all_doctors(),
+}
+
+TOOLS: Dict[str, Tool] = {}
+TOOL_METRICS: Dict[str, ToolMetrics] = {}
+LOADER_METRICS: Dict[str, ToolMetrics] = {}
+
+
+def tool(name: str, depends_on: Tuple[str, ...] = (), side_effects: bool = False, invalidates: Tuple[str, ...] = ()):
+    def decorator(handler):
+        TOOLS[name] = Tool(name=name, handler=handler, depends_on=depends_on, side_effects=side_effects, invalidates=invalidates)
+        return handler
+    return decorator
+
+
+def get_tool_metrics() -> dict:
+    return {
+        "tools": {name: m.as_dict() for name, m in TOOL_METRICS.items()},
+        "loaders": {name: m.as_dict() for name, m in LOADER_METRICS.items()}
+    }
+
+
+# Alternatives offered when the requested time can't be booked
+SUGGESTED_SLOTS = 3
+
+
+def _doctor_map(doctors) -> dict:
+    return {str(d.id): d.name for d in doctors or []}
+
+
+# --- TOOLS ---
+
+@tool("book_appointment", depends_on=("doctors",), side_effects=True, invalidates=("appointments",))
+async def _book_appointment(ctx: ToolContext, params: dict, data: dict) -> ToolResult:
+    appt_data = params.copy()
+    doctors = data["doctors"]
+    doctor_map = _doctor_map(doctors)
+
+    # doctor_id "auto" is resolved by the assignment engine
+    specialization = appt_data.pop("specialization", None)
+    # Emergencies raised with crisis language jump the dispatch queue
+    if appt_data.get("type") == "emergency" and any(p.search(ctx.user_message or "") for p in CRISIS_PATTERNS):
+        appt_data["priority"] = PRIORITY_CRISIS
+
+    try:
+        new_appt = await book_appointment(ctx.user_id, appt_data, specialization=specialization)
+    except NoDoctorAvailable:
+        return ToolResult(text=templates.render("no_doctor_available", ctx.language))
+    except SlotUnavailable as e:
+        # Offer the doctor's next free times instead of a dead end
+        free = (await get_free_slots([e.doctor_id], start=e.slot_start)).get(e.doctor_id, [])
+        if not free:
+            return ToolResult(text=templates.render("no_doctor_available", ctx.language))
+        return ToolResult(text=templates.render(
+            "slot_unavailable",
+            ctx.language,
+            doctor=templates.format_doctor(doctor_map.get(e.doctor_id), ctx.language),
+            slots="\n".join(f"- {templates.format_time(slot, ctx.language)}" for slot in free[:SUGGESTED_SLOTS])
+        ))
+    except Exception as e:
+        print(f"❌ Tool Failed: {e}")
+        return ToolResult(text=templates.render("booking_failed", ctx.language))
+
+    print(f"✅ Tool Success: Appointment {new_appt.id} created.")
+    template_key = "emergency_requested" if new_appt.type == "emergency" else "appointment_booked"
+    return ToolResult(
+        text=templates.render(
+            template_key,
+            ctx.language,
+            type=templates.format_label(new_appt.type, ctx.language),
+            doctor=templates.format_doctor(doctor_map.get(new_appt.doctor_id), ctx.language),
+            time=templates.format_time(new_appt.scheduled_time, ctx.language)
+        ),
+        data={
+            "action": "appointment_booked",
+            "appointment_id": str(new_appt.id)
+        }
+    )
+
+
+@tool("check_appointments", depends_on=("appointments", "doctors"))
+async def _check_appointments(ctx: ToolContext, params: dict, data: dict) -> ToolResult:
+    appointments = data["appointments"]
+    print(f"📅 Retrieved {len(appointments)} appointments for user")
+
+    if not appointments:
+        return ToolResult(text=templates.render("no_appointments", ctx.language), facialExpression="default")
+
+    doctor_map = _doctor_map(data["doctors"])
+    recent = appointments[:5]  # Limit to 5 most recent
+
+    # Render from templates; the LLM only rewrites it if it fits the latency budget
+    rendered = templates.render(
+        "appointments_listed",
+        ctx.language,
+        count=len(recent),
+        appointments=templates.render_appointment_list(recent, doctor_map, ctx.language)
+    )
+    if ctx.polish:
+        rendered = await templates.polish(rendered, ctx.polish)
+
+    return ToolResult(
+        text=rendered,
+        facialExpression="happy",
+        animation="Talking",
+        # Store appointment IDs in response for potential follow-up cancellations
+        data={
+            "action": "appointments_listed",
+            "appointments": [
+                {
+                    "id": str(appt.id),
+                    "doctor_id": appt.doctor_id,
+                    "type": appt.type,
+                    "scheduled_time": appt.scheduled_time.isoformat() if appt.scheduled_time else None,
+                    "status": appt.status
+                } for appt in recent
+            ]
+        }
+    )
+
+
+@tool("cancel_appointment", depends_on=("appointments", "doctors"), side_effects=True, invalidates=("appointments",))
+async def _cancel_appointment(ctx: ToolContext, params: dict, data: dict) -> ToolResult:
+    appointment_id = params.get("appointment_id")
+    doctor_map = _doctor_map(data["doctors"])
+
+    if appointment_id:
+        # Appointment ID was provided - verify it exists and belongs to user
+        appt = await get_appointment(appointment_id)
+        if not appt:
+            return ToolResult(text=templates.render("appointment_not_found", ctx.language), facialExpression="sad")
+        if appt.user_id != ctx.user_id:
+            return ToolResult(text=templates.render("appointment_not_yours", ctx.language), facialExpression="sad")
+
+        updated = await update_appointment_status(appointment_id, "cancelled")
+        if not updated:
+            return ToolResult(text=templates.render("cancel_failed", ctx.language), facialExpression="sad")
+
+        print(f"✅ Appointment {appointment_id} cancelled successfully")
+        return ToolResult(text=templates.render("appointment_cancelled_by_id", ctx.language), facialExpression="default", animation="Talking")
+
+    # No ID provided, try to figure out which appointment to cancel
+    active_appointments = [a for a in data["appointments"] if a.status not in ["cancelled", "completed"]]
+
+    if not active_appointments:
+        return ToolResult(text=templates.render("nothing_to_cancel", ctx.language), facialExpression="default")
+
+    if len(active_appointments) == 1:
+        # Only one active appointment - cancel it directly
+        appt = active_appointments[0]
+        updated = await update_appointment_status(str(appt.id), "cancelled")
+        if not updated:
+            return ToolResult(text=templates.render("cancel_failed", ctx.language))
+
+        print(f"✅ Auto-cancelled appointment {appt.id}")
+        return ToolResult(
+            text=templates.render(
+                "appointment_cancelled",
+                ctx.language,
+                type=templates.format_label(appt.type, ctx.language),
+                doctor=templates.format_doctor(doctor_map.get(appt.doctor_id), ctx.language),
+                time=templates.format_time(appt.scheduled_time, ctx.language)
+            ),
+            facialExpression="default",
+            animation="Talking"
+        )
+
+    # Multiple active appointments - list them
+    return ToolResult(
+        text=templates.render(
+            "cancel_choice",
+            ctx.language,
+            appointments=templates.render_appointment_list(active_appointments, doctor_map, ctx.language, line_key="cancel_line")
+        ),
+        facialExpression="default",
+        # Store appointment IDs for potential follow-up
+        data={
+            "action": "awaiting_cancellation_choice",
+            "appointments": [
+                {
+                    "id": str(appt.id),
+                    "index": idx,
+                    "doctor_id": appt.doctor_id,
+                    "scheduled_time": appt.scheduled_time.isoformat() if appt.scheduled_time else None
+                } for idx, appt in enumerate(active_appointments, 1)
+            ]
+        }
+    )
+
+
+@tool("consult_knowledge_base")
+async def _consult_knowledge_base(ctx: ToolContext, params: dict, data: dict) -> ToolResult:
+    from rag.rag_chain import rag_chain
+
+    query = params.get("query") or ctx.user_message
+    print(f"🧠 RAG Query: {query}")
+
+    rag_response = await rag_chain.generate_response(query)
+    if not rag_response:
+        print("⚠️ RAG returned None, falling back.")
+        return ToolResult(text=templates.render("knowledge_unavailable", ctx.language))
+
+    print("✅ RAG Response generated.")
+    # Adjust expression for supportive tone
+    return ToolResult(text=rag_response, facialExpression="default", animation="Talking")
+
+
+# Template shown when a tool raises unexpectedly
+TOOL_ERROR_TEMPLATES = {
+    "check_appointments": "check_appointments_failed",
+    "cancel_appointment": "cancel_appointment_failed",
+}
+DEFAULT_TOOL_ERROR_TEMPLATE = "tool_failed"
+
+
+def tool_error_text(name: Optional[str], language: str) -> str:
+    return templates.render(TOOL_ERROR_TEMPLATES.get(name, DEFAULT_TOOL_ERROR_TEMPLATE), language)
+
+
+# --- EXECUTION ---
+
+async def _timed(metrics: Dict[str, ToolMetrics], name: str, coro):
+    start = time.perf_counter()
+    failed = False
+    try:
+        return await coro
+    except Exception:
+        failed = True
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.setdefault(name, ToolMetrics()).record(elapsed_ms, failed)
+
+
+async def _load(name: str, ctx: ToolContext):
+    try:
+        return await _timed(LOADER_METRICS, name, DATA_LOADERS[name](ctx))
+    except Exception as e:
+        print(f"❌ Tool data '{name}' failed to load: {e}")
+        raise
+
+
+async def _run_tool(call: dict, ctx: ToolContext, loads: Dict[str, asyncio.Task]) -> ToolResult:
+    name = call["name"]
+    registered = TOOLS[name]
+
+    start = time.perf_counter()
+    try:
+        # Wait only for this tool's own dependencies, tools without any start right away
+        values = await asyncio.gather(*[loads[dep] for dep in registered.depends_on])
+        data = dict(zip(registered.depends_on, values))
+
+        print(f"🛠️ Executing Tool: {name}")
+        result = await _timed(TOOL_METRICS, name, registered.handler(ctx, call.get("parameters") or {}, data))
+    except Exception as e:
+        print(f"❌ Tool '{name}' Failed: {e}")
+        traceback.print_exc()
+        return ToolResult(text=tool_error_text(name, ctx.language))
+    print(f"⏱️ Tool {name} finished in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return result
+
+
+async def execute_tool_calls(tool_calls: List[dict], ctx: ToolContext) -> List[ToolResult]:
+    """
+    Runs the tool calls of one model response. Consecutive read-only tools
+    run in parallel; a tool with side effects runs on its own, in call
+    order, after everything before it. Each data dependency is fetched once,
+    concurrently, and shared, until a side-effecting tool invalidates it
+    (e.g. a booking makes the loaded appointments stale), after which the
+    next tool needing it gets a fresh load. Results keep the order of tool_calls;
+    a malformed entry (not an object) gets an error result in its place.
+    """
+    calls: List[Optional[dict]] = []
+    for c in tool_calls:
+        if not isinstance(c, dict):
+            print(f"⚠️ Malformed tool call: {c!r}")
+            calls.append(None)
+        elif c.get("name") in TOOLS:
+            calls.append(c)
+        else:
+            print(f"⚠️ Unknown tool requested: {c.get('name')}")
+    if not calls:
+        return []
+
+    loads: Dict[str, asyncio.Task] = {}
+    started: List[asyncio.Task] = []
+
+    def ensure_loads(group: List[dict]):
+        for name in sorted({dep for c in group for dep in TOOLS[c["name"]].depends_on}):
+            if name not in loads:
+                loads[name] = asyncio.ensure_future(_load(name, ctx))
+                started.append(loads[name])
+
+    results: List[ToolResult] = []
+    try:
+        i = 0
+        while i < len(calls):
+            if calls[i] is None:
+                results.append(ToolResult(text=tool_error_text(None, ctx.language)))
+                i += 1
+                continue
+            registered = TOOLS[calls[i]["name"]]
+            if registered.side_effects:
+                ensure_loads([calls[i]])
+                results.append(await _run_tool(calls[i], ctx, loads))
+                for name in registered.invalidates:
+                    loads.pop(name, None)
+                i += 1
+                continue
+            j = i
+            while j < len(calls) and calls[j] is not None and not TOOLS[calls[j]["name"]].side_effects:
+                j += 1
+            group = calls[i:j]
+            ensure_loads(group)
+            results.extend(await asyncio.gather(*[_run_tool(c, ctx, loads) for c in group]))
+            i = j
+        return results
+    finally:
+        for task in started:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark failures as retrieved even if every tool needing it already failed
+                task.exception()
+
+
+def merge_tool_results(response_json: dict, results: List[ToolResult]):
+    """Folds tool results into the model's response dict in place; tool text follows the model's own."""
+    if not results:
+        return
+
+    tool_text = "\n\n".join(dict.fromkeys(r.text for r in results if r.text))
+    # "..." is the placeholder for a response without text of its own (see process_with_groq)
+    own_text = (response_json.get("text") or "").strip()
+    if own_text == "...":
+        own_text = ""
+    response_json["text"] = "\n\n".join(t for t in (own_text, tool_text) if t) or response_json.get("text", "")
+
+    # Expression/animation from the last tool that set one
+    for r in results:
+        if r.facialExpression:
+            response_json["facialExpression"] = r.facialExpression
+        if r.animation:
+            response_json["animation"] = r.animation
+
+    payloads = [r.data for r in results if r.data]
+    if len(payloads) == 1:
+        response_json["data"] = payloads[0]
+    elif payloads:
+        response_json["data"] = {"action": "multiple", "results": payloads}
@@ -3,6 +3,7 @@ from typing import List, Optional
 from models.weekly_assignment import WeeklySession, WeeklyResponseItem
 from db.database import db
 from bson import ObjectId
+from services.session_cache import SessionCache
 
 # Hardcoded weekly questions for MVP
 WEEKLY_QUESTIONS = [
@@ -11,6 +12,12 @@ WEEKLY_QUESTIONS = [
     {"id": "q3", "text": "On a scale of 1 to 10, how would you rate your overall energy levels?", "type": "scale"},
 ]
 
+# Versioned writes retried this many times when another request updated the session first
+SAVE_RETRIES = 3
+
+# Write-through cache of in-progress sessions, so a turn doesn't start with a find_one
+_sessions: SessionCache[WeeklySession] = SessionCache()
+
 async def check_weekly_due(user_id: str) -> bool:
     # Check if a completed session exists for the current ISO week
     current_week = datetime.now().strftime("%Y-W%U")
@@ -43,57 +50,93 @@ async def start_weekly_session(user_id: str) -> WeeklySession:
     )
     result = await db.db.weekly_sessions.insert_one(session.model_dump(by_alias=True, exclude=["id"]))
     session.id = str(result.inserted_id)
+    _sessions.put(session.id, session)
     return session
 
-async def process_response(session_id: str, user_text: str) -> dict:
+async def get_session(session_id: str) -> Optional[WeeklySession]:
+    session = _sessions.get(session_id)
+    if session is not None:
+        return session
     session_data = await db.db.weekly_sessions.find_one({"_id": ObjectId(session_id)})
     if not session_data:
-        raise ValueError("Session not found")
-        
+        return None
     session = WeeklySession(**session_data)
-    
-    # Get current question
-    if session.current_question_index >= len(WEEKLY_QUESTIONS):
-        return {"status": "completed", "text": "You've already completed this week's check-in."}
-        
-    current_q = WEEKLY_QUESTIONS[session.current_question_index]
-    
-    # --- LOGIC: Validate & Score (Simplified) ---
-    # In a real app, we'd use LLM here to validate "Is this a valid answer?"
-    # For now, we assume valid if length > 2 chars
-    
-    response_item = WeeklyResponseItem(
-        question_id=current_q["id"],
-        question_text=current_q["text"],
-        user_audio_text=user_text,
-        validation_status="valid",
-        internal_score=0.5 # Placeholder score
+    _sessions.put(session_id, session)
+    return session
+
+async def _save_response(session: WeeklySession, response_item: WeeklyResponseItem) -> bool:
+    """
+    Appends one answer as a delta ($push, $inc, $set version and completion)
+    guarded by the session version, then mirrors it onto the cached model.
+    Returns False if another request moved the version first.
+    """
+    update = {
+        "$push": {"responses": response_item.model_dump()},
+        "$inc": {"current_question_index": 1},
+        "$set": {"version": session.version + 1}
+    }
+    is_complete = session.current_question_index + 1 >= len(WEEKLY_QUESTIONS)
+    completed_at = datetime.utcnow()
+    if is_complete:
+        update["$set"].update({"status": "completed", "completed_at": completed_at})
+
+    # Sessions from before the version backfill have no version field (the model reads them as 0)
+    version = session.version if session.version else {"$in": [0, None]}
+    result = await db.db.weekly_sessions.update_one(
+        {"_id": ObjectId(session.id), "version": version},
+        update
     )
-    
+    if result.matched_count == 0:
+        _sessions.invalidate(session.id)
+        return False
+
     session.responses.append(response_item)
     session.current_question_index += 1
+    session.version += 1
+    if is_complete:
+        session.status = "completed"
+        session.completed_at = completed_at
+    _sessions.put(session.id, session)
+    return True
+
+async def process_response(session_id: str, user_text: str) -> dict:
+    for _ in range(SAVE_RETRIES):
+        session = await get_session(session_id)
+        if not session:
+            raise ValueError("Session not found")
+
+        # Get current question
+        if session.current_question_index >= len(WEEKLY_QUESTIONS):
+            return {"status": "completed", "text": "You've already completed this week's check-in."}
+
+        current_q = WEEKLY_QUESTIONS[session.current_question_index]
+
+        # --- LOGIC: Validate & Score (Simplified) ---
+        # In a real app, we'd use LLM here to validate "Is this a valid answer?"
+        # For now, we assume valid if length > 2 chars
+
+        response_item = WeeklyResponseItem(
+            question_id=current_q["id"],
+            question_text=current_q["text"],
+            user_audio_text=user_text,
+            validation_status="valid",
+            internal_score=0.5 # Placeholder score
+        )
+
+        # Save update; on a version conflict, reload and answer against the fresh state
+        if await _save_response(session, response_item):
+            break
+    else:
+        raise RuntimeError("Session was updated concurrently. Please try again.")
     
     # Check completion
-    is_complete = session.current_question_index >= len(WEEKLY_QUESTIONS)
+    is_complete = session.status == "completed"
     if is_complete:
-        session.status = "completed"
-        session.completed_at = datetime.utcnow()
         response_text = "Thank you. That completes your weekly check-in. I've updated your profile."
         next_q = None
     else:
         next_q = WEEKLY_QUESTIONS[session.current_question_index]["text"]
         response_text = "Got it. " + next_q # Simple acknowledgement + next Q
-        
-    # Save update
-    # Save update
-    update_data = session.model_dump(by_alias=True)
-    if "_id" in update_data:
-        del update_data["_id"]
-        
-    await db.db.weekly_sessions.replace_one(
-        {"_id": ObjectId(session_id)}, 
-        update_data
-    )
     
     return {
         "status": session.status,
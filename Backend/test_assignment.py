@@ -0,0 +1,90 @@
+"""
+Checks that automatic doctor assignment gives up once every candidate's
+claim has failed, instead of retrying the least-loaded doctor forever.
+
+Runs without MongoDB: the engine's load reservations are kept in a dict.
+
+Usage (from Backend/):
+    python test_assignment.py
+"""
+import asyncio
+from types import SimpleNamespace
+from services.doctor_assignment import AssignmentEngine, NoDoctorAvailable
+
+DOCTORS = [
+    SimpleNamespace(id="d1", specialization="Therapist", availability_status="Available"),
+    SimpleNamespace(id="d2", specialization="Therapist", availability_status="Available"),
+    SimpleNamespace(id="d3", specialization="Psychiatrist", availability_status="Busy"),
+]
+
+
+def make_engine() -> AssignmentEngine:
+    engine = AssignmentEngine()
+    loads = {d.id: 0 for d in DOCTORS}
+
+    async def ensure_loaded():
+        if engine.directory_version is not None:
+            return
+        engine.heaps = {"*": []}
+        for d in DOCTORS:
+            engine.ranks[d.id] = {"Available": 0, "Busy": 1}[d.availability_status]
+            engine.specializations[d.id] = d.specialization.lower()
+            engine.heaps.setdefault(d.specialization.lower(), [])
+            engine._set_load(d.id, loads[d.id])
+        engine.directory_version = 0
+
+    async def reserve(doctor_id, capped):
+        loads[doctor_id] += 1
+        return loads[doctor_id]
+
+    async def unreserve(doctor_id):
+        loads[doctor_id] -= 1
+        return {"_id": doctor_id, "active": loads[doctor_id]}
+
+    engine._ensure_loaded = ensure_loaded
+    engine._reserve = reserve
+    engine._unreserve = unreserve
+    engine.test_loads = loads
+    return engine
+
+
+async def test_every_claim_fails():
+    engine = make_engine()
+    tried = []
+
+    async def claim(doctor_id):
+        tried.append(doctor_id)
+        return False
+
+    try:
+        await asyncio.wait_for(engine.assign(claim=claim), timeout=5)
+        raise AssertionError("assign() should raise NoDoctorAvailable")
+    except NoDoctorAvailable:
+        pass
+    assert sorted(tried) == ["d1", "d2", "d3"], tried
+    assert all(load == 0 for load in engine.test_loads.values()), engine.test_loads
+    assert not engine.lock.locked()
+    print("✅ assign() stops after every candidate's claim fails")
+
+
+async def test_falls_through_to_next_candidate():
+    engine = make_engine()
+
+    async def claim(doctor_id):
+        return doctor_id == "d3"
+
+    doctor_id = await asyncio.wait_for(engine.assign(claim=claim), timeout=5)
+    assert doctor_id == "d3", doctor_id
+    assert engine.test_loads == {"d1": 0, "d2": 0, "d3": 1}, engine.test_loads
+    # The vetoed doctors are still candidates for the next booking
+    assert await asyncio.wait_for(engine.assign(), timeout=5) in ("d1", "d2")
+    print("✅ assign() moves on to the next candidate after a veto")
+
+
+async def main():
+    await test_every_claim_fails()
+    await test_falls_through_to_next_candidate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+from bson import ObjectId
+
+# Keyset ("seek") pagination on (<timestamp field>, _id). The cursor is the
+# last row of the previous page, so a page costs the same at any depth.
+
+
+def encode_cursor(value: datetime, _id) -> str:
+    return f"{value.isoformat()}|{_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        ts, _id = cursor.split("|", 1)
+        return datetime.fromisoformat(ts), ObjectId(_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def keyset_filter(field: str, cursor: Optional[str], descending: bool = True) -> dict:
+    """Filter for rows after `cursor` in (field, _id) order. Raises ValueError on a bad cursor."""
+    if not cursor:
+        return {}
+    value, last_id = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {field: {op: value}},
+        {field: value, "_id": {op: last_id}}
+    ]}
+
+
+def keyset_sort(field: str, descending: bool = True) -> List[tuple]:
+    direction = -1 if descending else 1
+    return [(field, direction), ("_id", direction)]
+
+
+def split_page(docs: List[dict], limit: int, field: str) -> Tuple[List[dict], Optional[str]]:
+    """Trims a limit+1 fetch to `limit` rows and the cursor for the next page (None on the last page)."""
+    if len(docs) > limit:
+        last = docs[limit - 1]
+        return docs[:limit], encode_cursor(last[field], last["_id"])
+    return docs, None
@@ -1,8 +1,9 @@
 import os
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 
@@ -11,6 +12,10 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Shared secret for ops endpoints (/metrics); unset disables them
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Shared secret for admin endpoints (linking doctors to logins); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 security = HTTPBearer()
 
@@ -42,3 +47,21 @@ def get_current_user_email(payload: dict = Depends(verify_token)) -> str:
     if not email:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     return email
+
+def get_current_user_id_from_query(token: str = Query(...)) -> str:
+    """For EventSource streams, which can't send an Authorization header."""
+    return get_current_user_id(verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)))
+
+def _check_shared_token(sent: Optional[str], expected: str, name: str):
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not sent or not secrets.compare_digest(sent, expected):
+        raise HTTPException(status_code=403, detail=f"Invalid {name} token")
+
+def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """For ops endpoints: the caller must send METRICS_TOKEN in X-Metrics-Token, not a user JWT."""
+    _check_shared_token(x_metrics_token, METRICS_TOKEN, "metrics")
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """For admin endpoints: the caller must send ADMIN_TOKEN in X-Admin-Token."""
+    _check_shared_token(x_admin_token, ADMIN_TOKEN, "admin")
@@ -0,0 +1,45 @@
+import json
+from typing import Callable, List, Optional
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from services.event_bus import event_bus, Subscription
+
+# Comment line sent when idle, so proxies don't close the connection
+HEARTBEAT_SECONDS = 15
+
+
+def _format(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(jsonable_encoder(event['data']))}\n\n"
+
+
+async def _stream(request: Request, subscription: Subscription, accept: Optional[Callable[[dict], bool]], initial: List[dict]):
+    try:
+        yield "retry: 3000\n\n"
+        for event in initial:
+            yield _format(event)
+        while True:
+            if await request.is_disconnected():
+                break
+            event = await subscription.get(timeout=HEARTBEAT_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            if accept and not accept(event):
+                continue
+            yield _format(event)
+    finally:
+        subscription.close()
+
+
+def sse_response(request: Request, channel: str, accept: Optional[Callable[[dict], bool]] = None, initial: Optional[List[dict]] = None) -> StreamingResponse:
+    """
+    Streams events published on `channel` as server-sent events until the
+    client goes away. `initial` events (current state) are sent first.
+    """
+    subscription = event_bus.subscribe(channel)
+    return StreamingResponse(
+        _stream(request, subscription, accept, initial or []),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
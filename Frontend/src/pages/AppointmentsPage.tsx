@@ -14,6 +14,21 @@ export default function AppointmentsPage() {
         loadAppointments();
     }, []);
 
+    // Status changes (accepted, started, completed, cancelled) arrive pushed instead of polled
+    useEffect(() => {
+        return ApiService.subscribeAppointments((event) => {
+            setAppointments(prev => {
+                if (!prev.some(a => a.id === event.appointment_id)) {
+                    loadAppointments();
+                    return prev;
+                }
+                return prev.map(a => a.id === event.appointment_id
+                    ? { ...a, status: event.status, doctor_id: event.doctor_id, scheduled_time: event.scheduled_time }
+                    : a);
+            });
+        });
+    }, []);
+
     const loadAppointments = async () => {
         try {
             const data = await ApiService.getAppointments();
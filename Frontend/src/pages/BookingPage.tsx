@@ -14,6 +14,8 @@ export default function BookingPage() {
     const [type, setType] = useState<'normal' | 'emergency'>(initialType);
     const [date, setDate] = useState('');
     const [time, setTime] = useState('');
+    const [freeSlots, setFreeSlots] = useState<string[]>([]);
+    const [slotsLoading, setSlotsLoading] = useState(false);
     const [loading, setLoading] = useState(false);
     const [doctors, setDoctors] = useState<Doctor[]>([]);
     const [selectedDoctorId, setSelectedDoctorId] = useState(doctorId || '');
@@ -22,24 +24,44 @@ export default function BookingPage() {
         ApiService.getDoctors().then(setDoctors);
     }, []);
 
+    // Only offer times the doctor actually has free on the chosen day
+    useEffect(() => {
+        setTime('');
+        if (!selectedDoctorId || !date) {
+            setFreeSlots([]);
+            return;
+        }
+        const [year, month, day] = date.split('-').map(Number);
+        const dayStart = new Date(year, month - 1, day).toISOString();
+        setSlotsLoading(true);
+        ApiService.getFreeSlots([selectedDoctorId], dayStart, 1)
+            .then(res => setFreeSlots(res.doctors.find(d => d.doctor_id === selectedDoctorId)?.slots || []))
+            .catch(() => setFreeSlots([]))
+            .finally(() => setSlotsLoading(false));
+    }, [selectedDoctorId, date]);
+
+    const formatSlot = (slot: string) =>
+        new Date(slot.endsWith('Z') ? slot : `${slot}Z`).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+
     const handleSubmit = async (e: React.FormEvent) => {
         e.preventDefault();
         setLoading(true);
 
         try {
-            let scheduledTime = undefined;
-            if (type === 'normal') {
-                const [year, month, day] = date.split('-').map(Number);
-                const [hours, minutes] = time.split(':').map(Number);
-                const localDate = new Date(year, month - 1, day, hours, minutes);
-                scheduledTime = localDate.toISOString();
-            }
+            // `time` is a free slot as returned by the API (UTC)
+            const scheduledTime = type === 'normal' ? time : undefined;
 
             await ApiService.bookAppointment(selectedDoctorId, type, scheduledTime);
             navigate('/appointments');
-        } catch (error) {
+        } catch (error: any) {
             console.error("Booking failed", error);
-            alert("Failed to book appointment. Please try again.");
+            if (error?.response?.status === 409) {
+                alert("That time was just taken. Please pick another slot.");
+                setFreeSlots(slots => slots.filter(s => s !== time));
+                setTime('');
+            } else {
+                alert("Failed to book appointment. Please try again.");
+            }
         } finally {
             setLoading(false);
         }
@@ -121,13 +143,20 @@ export default function BookingPage() {
                                 </div>
                                 <div>
                                     <label className="block text-xs uppercase font-bold tracking-wider text-sana-text-muted mb-2">Time</label>
-                                    <input
-                                        type="time"
+                                    <select
                                         required
                                         className="glass-input w-full"
                                         value={time}
                                         onChange={e => setTime(e.target.value)}
-                                    />
+                                        disabled={!date || slotsLoading}
+                                    >
+                                        <option value="" className="text-slate-900">
+                                            {slotsLoading ? 'Loading...' : (date && freeSlots.length === 0 ? 'No free times' : 'Choose a time...')}
+                                        </option>
+                                        {freeSlots.map(slot => (
+                                            <option key={slot} value={slot} className="text-slate-900">{formatSlot(slot)}</option>
+                                        ))}
+                                    </select>
                                 </div>
                             </div>
                         )}
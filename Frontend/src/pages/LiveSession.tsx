@@ -62,6 +62,19 @@ export default function LiveSession() {
         };
     }, [id, navigate, updateCall, updateAppointment]);
 
+    // The other side ending or cancelling the session closes it here too
+    useEffect(() => {
+        if (!id) return;
+        return ApiService.subscribeAppointments((event) => {
+            if (event.status === 'completed' || event.status === 'cancelled') {
+                stopWebRTC();
+                updateCall('ended');
+                updateAppointment('none');
+                navigate('/appointments');
+            }
+        }, id);
+    }, [id, navigate, updateCall, updateAppointment]);
+
     const handleEndCall = () => {
         stopWebRTC();
         // setStatus('ended');
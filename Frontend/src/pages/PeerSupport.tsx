@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Layout } from '../components/Layout';
 import { Heart, Plus, X, ArrowLeft, MessageCircle, MoreHorizontal, Share2, Send } from 'lucide-react';
 import { Post } from '../types';
@@ -18,15 +18,57 @@ function PeerSupport() {
     const [newReplyContent, setNewReplyContent] = useState('');
     const [posts, setPosts] = useState<Post[]>([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+    const [repliesCursor, setRepliesCursor] = useState<string | null>(null);
+    const [loadingMoreReplies, setLoadingMoreReplies] = useState(false);
+    // Read by the live-update handler: while older replies are still unloaded, new ones arrive through paging
+    const repliesCursorRef = useRef<string | null>(null);
 
     useEffect(() => {
         loadPosts();
     }, []);
 
+    // Live updates instead of re-fetching the feed
+    useEffect(() => {
+        const close = ApiService.subscribeForum({
+            post_created: (post) => {
+                const mapped: Post = {
+                    ...post,
+                    timestamp: new Date(post.created_at).toLocaleString(),
+                    preview: post.content.length > 60 ? post.content.substring(0, 60) + '...' : post.content,
+                    replies: [],
+                    reply_count: post.reply_count ?? 0
+                };
+                setPosts(current => current.some(p => p.id === mapped.id) ? current : [mapped, ...current]);
+            },
+            reply_created: (reply) => {
+                const bump = (p: Post) => p.id === reply.post_id && !p.replies.some(r => r.id === reply.id)
+                    ? { ...p, reply_count: (p.reply_count ?? 0) + 1 }
+                    : p;
+                setPosts(current => current.map(bump));
+                setSelectedPost(current => current && current.id === reply.post_id && !current.replies.some(r => r.id === reply.id)
+                    ? {
+                        ...bump(current),
+                        replies: repliesCursorRef.current
+                            ? current.replies
+                            : [...current.replies, { ...reply, timestamp: new Date(reply.created_at).toLocaleString() }]
+                    }
+                    : current);
+            },
+            post_liked: ({ post_id, likes }) => {
+                setPosts(current => current.map(p => p.id === post_id ? { ...p, likes } : p));
+                setSelectedPost(current => current && current.id === post_id ? { ...current, likes } : current);
+            }
+        });
+        return close;
+    }, []);
+
     const loadPosts = async () => {
         try {
-            const data = await ApiService.getPosts();
-            setPosts(data);
+            const page = await ApiService.getPosts();
+            setPosts(page.posts);
+            setNextCursor(page.nextCursor);
         } catch (error) {
             console.error("Failed to load posts", error);
         } finally {
@@ -34,6 +76,55 @@ function PeerSupport() {
         }
     };
 
+    const loadMorePosts = async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const page = await ApiService.getPosts(nextCursor);
+            // Live updates may already have added some of these
+            setPosts(current => [...current, ...page.posts.filter(p => !current.some(c => c.id === p.id))]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error("Failed to load more posts", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
+    const updateRepliesCursor = (cursor: string | null) => {
+        repliesCursorRef.current = cursor;
+        setRepliesCursor(cursor);
+    };
+
+    const openPost = async (post: Post) => {
+        setSelectedPost(post);
+        updateRepliesCursor(null);
+        try {
+            const page = await ApiService.getReplies(post.id);
+            setSelectedPost(current => current && current.id === post.id ? { ...current, replies: page.replies } : current);
+            updateRepliesCursor(page.nextCursor);
+        } catch (error) {
+            console.error("Failed to load replies", error);
+        }
+    };
+
+    const loadMoreReplies = async () => {
+        if (!selectedPost || !repliesCursor || loadingMoreReplies) return;
+        const postId = selectedPost.id;
+        setLoadingMoreReplies(true);
+        try {
+            const page = await ApiService.getReplies(postId, repliesCursor);
+            setSelectedPost(current => current && current.id === postId
+                ? { ...current, replies: [...current.replies, ...page.replies.filter(r => !current.replies.some(c => c.id === r.id))] }
+                : current);
+            updateRepliesCursor(page.nextCursor);
+        } catch (error) {
+            console.error("Failed to load more replies", error);
+        } finally {
+            setLoadingMoreReplies(false);
+        }
+    };
+
     const handleCreatePost = async () => {
         if (!newPostContent.trim()) return;
 
@@ -84,7 +175,8 @@ function PeerSupport() {
             const reply = await ApiService.replyToPost(selectedPost.id, newReplyContent);
             const updatedPost = {
                 ...selectedPost,
-                replies: [...selectedPost.replies, reply]
+                replies: [...selectedPost.replies, reply],
+                reply_count: (selectedPost.reply_count ?? selectedPost.replies.length) + 1
             };
 
             setSelectedPost(updatedPost);
@@ -184,7 +276,7 @@ function PeerSupport() {
                                         {/* Replies Section */}
                                         <div className="space-y-4 pt-4">
                                             <h3 className="text-white/50 text-sm font-medium uppercase tracking-wider pl-2">
-                                                Replies ({selectedPost.replies.length})
+                                                Replies ({selectedPost.reply_count ?? selectedPost.replies.length})
                                             </h3>
 
                                             {selectedPost.replies.map((reply) => (
@@ -198,6 +290,16 @@ function PeerSupport() {
                                                 </div>
                                             ))}
 
+                                            {repliesCursor && (
+                                                <button
+                                                    onClick={loadMoreReplies}
+                                                    disabled={loadingMoreReplies}
+                                                    className="ml-4 w-[calc(100%-1rem)] py-2.5 text-sm text-white/50 hover:text-white bg-white/5 hover:bg-white/10 border border-white/5 rounded-2xl transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
+                                                >
+                                                    {loadingMoreReplies ? 'Loading...' : 'Load more replies'}
+                                                </button>
+                                            )}
+
                                             <div className="pt-4 ml-4 relative">
                                                 <input
                                                     type="text"
@@ -223,7 +325,7 @@ function PeerSupport() {
                                         {posts.map((post, i) => (
                                             <button
                                                 key={post.id}
-                                                onClick={() => setSelectedPost(post)}
+                                                onClick={() => openPost(post)}
                                                 className="w-full text-left glass-card p-6 flex flex-col group relative overflow-hidden animate-fade-in-up"
                                                 style={{ animationDelay: `${i * 100}ms` }}
                                             >
@@ -252,12 +354,21 @@ function PeerSupport() {
                                                         </div>
                                                         <div className="flex items-center gap-2 text-white/40 group-hover:text-blue-300/80 transition-colors">
                                                             <MessageCircle className="w-4 h-4" />
-                                                            <span className="text-xs font-medium">{post.replies ? post.replies.length : 0} replies</span>
+                                                            <span className="text-xs font-medium">{post.reply_count ?? 0} replies</span>
                                                         </div>
                                                     </div>
                                                 </div>
                                             </button>
                                         ))}
+                                        {nextCursor && (
+                                            <button
+                                                onClick={loadMorePosts}
+                                                disabled={loadingMore}
+                                                className="w-full py-3 text-sm text-sana-text-muted hover:text-white bg-white/5 hover:bg-white/10 border border-white/5 rounded-2xl transition-all duration-300 disabled:opacity-50 disabled:cursor-not-allowed"
+                                            >
+                                                {loadingMore ? 'Loading...' : 'Load more'}
+                                            </button>
+                                        )}
                                         {posts.length === 0 && (
                                             <div className="text-center py-20 opacity-50">
                                                 <p>Be the first to share something.</p>
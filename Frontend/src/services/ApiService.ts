@@ -21,6 +21,7 @@ export const ApiService = {
             const response = await axios.post(`${API_URL}/chat`, {
                 message,
                 sessionId,
+                language: navigator.language,
             }, {
                 headers: token ? { Authorization: `Bearer ${token}` } : {}
             });
@@ -36,6 +37,7 @@ export const ApiService = {
         const formData = new FormData();
         formData.append('file', audioBlob, 'input.wav');
         formData.append('sessionId', sessionId);
+        formData.append('language', navigator.language);
 
         try {
             const response = await axios.post(`${API_URL}/talk`, formData, {
@@ -81,6 +83,25 @@ export const ApiService = {
         return response.data;
     },
 
+    async getFreeSlots(doctorIds: string[], start: string, days: number = 1): Promise<import('../types').FreeSlots> {
+        const token = sessionStorage.getItem('token');
+        const response = await axios.get(`${API_URL}/appointments/slots`, {
+            params: { doctor_ids: doctorIds.join(','), start, days },
+            headers: token ? { Authorization: `Bearer ${token}` } : {}
+        });
+        return response.data;
+    },
+
+    // Live appointment status changes (appointment_status events); returns an unsubscribe function
+    subscribeAppointments(onStatus: (event: import('../types').AppointmentStatusEvent) => void, appointmentId?: string): () => void {
+        const token = sessionStorage.getItem('token');
+        const params = new URLSearchParams({ token: token || '' });
+        if (appointmentId) params.set('appointment_id', appointmentId);
+        const source = new EventSource(`${API_URL}/appointments/stream?${params.toString()}`);
+        source.addEventListener('appointment_status', (e) => onStatus(JSON.parse((e as MessageEvent).data)));
+        return () => source.close();
+    },
+
     async startSession(appointmentId: string): Promise<import('../types').Appointment> {
         const token = sessionStorage.getItem('token');
         const response = await axios.post(`${API_URL}/appointments/${appointmentId}/start`, {}, {
@@ -114,21 +135,37 @@ export const ApiService = {
     },
 
     // Forum APIs
-    async getPosts(): Promise<import('../types').Post[]> {
+    // One page of the feed, newest first. Pass the previous page's nextCursor to get the next one.
+    async getPosts(cursor?: string | null): Promise<{ posts: import('../types').Post[]; nextCursor: string | null }> {
         const token = sessionStorage.getItem('token');
         const response = await axios.get(`${API_URL}/forum/posts`, {
+            params: cursor ? { cursor } : {},
             headers: token ? { Authorization: `Bearer ${token}` } : {}
         });
         // Map backend response to frontend Post type (handle timestamp/created_at difference)
-        return response.data.map((post: any) => ({
+        const posts = response.data.map((post: any) => ({
             ...post,
             timestamp: new Date(post.created_at).toLocaleString(), // Convert backend created_at to timestamp string
             preview: post.content.length > 60 ? post.content.substring(0, 60) + '...' : post.content,
-            replies: post.replies ? post.replies.map((r: any) => ({
-                ...r,
-                timestamp: r.created_at ? new Date(r.created_at).toLocaleString() : 'Just now'
-            })) : []
+            replies: [], // Loaded per post via getReplies
+            reply_count: post.reply_count ?? 0
         }));
+        // Absent on the last page
+        return { posts, nextCursor: response.headers['x-next-cursor'] ?? null };
+    },
+
+    // One page of a thread, oldest first. Pass the previous page's nextCursor to get the next one.
+    async getReplies(postId: string, cursor?: string | null): Promise<{ replies: import('../types').Reply[]; nextCursor: string | null }> {
+        const token = sessionStorage.getItem('token');
+        const response = await axios.get(`${API_URL}/forum/posts/${postId}/replies`, {
+            params: cursor ? { limit: 100, cursor } : { limit: 100 },
+            headers: token ? { Authorization: `Bearer ${token}` } : {}
+        });
+        const replies = response.data.replies.map((r: any) => ({
+            ...r,
+            timestamp: r.created_at ? new Date(r.created_at).toLocaleString() : 'Just now'
+        }));
+        return { replies, nextCursor: response.data.next_cursor ?? null };
     },
 
     async createPost(content: string, color: string): Promise<import('../types').Post> {
@@ -141,7 +178,8 @@ export const ApiService = {
             ...post,
             timestamp: "Just now",
             preview: post.content.length > 60 ? post.content.substring(0, 60) + '...' : post.content,
-            replies: []
+            replies: [],
+            reply_count: 0
         };
     },
 
@@ -157,6 +195,16 @@ export const ApiService = {
         };
     },
 
+    // Live forum updates (server-sent events). Returns a function that closes the stream.
+    subscribeForum(handlers: { [event: string]: (data: any) => void }): () => void {
+        const token = sessionStorage.getItem('token');
+        const source = new EventSource(`${API_URL}/forum/stream?token=${encodeURIComponent(token || '')}`);
+        Object.entries(handlers).forEach(([event, handler]) => {
+            source.addEventListener(event, (e) => handler(JSON.parse((e as MessageEvent).data)));
+        });
+        return () => source.close();
+    },
+
     async likePost(postId: string): Promise<{ status: string, likes: number }> {
         const token = sessionStorage.getItem('token');
         const response = await axios.post(`${API_URL}/forum/posts/${postId}/like`, {}, {
@@ -15,6 +15,30 @@ export interface Appointment {
     created_at: string;
 }
 
+export interface AppointmentStatusEvent {
+    appointment_id: string;
+    doctor_id: string;
+    type: Appointment['type'];
+    status: Appointment['status'];
+    previous_status: Appointment['status'] | null;
+    scheduled_time: string | null;
+    at: string;
+}
+
+export interface DoctorFreeSlots {
+    doctor_id: string;
+    name: string;
+    specialization: string;
+    slots: string[]; // UTC, without offset
+}
+
+export interface FreeSlots {
+    start: string;
+    end: string;
+    slot_minutes: number;
+    doctors: DoctorFreeSlots[];
+}
+
 export interface User {
     id: string;
     name: string;
@@ -34,6 +58,7 @@ export interface Post {
     preview?: string; // Optional on frontend if derived
     timestamp: string; // Map to created_at from backend
     replies: Reply[];
+    reply_count?: number;
     likes: number;
     color: string;
 }